@@ -2,12 +2,14 @@
 import subprocess
 import logging
 import os
+from adb_session import ADBShellSession
 
 class ADBModule:
     def __init__(self):
         self.logger = logging.getLogger("ADBModule")
         self._setup_logging()
         self.device_id = self.get_device_id()
+        self.session = None
 
     def _setup_logging(self):
         handler = logging.StreamHandler()
@@ -32,6 +34,22 @@ class ADBModule:
             self.logger.error(f"Failed to execute command: {command_list}\nError: {e}")
             return None
 
+    def execute_shell_command(self, command):
+        """Run a shell command over the device's persistent shell session."""
+        if self.session is None:
+            self.session = ADBShellSession(self.device_id)
+        try:
+            return self.session.run(command)
+        except RuntimeError as e:
+            self.logger.error(f"Shell command failed: {command}\nError: {e}")
+            return None
+
+    def close(self):
+        """Close the persistent shell session."""
+        if self.session is not None:
+            self.session.close()
+            self.session = None
+
     def get_device_id(self):
         """Retrieve the first available ADB device ID dynamically."""
         self.logger.warning("🔍 Checking for connected ADB devices...")
@@ -60,10 +78,9 @@ class ADBModule:
 
         base_name = os.path.basename(local_path)
         # 1. Capture to /sdcard
-        capture_cmd = ["adb", "-s", self.device_id, "shell", "screencap", "-p", f"/sdcard/{base_name}"]
         pull_cmd = ["adb", "-s", self.device_id, "pull", f"/sdcard/{base_name}", local_path]
 
-        self.execute_adb_command(capture_cmd)
+        self.execute_shell_command(f"screencap -p /sdcard/{base_name}")
         self.execute_adb_command(pull_cmd)
         self.logger.info(f"[{self.device_id}] Screenshot saved to {local_path}")
         return True
@@ -73,8 +90,7 @@ class ADBModule:
         if not self.device_id:
             self.logger.error("❌ No valid ADB device found. Cannot tap screen.")
             return
-        tap_cmd = ["adb", "-s", self.device_id, "shell", "input", "tap", str(x), str(y)]
-        self.execute_adb_command(tap_cmd)
+        self.execute_shell_command(f"input tap {x} {y}")
         self.logger.info(f"[{self.device_id}] Tapped at ({x}, {y})")
 
     def press_escape(self):
@@ -82,6 +98,5 @@ class ADBModule:
         if not self.device_id:
             self.logger.error("❌ No valid ADB device found. Cannot press ESC.")
             return
-        esc_cmd = ["adb", "-s", self.device_id, "shell", "input", "keyevent", "111"]
-        self.execute_adb_command(esc_cmd)
+        self.execute_shell_command("input keyevent 111")
         self.logger.info(f"[{self.device_id}] Pressed ESC (keycode 111)")
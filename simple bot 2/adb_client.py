@@ -0,0 +1,311 @@
+import logging
+import queue
+import socket
+import threading
+
+from adb_session import ADBShellSession
+
+
+class AdbServerError(RuntimeError):
+    """The adb server answered a request with FAIL."""
+
+
+class AdbServerClient:
+    """
+    Talks to the adb server (localhost:5037) directly over its socket protocol,
+    so taps and captures do not have to spawn the `adb` executable.
+
+    Every request is a 4-digit hex length followed by the payload, and the
+    server answers OKAY or FAIL (followed by a length-prefixed message).
+    Device services run on a connection that was first switched to the
+    device with `host:transport:<serial>`; each such connection serves a
+    single service, so the client keeps a small pool of already switched
+    connections per device.
+    """
+
+    def __init__(self, host="127.0.0.1", port=5037, timeout=10.0, pool_size=2):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.pool_size = pool_size
+        self.logger = logging.getLogger("AdbServerClient")
+        self._pools = {}
+        self._pool_lock = threading.Lock()
+        self._refillers = {}  # serial -> the one thread topping up that device's pool
+
+    # -- wire protocol ---------------------------------------------------
+
+    def _connect(self):
+        sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        return sock
+
+    @staticmethod
+    def _send(sock, payload):
+        data = payload.encode("utf-8")
+        sock.sendall(b"%04x" % len(data) + data)
+
+    @staticmethod
+    def _read_exact(sock, size):
+        chunks = []
+        while size:
+            chunk = sock.recv(size)
+            if not chunk:
+                raise ConnectionError("adb server closed the connection")
+            chunks.append(chunk)
+            size -= len(chunk)
+        return b"".join(chunks)
+
+    @classmethod
+    def _read_length_prefixed(cls, sock):
+        size = int(cls._read_exact(sock, 4), 16)
+        return cls._read_exact(sock, size).decode("utf-8", errors="replace")
+
+    @classmethod
+    def _read_status(cls, sock, request):
+        status = cls._read_exact(sock, 4)
+        if status == b"OKAY":
+            return
+        if status == b"FAIL":
+            raise AdbServerError(f"{request}: {cls._read_length_prefixed(sock)}")
+        raise AdbServerError(f"{request}: unexpected response {status!r}")
+
+    @staticmethod
+    def _read_all(sock):
+        chunks = []
+        while True:
+            chunk = sock.recv(65536)
+            if not chunk:
+                return b"".join(chunks)
+            chunks.append(chunk)
+
+    def _request(self, sock, payload):
+        self._send(sock, payload)
+        self._read_status(sock, payload)
+
+    # -- host services ---------------------------------------------------
+
+    def version(self):
+        """Return the adb server's protocol version."""
+        with self._connect() as sock:
+            self._request(sock, "host:version")
+            return int(self._read_length_prefixed(sock), 16)
+
+    @staticmethod
+    def parse_devices(text):
+        """Parse a `host:devices` payload into a list of (serial, state)."""
+        devices = []
+        for line in text.splitlines():
+            if "\t" in line:
+                serial, state = line.split("\t", 1)
+                devices.append((serial, state.strip()))
+        return devices
+
+    def devices(self):
+        """List (serial, state) pairs for every device the server knows about."""
+        with self._connect() as sock:
+            self._request(sock, "host:devices")
+            return self.parse_devices(self._read_length_prefixed(sock))
+
+    def open_tracker(self):
+        """
+        Subscribe to `host:track-devices` and return the socket. Read updates
+        with read_device_list(); shutting the socket down ends the stream.
+        """
+        sock = self._connect()
+        sock.settimeout(None)
+        try:
+            self._request(sock, "host:track-devices")
+        except Exception:
+            sock.close()
+            raise
+        return sock
+
+    def read_device_list(self, sock):
+        """Block until the tracker sends the next full (serial, state) device list."""
+        return self.parse_devices(self._read_length_prefixed(sock))
+
+    def track_devices(self):
+        """
+        Yield the full (serial, state) device list every time it changes.
+        The generator runs until the server closes the connection.
+        """
+        sock = self.open_tracker()
+        try:
+            while True:
+                yield self.read_device_list(sock)
+        except (ConnectionError, OSError):
+            return
+        finally:
+            sock.close()
+
+    # -- device services -------------------------------------------------
+
+    def _open_transport(self, serial):
+        sock = self._connect()
+        try:
+            self._request(sock, f"host:transport:{serial}")
+        except Exception:
+            sock.close()
+            raise
+        return sock
+
+    def _checkout(self, serial):
+        """Take a connection already switched to `serial` from the pool, or open one."""
+        with self._pool_lock:
+            pool = self._pools.get(serial)
+            if pool:
+                return pool.pop(), True
+        return self._open_transport(serial), False
+
+    def prewarm(self, serial):
+        """Fill the device's pool with switched connections ahead of use."""
+        while True:
+            with self._pool_lock:
+                if len(self._pools.setdefault(serial, [])) >= self.pool_size:
+                    return
+            sock = self._open_transport(serial)
+            with self._pool_lock:
+                pool = self._pools.setdefault(serial, [])
+                if len(pool) >= self.pool_size:
+                    sock.close()
+                    return
+                pool.append(sock)
+
+    def open_service(self, serial, service):
+        """
+        Start `service` on the device and return the connected socket.
+        A pooled connection that turned out to be stale is replaced once.
+        """
+        sock, pooled = self._checkout(serial)
+        try:
+            self._request(sock, service)
+        except (AdbServerError, ConnectionError, OSError):
+            sock.close()
+            if not pooled:
+                raise
+            self.discard_pool(serial)
+            sock = self._open_transport(serial)
+            try:
+                self._request(sock, service)
+            except Exception:
+                sock.close()
+                raise
+        self._start_refill(serial)
+        return sock
+
+    def _start_refill(self, serial):
+        """Top up the device's pool in the background, with at most one worker per device."""
+        with self._pool_lock:
+            if serial in self._refillers or len(self._pools.get(serial, [])) >= self.pool_size:
+                return
+            worker = threading.Thread(target=self._refill, args=(serial,), name=f"adb-refill-{serial}", daemon=True)
+            self._refillers[serial] = worker
+        worker.start()
+
+    def _refill(self, serial):
+        try:
+            while True:
+                with self._pool_lock:
+                    if len(self._pools.setdefault(serial, [])) >= self.pool_size:
+                        # Checked and released under the lock, so a checkout after this starts a new worker.
+                        del self._refillers[serial]
+                        return
+                sock = self._open_transport(serial)
+                with self._pool_lock:
+                    pool = self._pools.setdefault(serial, [])
+                    if len(pool) < self.pool_size:
+                        pool.append(sock)
+                        sock = None
+                if sock is not None:
+                    sock.close()
+        except (AdbServerError, OSError) as e:
+            self.logger.debug(f"Could not refill connection pool for {serial}: {e}")
+            with self._pool_lock:
+                self._refillers.pop(serial, None)
+
+    def wait_for_refill(self, serial, timeout=None):
+        """Block until the device's background pool refill (if any) has finished."""
+        with self._pool_lock:
+            worker = self._refillers.get(serial)
+        if worker is not None:
+            worker.join(timeout)
+
+    def discard_pool(self, serial):
+        """Close all idle connections for a device (e.g. after it disconnected)."""
+        with self._pool_lock:
+            pool = self._pools.pop(serial, [])
+        for sock in pool:
+            sock.close()
+
+    def close(self):
+        """Close every pooled connection."""
+        for serial in list(self._pools):
+            self.discard_pool(serial)
+
+    def shell(self, serial, command):
+        """Run a one-shot shell command and return its output as text."""
+        with self.open_service(serial, f"shell:{command}") as sock:
+            return self._read_all(sock).decode("utf-8", errors="replace")
+
+    def exec_out(self, serial, command):
+        """Run a command with a clean binary stdout (like `adb exec-out`)."""
+        with self.open_service(serial, f"exec:{command}") as sock:
+            return self._read_all(sock)
+
+    def open_shell(self, serial):
+        """
+        Open an interactive shell and return its socket. A raw (non-pty) shell
+        is requested first; older devices that do not know it get a plain one.
+        """
+        try:
+            return self.open_service(serial, "shell,raw:")
+        except AdbServerError:
+            return self.open_service(serial, "shell:")
+
+
+class SocketShellSession(ADBShellSession):
+    """ADBShellSession that runs over an adb server socket instead of an `adb shell` process."""
+
+    def __init__(self, device_id, client, timeout=10.0):
+        super().__init__(device_id, timeout=timeout)
+        self.client = client
+        self.sock = None
+        self._closed_by_peer = threading.Event()
+
+    def is_alive(self):
+        return self.sock is not None and not self._closed_by_peer.is_set()
+
+    def is_open(self):
+        return self.sock is not None
+
+    def _start(self):
+        self.sock = self.client.open_shell(self.device_id)
+        self.sock.settimeout(None)
+        self._closed_by_peer = threading.Event()
+        self._lines = queue.Queue()
+        reader = threading.Thread(target=self._drain_socket, args=(self.sock, self._lines, self._closed_by_peer), daemon=True)
+        reader.start()
+        self.logger.info(f"[{self.device_id}] Opened persistent shell over the adb server")
+
+    @classmethod
+    def _drain_socket(cls, sock, lines, closed):
+        try:
+            cls._drain(sock.makefile("rb"), lines)
+        except OSError:
+            lines.put(None)
+        closed.set()
+
+    def _write(self, data):
+        self.sock.sendall(data)
+
+    def close(self):
+        # Taken first: close() may race with the thread of a command that was abandoned.
+        sock, self.sock = self.sock, None
+        if sock is None:
+            return
+        try:
+            sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        sock.close()
@@ -1,10 +1,30 @@
+import os
 import subprocess
 import logging
+from adb_client import AdbServerClient, AdbServerError, SocketShellSession
+from adb_session import ADBShellSession
+from screencap import CAPTURE_COMMANDS, benchmark_capture_modes, choose_capture_mode, decode_capture, encode_png
+from sequence_compiler import captures_frame, compile_sequence
+from ui_wait import wait_until
 
 class ADBModule:
-    def __init__(self):
+    def __init__(self, client=None, use_server=True, registry=None, offline_timeout=60.0):
+        """
+        Args:
+            client (AdbServerClient): Client for the adb server socket protocol.
+            use_server (bool): Talk to the adb server directly when it is reachable;
+                otherwise every command spawns the adb executable.
+            registry (DeviceRegistry): Optional live device registry. Actions on a device it
+                reports offline pause until it reconnects instead of failing.
+            offline_timeout (float): Seconds to wait for an offline device before giving up.
+        """
         self.logger = logging.getLogger("ADBModule")
+        self.client = client or (self._connect_server() if use_server else None)
+        self.registry = registry
+        self.offline_timeout = offline_timeout
         self.device_id = self.get_device_id()
+        self.session = None
+        self.capture_modes = {}  # device -> capture mode picked by select_capture_mode()
 
     def execute_adb_command(self, command_list):
         """Execute an ADB command."""
@@ -12,16 +32,68 @@ class ADBModule:
         result = subprocess.run(command_list, capture_output=True, text=True)
         return result.stdout.strip() if result.returncode == 0 else None
 
+    def _connect_server(self):
+        """Return a client for the local adb server, or None if it is not running."""
+        client = AdbServerClient()
+        try:
+            client.version()
+        except OSError:
+            self.logger.info("ℹ️ adb server not reachable. Falling back to the adb executable.")
+            return None
+        return client
+
+    def wait_until_online(self, device=None):
+        """Pause while the registry reports the device offline. Returns False if it never came back."""
+        device = device or self.device_id
+        if self.registry is None or self.registry.is_online(device):
+            return True
+        self.logger.warning(f"⏸️ {device} is offline. Pausing until it reconnects...")
+        if self.registry.wait_for_device(device, timeout=self.offline_timeout):
+            self.logger.info(f"▶️ {device} is back online. Resuming.")
+            return True
+        self.logger.error(f"❌ {device} did not reconnect within {self.offline_timeout}s.")
+        return False
+
+    def execute_shell_command(self, command):
+        """Run a shell command over the device's persistent shell session."""
+        if not self.wait_until_online():
+            return None
+        if self.session is None:
+            if self.client:
+                self.session = SocketShellSession(self.device_id, self.client)
+            else:
+                self.session = ADBShellSession(self.device_id)
+        try:
+            return self.session.run(command)
+        except RuntimeError as e:
+            self.logger.error(f"❌ Shell command failed: {e}")
+            return None
+
+    def close(self):
+        """Close the persistent shell session and pooled server connections."""
+        if self.session is not None:
+            self.session.close()
+            self.session = None
+        if self.client:
+            self.client.close()
+
     def get_device_id(self):
         """Retrieve the first available ADB device."""
-        devices_output = self.execute_adb_command(["adb", "devices"])
+        if self.client:
+            try:
+                device_list = [serial for serial, state in self.client.devices() if state == "device"]
+            except (AdbServerError, OSError) as e:
+                self.logger.error(f"❌ Could not list devices from the adb server: {e}")
+                return None
+        else:
+            devices_output = self.execute_adb_command(["adb", "devices"])
 
-        if not devices_output:
-            self.logger.error("❌ No ADB devices found. Ensure your device/emulator is connected.")
-            return None
+            if not devices_output:
+                self.logger.error("❌ No ADB devices found. Ensure your device/emulator is connected.")
+                return None
 
-        lines = devices_output.split("\n")
-        device_list = [line.split("\t")[0] for line in lines[1:] if "device" in line]
+            lines = devices_output.split("\n")
+            device_list = [line.split("\t")[0] for line in lines[1:] if "device" in line]
 
         if device_list:
             self.logger.info(f"✅ Using ADB device: {device_list[0]}")
@@ -33,23 +105,162 @@ class ADBModule:
     def tap_screen(self, x, y):
         """Tap a location on the screen."""
         if self.device_id:
-            self.execute_adb_command(["adb", "-s", self.device_id, "shell", "input", "tap", str(x), str(y)])
+            self.execute_shell_command(f"input tap {x} {y}")
         else:
             self.logger.error("❌ No device connected. Cannot tap screen.")
 
     def capture_screenshot(self, local_path):
-        """Capture and pull a screenshot."""
-        if self.device_id:
-            self.execute_adb_command(["adb", "-s", self.device_id, "shell", "screencap", "-p", "/sdcard/temp.png"])
-            self.execute_adb_command(["adb", "-s", self.device_id, "pull", "/sdcard/temp.png", local_path])
-            return True
-        else:
+        """Capture a screenshot and save it to `local_path`."""
+        return self.capture_frame(save_path=local_path, decode=False) is not None
+
+    def _exec_out(self, device, command):
+        """Run `command` through exec-out and return its stdout bytes, or None on failure."""
+        if self.client:
+            try:
+                return self.client.exec_out(device, command) or None
+            except (AdbServerError, OSError) as e:
+                self.logger.error(f"❌ exec-out '{command}' failed on {device}: {e}")
+                return None
+        result = subprocess.run(["adb", "-s", device, "exec-out", command], capture_output=True)
+        if result.returncode != 0 or not result.stdout:
+            return None
+        return result.stdout
+
+    def capture_frame(self, device=None, save_path=None, decode=True, mode=None):
+        """
+        Stream a screencap straight into memory via `exec-out`.
+
+        Args:
+            device (str): Device to capture from (defaults to the module's device).
+            save_path (str): Optional path the PNG is also written to.
+            decode (bool): Return the decoded frame (True) or the raw PNG bytes (False).
+            mode (str): "png", "raw" or "gzip" (see screencap.CAPTURE_COMMANDS). Defaults to
+                the mode chosen by select_capture_mode() for the device, else "png".
+
+        Returns:
+            numpy.ndarray: The frame (BGR for png, an RGBA view for raw/gzip), the PNG bytes
+            when decode is False, or None on failure.
+        """
+        device = device or self.device_id
+        if not device:
             self.logger.error("❌ No device connected. Cannot capture screenshot.")
-            return False
+            return None
+        if not self.wait_until_online(device):
+            return None
+
+        if not decode:
+            mode = "png"
+        mode = mode or self.capture_modes.get(device, "png")
+        data = self._exec_out(device, CAPTURE_COMMANDS[mode])
+        if data is None:
+            self.logger.error(f"❌ Screencap ({mode}) failed on {device}.")
+            return None
+        if not decode:
+            frame = data
+        else:
+            try:
+                frame = decode_capture(mode, data)
+            except ValueError as e:
+                self.logger.error(f"❌ Could not decode {mode} screencap from {device}: {e}")
+                return None
+
+        if save_path:
+            self._save_capture(save_path, mode, data, frame)
+        return frame
+
+    def wait_until(self, predicate, timeout=2.0, interval=0.05, device=None):
+        """
+        Poll captures until `predicate(frame)` holds (see ui_wait.wait_until for the predicates).
+
+        Returns:
+            tuple: (ready, frame) - whether the UI settled in time, and the last frame.
+        """
+        return wait_until(lambda: self.capture_frame(device), predicate, timeout, interval)
+
+    @staticmethod
+    def _save_capture(save_path, mode, data, frame):
+        """Write a capture to disk as PNG (PNG captures are written as received)."""
+        os.makedirs(os.path.dirname(save_path) or ".", exist_ok=True)
+        with open(save_path, "wb") as f:
+            f.write(data if mode == "png" else encode_png(frame))
+
+    def run_sequence(self, sequence, device=None, mode=None, save_path=None):
+        """
+        Compile a sequence of actions into one device-side script and run it in a single round trip.
+
+        Args:
+            sequence (list): Action dicts (see sequence_compiler.compile_action).
+            device (str): Device to run on (defaults to the module's device).
+            mode (str): Capture mode for a capture action (defaults as in capture_frame).
+            save_path (str): Optional path the captured frame is also written to.
+
+        Returns:
+            numpy.ndarray: The frame from the sequence's capture action, True if the sequence
+            has no capture, or None on failure.
+        """
+        device = device or self.device_id
+        if not device:
+            self.logger.error("❌ No device connected. Cannot run sequence.")
+            return None
+        if not self.wait_until_online(device):
+            return None
+
+        mode = mode or self.capture_modes.get(device, "png")
+        script = compile_sequence(sequence, mode=mode)
+        if not captures_frame(sequence):
+            return True if self.execute_shell_command(script) is not None else None
+
+        data = self._exec_out(device, script)
+        if data is None:
+            self.logger.error(f"❌ Sequence failed on {device}: {script}")
+            return None
+        try:
+            frame = decode_capture(mode, data)
+        except ValueError as e:
+            self.logger.error(f"❌ Could not decode the frame captured by the sequence: {e}")
+            return None
+        if save_path:
+            self._save_capture(save_path, mode, data, frame)
+        return frame
+
+    def select_capture_mode(self, device=None, samples=3):
+        """
+        Benchmark png, raw and gzip captures on the device and remember the fastest.
+
+        Returns:
+            str: The selected mode.
+        """
+        device = device or self.device_id
+        if not device:
+            self.logger.error("❌ No device connected. Cannot benchmark capture modes.")
+            return "png"
+
+        def capture(mode):
+            data = self._exec_out(device, CAPTURE_COMMANDS[mode])
+            if data is None:
+                raise RuntimeError(f"{mode} capture failed")
+            return data
+
+        results = benchmark_capture_modes(capture, samples=samples)
+        for mode, stats in results.items():
+            self.logger.info(
+                f"📊 {device} {mode}: {stats['seconds'] * 1000:.0f} ms, "
+                f"{stats['bytes'] / 1024:.0f} KiB, {stats['bandwidth'] / 1e6:.1f} MB/s"
+            )
+        self.capture_modes[device] = choose_capture_mode(results)
+        self.logger.info(f"✅ Using {self.capture_modes[device]} captures for {device}")
+        return self.capture_modes[device]
 
     def press_escape(self):
         """Press the ESC key (Keycode 111) to close pop-ups."""
         if self.device_id:
-            self.execute_adb_command(["adb", "-s", self.device_id, "shell", "input", "keyevent", "111"])
+            self.execute_shell_command("input keyevent 111")
         else:
             self.logger.error("❌ No device connected. Cannot send ESC key event.")
+
+    def swipe(self, x1, y1, x2, y2, duration=300):
+        """Swipe from (x1, y1) to (x2, y2) over `duration` milliseconds."""
+        if self.device_id:
+            self.execute_shell_command(f"input swipe {x1} {y1} {x2} {y2} {duration}")
+        else:
+            self.logger.error("❌ No device connected. Cannot swipe.")
@@ -3,20 +3,33 @@ import logging
 import shutil
 import re
 import os
+from adb_session import ADBShellSession
+from screencap import decode_png
 
 class ADBModule:
-    def __init__(self):
+    def __init__(self, registry=None):
+        """
+        Args:
+            registry (DeviceRegistry): Optional live device registry. When given, device
+                validation is an in-memory lookup instead of running `adb devices`.
+        """
         self.logger = logging.getLogger("ADBModule")
         logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+        self.sessions = {}
+        self.registry = registry
+        self.adb_checked = False
 
     def log_message(self, message, level=logging.INFO):
         """Log messages at the specified logging level."""
         self.logger.log(level, message)
 
     def check_adb_installed(self):
-        """Check if the ADB tool is installed and accessible."""
+        """Check (once per instance) if the ADB tool is installed and accessible."""
+        if self.adb_checked:
+            return
         try:
             subprocess.run(["adb", "version"], capture_output=True, text=True, check=True)
+            self.adb_checked = True
             self.log_message("ADB tool is installed and accessible.")
         except FileNotFoundError:
             self.log_message("ADB tool is not installed or not in the PATH.", level=logging.ERROR)
@@ -27,6 +40,8 @@ class ADBModule:
 
     def list_devices(self):
         """List all connected ADB devices."""
+        if self.registry:
+            return self.registry.online_devices()
         try:
             self.check_adb_installed()
             result = subprocess.run(["adb", "devices"], capture_output=True, text=True, check=True)
@@ -40,6 +55,10 @@ class ADBModule:
 
     def validate_device_id(self, device_id):
         """Validate that the given device_id is in the list of connected devices."""
+        if self.registry:
+            if not self.registry.is_online(device_id):
+                raise ValueError(f"Device ID {device_id} is not connected.")
+            return
         connected_devices = self.list_devices()
         if device_id not in connected_devices:
             raise ValueError(f"Device ID {device_id} is not connected.")
@@ -57,6 +76,18 @@ class ADBModule:
             os.makedirs(directory)
             self.log_message(f"Created directory: {directory}")
 
+    def get_session(self, device_id):
+        """Return the persistent shell session for a device, opening it on first use."""
+        if device_id not in self.sessions:
+            self.sessions[device_id] = ADBShellSession(device_id)
+        return self.sessions[device_id]
+
+    def close(self):
+        """Close all persistent shell sessions."""
+        for session in self.sessions.values():
+            session.close()
+        self.sessions = {}
+
     def execute_command(self, device_id, command):
         """Execute an ADB shell command on a specific device.
 
@@ -70,9 +101,9 @@ class ADBModule:
         try:
             self.check_adb_installed()
             self.validate_device_id(device_id)
-            result = subprocess.run(["adb", "-s", device_id, "shell", command], capture_output=True, text=True, check=True)
-            self.log_message(f"Command output: {result.stdout.strip()}")
-            return result.stdout.strip()
+            output = self.get_session(device_id).run(command)
+            self.log_message(f"Command output: {output}")
+            return output
         except Exception as e:
             self.log_message(f"Failed to execute command: {e}", level=logging.ERROR)
             raise RuntimeError(f"Failed to execute command: {e}")
@@ -103,6 +134,29 @@ class ADBModule:
             self.log_message(f"Failed to capture screenshot: {e}", level=logging.ERROR)
             raise RuntimeError(f"Failed to capture screenshot: {e}")
 
+    def capture_frame(self, device_id, save_path=None):
+        """Capture a screenshot straight into memory.
+
+        Args:
+            device_id (str): The ID of the target device.
+            save_path (str): Optional path the PNG is also written to.
+
+        Returns:
+            numpy.ndarray: The decoded BGR frame.
+        """
+        try:
+            self.check_adb_installed()
+            self.validate_device_id(device_id)
+            result = subprocess.run(["adb", "-s", device_id, "exec-out", "screencap", "-p"], capture_output=True, check=True)
+            if save_path:
+                self.ensure_directory_exists(save_path)
+                with open(save_path, "wb") as f:
+                    f.write(result.stdout)
+            return decode_png(result.stdout)
+        except Exception as e:
+            self.log_message(f"Failed to capture frame: {e}", level=logging.ERROR)
+            raise RuntimeError(f"Failed to capture frame: {e}")
+
     def tap(self, device_id, x, y):
         """Simulate a tap on the device screen.
 
@@ -114,7 +168,7 @@ class ADBModule:
         try:
             self.check_adb_installed()
             self.validate_device_id(device_id)
-            subprocess.run(["adb", "-s", device_id, "shell", f"input tap {x} {y}"], check=True)
+            self.get_session(device_id).run(f"input tap {x} {y}", check=True)
             self.log_message(f"Tapped on ({x}, {y}) on device {device_id}")
         except Exception as e:
             self.log_message(f"Failed to tap on ({x}, {y}): {e}", level=logging.ERROR)
@@ -134,7 +188,7 @@ class ADBModule:
         try:
             self.check_adb_installed()
             self.validate_device_id(device_id)
-            subprocess.run(["adb", "-s", device_id, "shell", f"input swipe {x1} {y1} {x2} {y2} {duration}"], check=True)
+            self.get_session(device_id).run(f"input swipe {x1} {y1} {x2} {y2} {duration}", check=True)
             self.log_message(f"Swiped from ({x1}, {y1}) to ({x2}, {y2}) on device {device_id}")
         except Exception as e:
             self.log_message(f"Failed to swipe: {e}", level=logging.ERROR)
@@ -152,8 +206,8 @@ class ADBModule:
         try:
             self.check_adb_installed()
             self.validate_device_id(device_id)
-            result = subprocess.run(["adb", "-s", device_id, "shell", "wm size"], capture_output=True, text=True, check=True)
-            match = re.search(r"Physical size: (\d+)x(\d+)", result.stdout)
+            output = self.get_session(device_id).run("wm size")
+            match = re.search(r"Physical size: (\d+)x(\d+)", output)
             if not match:
                 raise ValueError("Failed to retrieve screen resolution.")
             width, height = map(int, match.groups())
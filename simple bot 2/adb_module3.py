@@ -1,11 +1,14 @@
 import subprocess
 import logging
 import os
+from adb_session import ADBShellSession
+from screencap import decode_png
 
 class ADBModule:
     def __init__(self):
         self.logger = logging.getLogger("ADBModule")
         self._setup_logging()
+        self.sessions = {}
 
     def _setup_logging(self):
         handler = logging.StreamHandler()
@@ -30,23 +33,54 @@ class ADBModule:
             self.logger.error(f"Failed to execute command: {command_list}\nError: {e}")
             return None
 
+    def execute_shell_command(self, device_id, command):
+        """Run a shell command over the device's persistent shell session."""
+        if device_id not in self.sessions:
+            self.sessions[device_id] = ADBShellSession(device_id)
+        try:
+            return self.sessions[device_id].run(command)
+        except RuntimeError as e:
+            self.logger.error(f"Shell command failed: {command}\nError: {e}")
+            return None
+
+    def close(self):
+        """Close all persistent shell sessions."""
+        for session in self.sessions.values():
+            session.close()
+        self.sessions = {}
+
     def capture_screenshot(self, device_id, local_path):
         """
         Captures a screenshot on the device and pulls it to `local_path`.
         """
         base_name = os.path.basename(local_path)
         # 1. Capture to /sdcard
-        self.execute_adb_command(["adb", "-s", device_id, "shell", "screencap", "-p", f"/sdcard/{base_name}"])
+        self.execute_shell_command(device_id, f"screencap -p /sdcard/{base_name}")
         # 2. Pull to local
         self.execute_adb_command(["adb", "-s", device_id, "pull", f"/sdcard/{base_name}", local_path])
         self.logger.info(f"[{device_id}] Screenshot saved to {local_path}")
 
+    def capture_frame(self, device_id, save_path=None):
+        """
+        Streams a screencap straight into memory and returns the decoded frame.
+        The PNG is also written to `save_path` when given.
+        """
+        result = subprocess.run(["adb", "-s", device_id, "exec-out", "screencap", "-p"], capture_output=True)
+        if result.returncode != 0 or not result.stdout:
+            self.logger.error(f"[{device_id}] Screencap failed: {result.stderr.decode(errors='replace')}")
+            return None
+        if save_path:
+            with open(save_path, "wb") as f:
+                f.write(result.stdout)
+            self.logger.info(f"[{device_id}] Screenshot saved to {save_path}")
+        return decode_png(result.stdout)
+
     def tap_screen(self, device_id, x, y):
         """Sends an ADB tap command to the device at (x, y)."""
-        self.execute_adb_command(["adb", "-s", device_id, "shell", "input", "tap", str(x), str(y)])
+        self.execute_shell_command(device_id, f"input tap {x} {y}")
         self.logger.info(f"[{device_id}] Tapped at ({x}, {y})")
 
     def press_escape(self, device_id):
         """Sends an ESC (KEYCODE_ESCAPE = 111) keyevent to the device/emulator."""
-        self.execute_adb_command(["adb", "-s", device_id, "shell", "input", "keyevent", "111"])
+        self.execute_shell_command(device_id, "input keyevent 111")
         self.logger.info(f"[{device_id}] Pressed ESC (keycode 111)")
@@ -0,0 +1,149 @@
+import itertools
+import logging
+import queue
+import subprocess
+import threading
+
+
+class ADBShellSession:
+    """
+    Keeps one long-lived `adb shell` process open for a device and streams
+    commands into its stdin instead of spawning a new adb client per command.
+
+    Completion of each command is detected with a numbered sentinel that is
+    echoed (together with the exit status) after the command. If the pipe dies
+    the session is restarted transparently on the next command.
+    """
+
+    SENTINEL = "__WARBOT_DONE__"
+
+    def __init__(self, device_id, adb_path="adb", shell_command=None, timeout=10.0):
+        """
+        Args:
+            device_id (str): The ID of the target device.
+            adb_path (str): Path to the adb executable.
+            shell_command (list): Override for the process to launch (defaults to `adb -s <id> shell`).
+            timeout (float): Seconds to wait for a command's sentinel before giving up.
+        """
+        self.device_id = device_id
+        self.shell_command = shell_command or [adb_path, "-s", device_id, "shell"]
+        self.timeout = timeout
+        self.logger = logging.getLogger("ADBShellSession")
+        self.process = None
+        self._lines = None
+        self._lock = threading.Lock()
+        self._counter = itertools.count(1)
+
+    def is_alive(self):
+        """Return True if the underlying shell process is still running."""
+        return self.process is not None and self.process.poll() is None
+
+    def is_open(self):
+        """Return True if a shell was started and not closed yet (alive or not)."""
+        return self.process is not None
+
+    def _start(self):
+        """Launch the shell process and the thread that drains its output."""
+        self.process = subprocess.Popen(
+            self.shell_command,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            bufsize=0,
+        )
+        self._lines = queue.Queue()
+        reader = threading.Thread(target=self._drain, args=(self.process.stdout, self._lines), daemon=True)
+        reader.start()
+        self.logger.info(f"[{self.device_id}] Opened persistent shell session (pid {self.process.pid})")
+
+    def _write(self, data):
+        """Send bytes to the shell's stdin."""
+        self.process.stdin.write(data)
+        self.process.stdin.flush()
+
+    @staticmethod
+    def _drain(stream, lines):
+        """Push every output line onto `lines`; a final None marks EOF."""
+        for raw in iter(stream.readline, b""):
+            lines.put(raw.decode("utf-8", errors="replace").rstrip("\r\n"))
+        lines.put(None)
+
+    def close(self):
+        """Terminate the shell process."""
+        # Taken first: close() may race with the thread of a command that was abandoned.
+        process, self.process = self.process, None
+        if process is None:
+            return
+        try:
+            process.stdin.close()
+        except OSError:
+            pass
+        if process.poll() is None:
+            process.terminate()
+            try:
+                process.wait(timeout=2)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+    def run(self, command, check=False):
+        """
+        Run a shell command in the persistent session.
+
+        Args:
+            command (str): The shell command to execute on the device.
+            check (bool): Raise if the command exits with a non-zero status (otherwise it is only logged).
+
+        Returns:
+            str: The command output.
+
+        Raises:
+            RuntimeError: If the session died or timed out while running the command,
+                or with check=True if the command failed.
+        """
+        with self._lock:
+            for attempt in range(2):
+                if not self.is_alive():
+                    if self.is_open():
+                        self.logger.warning(f"[{self.device_id}] Shell session died. Reconnecting...")
+                        self.close()
+                    self._start()
+                number = next(self._counter)
+                # The split quotes keep a tty echo of this line from matching the marker.
+                line = f'{command}; echo "{self.SENTINEL}""{number}" $?\n'
+                try:
+                    self._write(line.encode("utf-8"))
+                except (BrokenPipeError, OSError) as e:
+                    # Nothing reached the device yet, so resending is safe.
+                    self.logger.warning(f"[{self.device_id}] Write to shell session failed ({e}), attempt {attempt + 1}")
+                    self.close()
+                    continue
+                return self._read_until(number, command, check)
+            raise RuntimeError(f"Could not open a shell session for {self.device_id}")
+
+    def _read_until(self, number, command, check=False):
+        """Collect output lines until the sentinel numbered `number` arrives."""
+        marker = f"{self.SENTINEL}{number}"
+        output = []
+        while True:
+            try:
+                line = self._lines.get(timeout=self.timeout)
+            except queue.Empty:
+                self.close()
+                raise RuntimeError(f"Timed out waiting for '{command}' on {self.device_id}")
+            if line is None:
+                self.close()
+                raise RuntimeError(f"Shell session for {self.device_id} closed while running '{command}'")
+            index = line.find(marker + " ")
+            if index >= 0:
+                if index > 0:
+                    output.append(line[:index])  # output that had no trailing newline
+                status = line[index + len(marker) + 1:].strip()
+                text = "\n".join(output).strip()
+                if status != "0":
+                    if check:
+                        raise RuntimeError(f"'{command}' exited with status {status} on {self.device_id}: {text}")
+                    self.logger.warning(f"[{self.device_id}] '{command}' exited with status {status}")
+                return text
+            if f'{self.SENTINEL}""{number}' in line:
+                continue  # tty echo of the command line itself
+            output.append(line)
@@ -2,12 +2,14 @@ import os
 import json
 import subprocess
 from PIL import Image, ImageFilter, ImageOps
-import pytesseract
 import re
 import logging
-import cv2
 import numpy as np
 import asyncio
+from ocr_pipeline import load_pipelines
+from screencap import decode_capture
+from sequence_compiler import captures_frame, compile_sequence
+from text_proposals import read_text_regions
 
 class BaseModule:
     def __init__(self, device_id=None):
@@ -17,6 +19,7 @@ class BaseModule:
         self.saved_sequences = {}
         self.universal_delay = 200
         self.config = {}
+        self.pipelines = load_pipelines()  # "full_screen" preprocessing for calibration and grid reads
 
         # Set up logging
         self.logger = logging.getLogger("BaseModule")
@@ -103,12 +106,13 @@ class BaseModule:
             # Convert to grayscale and apply thresholding
             touch_region = touch_region.convert("L")
             np_image = np.array(touch_region)
-            np_image = cv2.adaptiveThreshold(np_image, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY, 11, 2)
-            
+            pipeline = self.pipelines["full_screen"]
+
             # Debugging: Save the processed image for inspection
-            Image.fromarray(np_image).save("debug_processed_touch_region.png")
+            Image.fromarray(pipeline.apply(np_image)).save("debug_processed_touch_region.png")
 
-            touch_text = pytesseract.image_to_string(Image.fromarray(np_image))
+            # OCR only the text lines of the strip, not the whole width of it
+            touch_text = read_text_regions(np_image, pipeline=pipeline)
 
             # Debugging: Log the extracted text
             self.log_message(f"Extracted text: {touch_text.strip()}")
@@ -137,9 +141,7 @@ class BaseModule:
             image = Image.open(screenshot_path).convert("L")
             np_image = np.array(image)
 
-            # Adaptive thresholding
-            np_image = cv2.adaptiveThreshold(np_image, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY, 11, 2)
-            text = pytesseract.image_to_string(Image.fromarray(np_image))
+            text = read_text_regions(np_image, pipeline=self.pipelines["full_screen"])
 
             self.log_message(f"OCR at ({x}, {y}): {text.strip()}")
             return {"x": x, "y": y, "text": text}
@@ -185,6 +187,24 @@ class BaseModule:
             self.log_message(f"Failed to load sequences: {e}", level=logging.ERROR)
             raise RuntimeError(f"Failed to load sequences: {e}")
 
+    def execute_sequence(self, sequence, mode="png"):
+        """
+        Run a saved sequence as one compiled device-side script and return the final frame (if any).
+
+        Args:
+            sequence (list): Action dicts (see sequence_compiler.compile_action).
+            mode (str): Capture mode of the capture action (see screencap.CAPTURE_COMMANDS).
+        """
+        try:
+            script = compile_sequence(sequence, mode=mode)
+            command = ["adb", "-s", self.device_id] if self.device_id else ["adb"]
+            output = subprocess.check_output(command + ["exec-out", script])
+            self.log_message(f"Executed sequence of {len(sequence)} actions")
+            return decode_capture(mode, output) if captures_frame(sequence) else None
+        except Exception as e:
+            self.log_message(f"Failed to execute sequence: {e}", level=logging.ERROR)
+            raise RuntimeError(f"Failed to execute sequence: {e}")
+
     def list_connected_devices(self):
         """List all connected ADB devices."""
         try:
@@ -0,0 +1,17 @@
+"""
+Helpers shared by the benchmarks (ocr_benchmark, template_benchmark).
+
+Kept free of OCR/OpenCV imports so any benchmark can stamp its report
+without loading another benchmark's stack.
+"""
+
+import subprocess
+
+
+def git_commit():
+    """Short hash of the checked-out commit, or None outside a git checkout."""
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
@@ -1,7 +1,6 @@
 # bot_manager.py
 
 import os
-import time
 
 # Import all your existing modules
 from adb_module import ADBModule
@@ -71,14 +70,15 @@ class BotManager:
             return
 
         print(f"[MANAGER] Navigating to K={kingdom}, X={x}, Y={y}...")
+        before = self.adb_module.capture_frame()  # Arrival = the view center differs from this frame's
         self.nav_tool.navigate_to_coordinates(
             device_id=device_id,
             kingdom=kingdom,
             x=x,
             y=y
         )
-        # Wait a bit for the map to load
-        time.sleep(2.0)
+        # Wait for the map to load
+        self.nav_tool.wait_for_arrival(read_center=self.map_scanner.read_view_center, timeout=2.0, reference=before)
 
         print("[MANAGER] Running a quick map scan around this location...")
         # Just an example: scanning a smaller region near (90, 90)
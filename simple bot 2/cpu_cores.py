@@ -0,0 +1,38 @@
+"""
+CPU core counting, kept free of heavy imports so thread- and process-pool
+users (OCRService, TemplateMatchingModule) can size their pools cheaply.
+"""
+
+import os
+
+try:
+    import psutil
+except ImportError:  # Optional: only used to count physical cores
+    psutil = None
+
+
+def physical_cores():
+    """Number of physical CPU cores (hyperthreads do not speed up Tesseract)."""
+    if psutil is not None:
+        count = psutil.cpu_count(logical=False)
+        if count:
+            return count
+    try:
+        cores = set()
+        physical_id = core_id = None
+        with open("/proc/cpuinfo", "r") as f:
+            for line in f:
+                if line.startswith("physical id"):
+                    physical_id = line.split(":", 1)[1].strip()
+                elif line.startswith("core id"):
+                    core_id = line.split(":", 1)[1].strip()
+                elif not line.strip() and core_id is not None:
+                    cores.add((physical_id, core_id))
+                    physical_id = core_id = None
+        if core_id is not None:
+            cores.add((physical_id, core_id))
+        if cores:
+            return len(cores)
+    except OSError:
+        pass
+    return os.cpu_count() or 1
@@ -0,0 +1,123 @@
+import logging
+import socket
+import threading
+import time
+
+from adb_client import AdbServerClient, AdbServerError
+
+
+class DeviceRegistry:
+    """
+    In-memory set of online devices, kept current by a single subscription to
+    the adb server's `host:track-devices` stream instead of running
+    `adb devices` before every action.
+
+    Listeners registered with add_listener() are called as
+    listener(serial, online) whenever a device connects or disconnects, so a
+    scan can pause instead of failing.
+    """
+
+    def __init__(self, client=None, reconnect_delay=1.0):
+        self.client = client or AdbServerClient()
+        self.reconnect_delay = reconnect_delay
+        self.logger = logging.getLogger("DeviceRegistry")
+        self._states = {}
+        self._online = frozenset()
+        self._changed = threading.Condition()
+        self._listeners = []
+        self._ready = threading.Event()
+        self._running = False
+        self._sock = None
+        self._thread = None
+
+    def start(self, timeout=5.0):
+        """Start tracking and wait (up to `timeout`) for the first device list."""
+        if self._running:
+            return self
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="DeviceRegistry", daemon=True)
+        self._thread.start()
+        if not self._ready.wait(timeout):
+            self.logger.warning("No device list received from the adb server yet.")
+        return self
+
+    def stop(self):
+        """Stop tracking and close the subscription."""
+        self._running = False
+        sock = self._sock
+        if sock is not None:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+
+    def _run(self):
+        while self._running:
+            try:
+                self._sock = self.client.open_tracker()
+                while self._running:
+                    self._update(self.client.read_device_list(self._sock))
+            except (AdbServerError, ConnectionError, OSError) as e:
+                if self._running:
+                    self.logger.warning(f"Device tracking interrupted ({e}). Retrying in {self.reconnect_delay}s.")
+                    self._update([])
+            finally:
+                if self._sock is not None:
+                    self._sock.close()
+                    self._sock = None
+            if self._running:
+                time.sleep(self.reconnect_delay)
+
+    def _update(self, devices):
+        """Apply a full device list from the tracker and notify listeners of changes."""
+        states = dict(devices)
+        online = frozenset(serial for serial, state in states.items() if state == "device")
+        with self._changed:
+            connected = online - self._online
+            disconnected = self._online - online
+            self._states = states
+            self._online = online
+            self._changed.notify_all()
+            listeners = list(self._listeners)
+        self._ready.set()
+
+        for serial in sorted(connected):
+            self.logger.info(f"Device online: {serial}")
+        for serial in sorted(disconnected):
+            self.logger.warning(f"Device offline: {serial}")
+        events = [(serial, True) for serial in sorted(connected)] + [(serial, False) for serial in sorted(disconnected)]
+        for listener in listeners:
+            for serial, is_online in events:
+                try:
+                    listener(serial, is_online)
+                except Exception as e:
+                    # A failing listener must not stop the tracking thread or the other listeners.
+                    self.logger.error(f"Device listener {listener!r} failed for {serial}: {e}")
+
+    def add_listener(self, listener):
+        """Call listener(serial, online) on every connect/disconnect."""
+        with self._changed:
+            self._listeners.append(listener)
+
+    def remove_listener(self, listener):
+        with self._changed:
+            self._listeners.remove(listener)
+
+    def is_online(self, serial):
+        """O(1) check that `serial` is connected and authorized."""
+        return serial in self._online
+
+    def online_devices(self):
+        """Return the serials of all online devices."""
+        return sorted(self._online)
+
+    def state(self, serial):
+        """Return the device's adb state ("device", "offline", ...) or None if unknown."""
+        return self._states.get(serial)
+
+    def wait_for_device(self, serial, timeout=None):
+        """Block until `serial` is online. Returns False if `timeout` expires first."""
+        with self._changed:
+            return self._changed.wait_for(lambda: serial in self._online, timeout)
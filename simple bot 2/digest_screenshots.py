@@ -2,6 +2,8 @@ import os
 import re
 import sqlite3
 from datetime import datetime
+from ocr_cache import CachedEngine, OCRCache
+from ocr_engine import create_engine
 from screenshot_processor import ScreenshotProcessor
 
 class ScreenshotDigestor:
@@ -15,10 +17,25 @@ class ScreenshotDigestor:
 
     FILENAME_PATTERN = re.compile(r"^tile_(\d+)_(\d+)_(\d{8}_\d{6})\.png$")
 
-    def __init__(self, screenshots_dir="screenshots", db_path="map_data.db"):
+    ROIS = {
+        "roi_center": (786, 100, 1019, 137),
+        "roi_popup_castle_darknest": (682, 698, 911, 731),
+        "roi_popup_monster": (340, 715, 569, 746),
+        "roi_popup_rss_tile": (690, 631, 916, 665),
+        "roi_popup_vacant_tile": (690, 458, 904, 491),
+    }
+
+    def __init__(self, screenshots_dir="screenshots", db_path="map_data.db", ocr_cache_path=None,
+                 ocr_service=None):
         self.screenshots_dir = screenshots_dir
         self.db_path = db_path
-        self.processor = ScreenshotProcessor()
+        engine = None
+        if ocr_cache_path:
+            # Opt-in: re-digesting the same screenshots reuses OCR results from earlier runs.
+            # The digestor gets its own cache so the shared engine stays memory-only.
+            engine = CachedEngine(create_engine(), OCRCache(db_path=ocr_cache_path))
+        self.processor = ScreenshotProcessor(engine=engine)
+        self.ocr_service = ocr_service  # Optional OCRService: screenshots are OCR'd in parallel worker processes
         self._initialize_database()
 
     def _initialize_database(self):
@@ -50,30 +67,42 @@ class ScreenshotDigestor:
             adb_x, adb_y = int(adb_x_str), int(adb_y_str)
             screenshot_path = os.path.join(self.screenshots_dir, filename)
 
+            if self.ocr_service is not None:
+                # Queue the file and move on; submit blocks only while the service's queue is full.
+                rois = self.processor.screenshot_rois(*self.ROIS.values())
+                future = self.ocr_service.submit_rois(screenshot_path, rois, coordinate_rois=rois,
+                                                      pipelines=self.processor.screenshot_pipelines(rois))
+                self.ocr_service.then(
+                    future, lambda texts, args=(filename, adb_x, adb_y, date_str):
+                        self.record(*args, *self.processor.coordinates_from_texts(texts)))
+                continue
+
             # Process the screenshot with multiple ROIs
-            center_coords, clicked_coords = self.processor.process_screenshot(
-                screenshot_path=screenshot_path,
-                roi_center=(786, 100, 1019, 137),
-                roi_popup_castle_darknest=(682, 698, 911, 731),
-                roi_popup_monster=(340, 715, 569, 746),
-                roi_popup_rss_tile=(690, 631, 916, 665),
-                roi_popup_vacant_tile=(690, 458, 904, 491)
-            )
-
-            center_k, center_x, center_y = center_coords if center_coords else (None, None, None)
-            clicked_k, clicked_x, clicked_y = clicked_coords if clicked_coords else (None, None, None)
-
-            self.store_in_db(
-                adb_x, adb_y, date_str,
-                center_k, center_x, center_y,
-                clicked_k, clicked_x, clicked_y
-            )
+            center_coords, clicked_coords = self.processor.process_screenshot(screenshot_path, **self.ROIS)
+            self.record(filename, adb_x, adb_y, date_str, center_coords, clicked_coords)
+
+        if self.ocr_service is not None:
+            self.ocr_service.drain()
+        cache = getattr(self.processor.engine, "cache", None)
+        if cache is not None:
+            cache.flush()
+
+    def record(self, filename, adb_x, adb_y, date_str, center_coords, clicked_coords):
+        """Store and print the coordinates read from one screenshot."""
+        center_k, center_x, center_y = center_coords if center_coords else (None, None, None)
+        clicked_k, clicked_x, clicked_y = clicked_coords if clicked_coords else (None, None, None)
+
+        self.store_in_db(
+            adb_x, adb_y, date_str,
+            center_k, center_x, center_y,
+            clicked_k, clicked_x, clicked_y
+        )
 
-            print(f"File: {filename}")
-            print(f"  ADB coords: ({adb_x},{adb_y}) Timestamp: {date_str}")
-            print(f"  Center Tile: {center_coords}")
-            print(f"  Clicked Tile: {clicked_coords}")
-            print("-" * 40)
+        print(f"File: {filename}")
+        print(f"  ADB coords: ({adb_x},{adb_y}) Timestamp: {date_str}")
+        print(f"  Center Tile: {center_coords}")
+        print(f"  Clicked Tile: {clicked_coords}")
+        print("-" * 40)
 
     def store_in_db(self,
                     adb_x, adb_y, date_str,
@@ -95,9 +124,12 @@ class ScreenshotDigestor:
 def main():
     digestor = ScreenshotDigestor(
         screenshots_dir="screenshots",
-        db_path="map_data.db"
+        db_path="map_data.db",
+        ocr_cache_path="ocr_cache.db"
     )
     digestor.digest_all_screenshots()
+    print(f"OCR cache: {digestor.processor.engine.cache.stats()}")
+    digestor.processor.engine.cache.close()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,166 @@
+import socket
+import socketserver
+import subprocess
+import threading
+
+
+class FakeAdbServer:
+    """
+    Minimal stand-in for the adb server, speaking the same socket protocol,
+    so the ADB client can be exercised without adb or a device.
+
+    Supported requests: host:version, host:devices, host:track-devices,
+    host:transport:<serial>, then shell:<cmd>, exec:<cmd> and an interactive
+    shell ("shell:" / "shell,raw:") backed by a local `sh` in which `input`
+    is a no-op. Every device command is recorded in `commands`.
+    """
+
+    def __init__(self, devices=None, outputs=None):
+        """
+        Args:
+            devices (dict): serial -> state (e.g. {"emulator-5554": "device"}).
+            outputs (dict): command -> bytes returned by shell:/exec: services.
+        """
+        self.devices = dict(devices or {"emulator-5554": "device"})
+        self.outputs = dict(outputs or {})
+        self.commands = []
+        self.connections = 0
+        self._changed = threading.Condition()
+        self._server = None
+        self._stopped = False
+
+    @property
+    def port(self):
+        return self._server.server_address[1]
+
+    def start(self):
+        fake = self
+
+        class Handler(socketserver.BaseRequestHandler):
+            def handle(self):
+                fake._handle(self.request)
+
+        self._server = socketserver.ThreadingTCPServer(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True).start()
+        return self
+
+    def stop(self):
+        with self._changed:
+            self._stopped = True
+            self._changed.notify_all()
+        self._server.shutdown()
+        self._server.server_close()
+
+    def set_device_state(self, serial, state):
+        """Add, update or (with state None) remove a device and notify trackers."""
+        with self._changed:
+            if state is None:
+                self.devices.pop(serial, None)
+            else:
+                self.devices[serial] = state
+            self._changed.notify_all()
+
+    # -- protocol --------------------------------------------------------
+
+    @staticmethod
+    def _recv_exact(sock, size):
+        data = b""
+        while len(data) < size:
+            chunk = sock.recv(size - len(data))
+            if not chunk:
+                raise ConnectionError
+            data += chunk
+        return data
+
+    @staticmethod
+    def _okay(sock, payload=None):
+        sock.sendall(b"OKAY" + (b"" if payload is None else FakeAdbServer._prefixed(payload)))
+
+    @staticmethod
+    def _fail(sock, message):
+        sock.sendall(b"FAIL" + FakeAdbServer._prefixed(message))
+
+    @staticmethod
+    def _prefixed(payload):
+        data = payload.encode("utf-8")
+        return b"%04x" % len(data) + data
+
+    def _device_list(self):
+        return "".join(f"{serial}\t{state}\n" for serial, state in self.devices.items())
+
+    def _handle(self, sock):
+        self.connections += 1
+        serial = None
+        try:
+            while True:
+                size = int(self._recv_exact(sock, 4), 16)
+                request = self._recv_exact(sock, size).decode("utf-8")
+                if request == "host:version":
+                    self._okay(sock, "0029")
+                    return
+                if request == "host:devices":
+                    self._okay(sock, self._device_list())
+                    return
+                if request == "host:track-devices":
+                    self._track(sock)
+                    return
+                if request.startswith("host:transport:"):
+                    serial = request[len("host:transport:"):]
+                    if self.devices.get(serial) != "device":
+                        self._fail(sock, f"device '{serial}' not found")
+                        return
+                    self._okay(sock)
+                    continue
+                if serial is None:
+                    self._fail(sock, f"unknown host service '{request}'")
+                    return
+                if request in ("shell:", "shell,raw:"):
+                    self._okay(sock)
+                    self._interactive_shell(sock, serial)
+                    return
+                for prefix in ("shell:", "exec:"):
+                    if request.startswith(prefix):
+                        command = request[len(prefix):]
+                        self.commands.append((serial, command))
+                        self._okay(sock)
+                        sock.sendall(self.outputs.get(command, b""))
+                        return
+                self._fail(sock, f"unknown service '{request}'")
+                return
+        except (ConnectionError, OSError):
+            return
+
+    def _track(self, sock):
+        self._okay(sock)
+        with self._changed:
+            while not self._stopped:
+                sock.sendall(self._prefixed(self._device_list()))
+                self._changed.wait()
+
+    def _interactive_shell(self, sock, serial):
+        shell = subprocess.Popen(["sh"], stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, bufsize=0)
+        shell.stdin.write(b"input() { :; }\n")
+
+        def pump_output():
+            for chunk in iter(lambda: shell.stdout.read(65536), b""):
+                try:
+                    sock.sendall(chunk)
+                except OSError:
+                    break
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+        threading.Thread(target=pump_output, daemon=True).start()
+        reader = sock.makefile("rb")
+        try:
+            for line in iter(reader.readline, b""):
+                self.commands.append((serial, line.decode("utf-8").split("; echo ")[0]))
+                shell.stdin.write(line)
+        except (OSError, ValueError):
+            pass
+        finally:
+            shell.stdin.close()
+            shell.wait()
@@ -0,0 +1,326 @@
+import json
+import logging
+import os
+import time
+
+import cv2
+import numpy as np
+
+from navigation_tool import NavigationTool
+from screencap import encode_png
+from sequence_compiler import KEYCODE_ESCAPE
+from ui_wait import frame_stable, popup_settled, wait_until
+
+
+class FrameCorpus:
+    """
+    Recorded screenshots keyed by (view center, tapped position).
+
+    The corpus is a directory with the PNGs plus an index.json of entries like
+        {"center": [263, 494, 1004], "tap": [790, 450], "file": "263_494_1004_790_450.png"}
+    where "tap" is null for the plain map view (no pop-up open).
+    """
+
+    def __init__(self, corpus_dir):
+        self.corpus_dir = corpus_dir
+        self.index_file = os.path.join(corpus_dir, "index.json")
+        self.entries = {}
+        self._frames = {}
+        if os.path.exists(self.index_file):
+            with open(self.index_file, "r") as f:
+                for entry in json.load(f):
+                    tap = tuple(entry["tap"]) if entry.get("tap") else None
+                    self.entries[(tuple(entry["center"]), tap)] = entry["file"]
+
+    def add(self, center, tap, frame):
+        """Record a frame (BGR array) for a view center and tapped position (None = no pop-up)."""
+        os.makedirs(self.corpus_dir, exist_ok=True)
+        center = tuple(center)
+        tap = tuple(tap) if tap else None
+        name = "_".join(map(str, center + (tap or ("map",)))) + ".png"
+        with open(os.path.join(self.corpus_dir, name), "wb") as f:
+            f.write(encode_png(frame))
+        self.entries[(center, tap)] = name
+        self._frames.pop((center, tap), None)
+
+    def save(self):
+        entries = [{"center": list(center), "tap": list(tap) if tap else None, "file": name}
+                   for (center, tap), name in sorted(self.entries.items(), key=lambda item: item[1])]
+        os.makedirs(self.corpus_dir, exist_ok=True)
+        with open(self.index_file, "w") as f:
+            json.dump(entries, f, indent=4)
+
+    def lookup(self, center, tap, tap_tolerance=0):
+        """
+        Return the recorded frame for (center, tap), decoded once and cached.
+        A tap with no exact recording matches the nearest recorded tap within
+        `tap_tolerance` pixels. Returns None if nothing matches.
+        """
+        key = (tuple(center), tuple(tap) if tap else None)
+        if key not in self.entries and tap and tap_tolerance:
+            candidates = [(abs(t[0] - tap[0]) + abs(t[1] - tap[1]), (c, t))
+                          for (c, t) in self.entries if c == key[0] and t]
+            candidates = [item for item in candidates if item[0] <= tap_tolerance]
+            if candidates:
+                key = min(candidates)[1]
+        if key not in self.entries:
+            return None
+        if key not in self._frames:
+            frame = cv2.imread(os.path.join(self.corpus_dir, self.entries[key]), cv2.IMREAD_COLOR)
+            if frame is None:
+                return None
+            frame.setflags(write=False)
+            self._frames[key] = frame
+        return self._frames[key]
+
+
+class RecordedDevice:
+    """
+    Stand-in for ADBModule that serves screenshots from a FrameCorpus, so scans
+    can run offline and deterministically at CPU speed.
+
+    It tracks the view center from NavigationTool's keypad taps (menu button,
+    field, digits, check, Go) and the pop-up state from tile taps and ESC.
+    """
+
+    def __init__(self, corpus, center=(0, 0, 0), device_id="recorded-device", tap_latency=0.0,
+                 capture_latency=0.0, honor_waits=False, tap_tolerance=0, frame_size=(900, 1600)):
+        """
+        Args:
+            corpus (FrameCorpus or str): The recorded frames (or their directory).
+            center (tuple): Initial view center (kingdom, x, y).
+            tap_latency (float): Simulated seconds per tap/keyevent.
+            capture_latency (float): Simulated seconds per capture.
+            honor_waits (bool): Sleep for "wait" actions in sequences (default: skip them).
+            tap_tolerance (int): Pixel distance within which a tap reuses a nearby recording.
+            frame_size (tuple): (height, width) of the blank frame served when nothing is recorded.
+        """
+        self.corpus = corpus if isinstance(corpus, FrameCorpus) else FrameCorpus(corpus)
+        self.center = tuple(center)
+        self.device_id = device_id
+        self.tap_latency = tap_latency
+        self.capture_latency = capture_latency
+        self.honor_waits = honor_waits
+        self.tap_tolerance = tap_tolerance
+        self.frame_size = frame_size
+        self.logger = logging.getLogger("RecordedDevice")
+        self.popup = None
+        self.nav_fields = None
+        self.active_field = None
+        self.keypad_buffer = ""
+        self.taps = []
+        self.captures = 0
+
+        self._fields_by_position = {pos: name for name, pos in NavigationTool.FIELD_TAP_POSITIONS.items()}
+        self._keys_by_position = {pos: key for key, pos in NavigationTool.KEYPAD_POSITIONS.items()}
+
+    # -- state machine ---------------------------------------------------------
+
+    def _tap(self, x, y):
+        position = (int(x), int(y))
+        self.taps.append(position)
+        if self.tap_latency:
+            time.sleep(self.tap_latency)
+
+        if self.nav_fields is not None:
+            self._navigation_tap(position)
+        elif position == NavigationTool.NAV_MENU_POSITION:
+            self.nav_fields = dict(zip(("kingdom", "x", "y"), self.center))
+        elif self.popup is None:
+            self.popup = position
+
+    def _navigation_tap(self, position):
+        if self.active_field is not None and position in self._keys_by_position:
+            key = self._keys_by_position[position]
+            if key == "check":
+                if self.keypad_buffer:
+                    self.nav_fields[self.active_field] = int(self.keypad_buffer)
+                self.active_field = None
+            else:
+                self.keypad_buffer += key
+        elif position in self._fields_by_position:
+            self.active_field = self._fields_by_position[position]
+            self.keypad_buffer = ""
+        elif position == NavigationTool.GO_BUTTON_POSITION:
+            self.center = (self.nav_fields["kingdom"], self.nav_fields["x"], self.nav_fields["y"])
+            self.nav_fields = None
+            self.popup = None
+
+    def _keyevent(self, keycode):
+        if self.tap_latency:
+            time.sleep(self.tap_latency)
+        if int(keycode) == KEYCODE_ESCAPE:
+            if self.nav_fields is not None:
+                self.nav_fields = None
+                self.active_field = None
+            else:
+                self.popup = None
+
+    def current_frame(self):
+        """The recorded frame for the current state (a blank frame if none was recorded)."""
+        frame = self.corpus.lookup(self.center, self.popup, self.tap_tolerance)
+        if frame is None and self.popup is not None:
+            self.logger.warning(f"No recording for tap {self.popup} at {self.center}. Serving the map view.")
+            frame = self.corpus.lookup(self.center, None)
+        if frame is None:
+            self.logger.warning(f"No recording for view {self.center}. Serving a blank frame.")
+            frame = np.zeros(self.frame_size + (3,), dtype=np.uint8)
+        return frame
+
+    # -- ADBModule interface ------------------------------------------------------
+
+    @staticmethod
+    def _coords(args, count):
+        """Drop an optional leading device_id so both call styles work."""
+        if len(args) > count and (args[0] is None or isinstance(args[0], str)):
+            return args[1:]
+        return args
+
+    def get_device_id(self):
+        return self.device_id
+
+    def list_devices(self):
+        return [self.device_id]
+
+    get_connected_devices = list_devices
+
+    def tap_screen(self, *args):
+        self._tap(*self._coords(args, 2))
+
+    tap = tap_screen
+
+    def swipe(self, *args, duration=300):
+        if self.tap_latency:
+            time.sleep(self.tap_latency)
+
+    def keyevent(self, keycode, device_id=None):
+        self._keyevent(keycode)
+
+    def press_escape(self, device_id=None):
+        self._keyevent(KEYCODE_ESCAPE)
+
+    def execute_shell_command(self, command, device_id=None):
+        return ""
+
+    def capture_frame(self, device=None, save_path=None, decode=True, mode=None):
+        self.captures += 1
+        if self.capture_latency:
+            time.sleep(self.capture_latency)
+        frame = self.current_frame()
+        if save_path or not decode:
+            data = encode_png(frame)
+            if save_path:
+                os.makedirs(os.path.dirname(save_path) or ".", exist_ok=True)
+                with open(save_path, "wb") as f:
+                    f.write(data)
+            if not decode:
+                return data
+        return frame
+
+    def capture_screenshot(self, *args, save_path=None):
+        save_path = args[-1] if args else save_path
+        self.capture_frame(save_path=save_path, decode=False)
+        return save_path
+
+    def wait_until(self, predicate, timeout=2.0, interval=0.0, device=None):
+        return wait_until(self.capture_frame, predicate, timeout, interval)
+
+    def run_sequence(self, sequence, device=None, mode=None, save_path=None):
+        frame = True
+        for action in sequence:
+            kind = action.get("action")
+            if kind == "tap":
+                self._tap(action["x"], action["y"])
+            elif kind == "escape":
+                self._keyevent(KEYCODE_ESCAPE)
+            elif kind == "keyevent":
+                self._keyevent(action["keycode"])
+            elif kind in ("wait", "sleep"):
+                if self.honor_waits:
+                    time.sleep(float(action.get("seconds", 0)))
+            elif kind == "capture":
+                frame = self.capture_frame(save_path=save_path)
+        return frame
+
+    def close(self):
+        pass
+
+
+class CorpusRecorder:
+    """
+    Builds a FrameCorpus from a live device (or anything with ADBModule's interface), for
+    RecordedDevice to replay offline: for each view center it navigates there, records the
+    settled map view, then taps each position, records the settled pop-up and closes it.
+
+        recorder = CorpusRecorder(ADBModule(), "corpus", close_button="templates/close_button.png")
+        recorder.record({(263, 494, 1004): [(790, 450), (640, 300)]})
+    """
+
+    def __init__(self, adb, corpus, close_button=None, settle_timeout=3.0, center=None):
+        """
+        Args:
+            adb: The device to record from (e.g. an ADBModule).
+            corpus (FrameCorpus or str): Where the frames go (or its directory).
+            close_button: Close button template (path or array); a pop-up counts as open once it
+                shows. Without it, once the frame has changed from the map view and settled.
+            settle_timeout (float): Upper bound in seconds on each wait for the UI.
+            center (tuple): The view center the device shows now, if known (skips navigating there).
+        """
+        self.adb = adb
+        self.corpus = corpus if isinstance(corpus, FrameCorpus) else FrameCorpus(corpus)
+        self.close_button = close_button
+        self.settle_timeout = settle_timeout
+        self.center = tuple(center) if center else None
+        self.nav = NavigationTool(adb=adb)
+        self.logger = logging.getLogger("CorpusRecorder")
+
+    def _settled_frame(self, predicate, what):
+        settled, frame = self.adb.wait_until(predicate, self.settle_timeout)
+        if not settled:
+            self.logger.warning(f"{what} did not settle within {self.settle_timeout}s; recording the last frame.")
+        return frame
+
+    def record_view(self, center, taps=()):
+        """
+        Record the map view at `center` and the pop-up of every tap.
+
+        Returns:
+            int: Frames recorded.
+        """
+        center = tuple(center)
+        if center != self.center:
+            reference = self.adb.capture_frame()
+            last = self.center or (None, None, None)
+            self.nav.navigate_to_coordinates(*center, *last)
+            self.nav.wait_for_arrival(timeout=self.settle_timeout, reference=reference)
+            self.center = center
+        map_frame = self._settled_frame(frame_stable(), f"Map view {center}")
+        if map_frame is None:
+            self.logger.error(f"❌ No frame captured at {center}.")
+            return 0
+        self.corpus.add(center, None, map_frame)
+        recorded = 1
+        for tap in taps:
+            self.adb.tap_screen(*tap)
+            frame = self._settled_frame(popup_settled(self.close_button, reference=map_frame), f"Pop-up of {tap}")
+            if frame is not None:
+                self.corpus.add(center, tap, frame)
+                recorded += 1
+            self.adb.press_escape()
+            self._settled_frame(frame_stable(), f"Closing the pop-up of {tap}")
+        return recorded
+
+    def record(self, views):
+        """
+        Record every view and save the corpus index.
+
+        Args:
+            views (dict): View center (kingdom, x, y) -> taps [(x, y), ...].
+
+        Returns:
+            FrameCorpus: The corpus, saved.
+        """
+        recorded = sum(self.record_view(center, taps) for center, taps in views.items())
+        self.corpus.save()
+        self.logger.info(f"Recorded {recorded} frames into {self.corpus.corpus_dir}")
+        return self.corpus
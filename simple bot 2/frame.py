@@ -0,0 +1,115 @@
+import cv2
+
+from screencap import load_grayscale
+
+
+class Frame:
+    """
+    One screenshot, decoded at most once and shared by every ROI extractor.
+
+    The grayscale conversion, per-ROI crops and per-ROI thresholded crops are
+    computed lazily and memoized, so OCR-ing ten regions of a tile costs one
+    decode instead of ten.
+
+        frame = Frame.of("screenshots/popup_90_90.png")   # or a captured array
+        frame.crop((786, 100, 1019, 137))                   # grayscale crop, cached
+        frame.threshold((786, 100, 1019, 137))              # Otsu-binarized crop, cached
+        frame.preprocess((786, 100, 1019, 137), pipeline)   # crop run through an ocr_pipeline.Pipeline, cached
+    """
+
+    def __init__(self, image):
+        """
+        Args:
+            image (str or numpy.ndarray): A screenshot path, or a decoded frame
+                (BGR from PNG captures, RGBA from raw captures, or grayscale).
+        """
+        self.path = image if isinstance(image, str) else None
+        self._image = None if isinstance(image, str) else image
+        self._gray = None
+        self._crops = {}
+        self._thresholds = {}
+        self._preprocessed = {}
+
+    @classmethod
+    def of(cls, image):
+        """Wrap `image` in a Frame unless it already is one."""
+        return image if isinstance(image, cls) else cls(image)
+
+    @property
+    def image(self):
+        """The decoded frame (BGR/RGBA), read from disk on first use. None if unreadable."""
+        if self._image is None and self.path is not None:
+            self._image = cv2.imread(self.path, cv2.IMREAD_COLOR)
+        return self._image
+
+    @property
+    def gray(self):
+        """The grayscale frame, converted once. None if the frame cannot be read."""
+        if self._gray is None:
+            if self._image is None and self.path is not None:
+                # Only grayscale is needed so far: decode straight to it.
+                self._gray = cv2.imread(self.path, cv2.IMREAD_GRAYSCALE)
+            elif self._image is not None:
+                self._gray = load_grayscale(self._image)
+        return self._gray
+
+    @property
+    def shape(self):
+        gray = self.gray
+        return None if gray is None else gray.shape
+
+    def is_valid(self):
+        return self.gray is not None
+
+    def clip(self, roi):
+        """Clamp (x1, y1, x2, y2) to the frame. Returns None if nothing is left."""
+        height, width = self.shape
+        x1, y1, x2, y2 = map(int, roi)
+        x1, y1 = max(0, x1), max(0, y1)
+        x2, y2 = min(width, x2), min(height, y2)
+        if x1 >= x2 or y1 >= y2:
+            return None
+        return x1, y1, x2, y2
+
+    def crop(self, roi):
+        """
+        Grayscale crop of (x1, y1, x2, y2), memoized per ROI.
+        Returns None if the frame is unreadable or the ROI lies outside it.
+        """
+        key = tuple(map(int, roi))
+        if key not in self._crops:
+            if not self.is_valid() or self.clip(key) is None:
+                self._crops[key] = None
+            else:
+                x1, y1, x2, y2 = self.clip(key)
+                self._crops[key] = self.gray[y1:y2, x1:x2]
+        return self._crops[key]
+
+    def threshold(self, roi, method="otsu"):
+        """
+        Binarized crop of `roi`, memoized per (ROI, method).
+
+        Args:
+            method (str): "otsu" (global Otsu threshold) or "adaptive" (Gaussian adaptive threshold).
+        """
+        key = (tuple(map(int, roi)), method)
+        if key not in self._thresholds:
+            cropped = self.crop(roi)
+            if cropped is None:
+                binary = None
+            elif method == "otsu":
+                _, binary = cv2.threshold(cropped, 128, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+            elif method == "adaptive":
+                binary = cv2.adaptiveThreshold(cropped, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY, 11, 2)
+            else:
+                raise ValueError(f"Unknown threshold method: {method}")
+            self._thresholds[key] = binary
+        return self._thresholds[key]
+
+    def preprocess(self, roi, pipeline):
+        """Crop of `roi` run through an ocr_pipeline.Pipeline, memoized per (ROI, pipeline steps)."""
+        key = (tuple(map(int, roi)), pipeline.key)
+        if key not in self._preprocessed:
+            cropped = self.crop(roi)
+            self._preprocessed[key] = None if cropped is None else pipeline.apply(cropped)
+        return self._preprocessed[key]
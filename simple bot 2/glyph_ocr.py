@@ -0,0 +1,438 @@
+"""
+Template-based glyph recognizer for the K/X/Y coordinate readouts.
+
+The coordinate banners ("K:263 X:494 Y:1004") use one fixed game font and the
+alphabet "KXY:0-9", so instead of a Tesseract call per ROI the binarized crop
+is split into connected components (the two dots of ":" are merged) and every
+glyph is matched against a learned bank with one normalized-correlation matrix
+product. Readings below `min_confidence` fall back to Tesseract.
+
+The bank only bypasses Tesseract once it is trusted: its confident readings
+must have agreed with known-correct labels at least `min_verified_accuracy`
+of the time over `min_verified_samples` checks. Until then every crop goes to
+Tesseract, so a bank built from the wrong font cannot produce confident
+misreads. The agreement is measured on held-out real crops by
+train_from_crops / train_from_roi_log, and updated at run time whenever a
+reading is verified against the expected coordinates.
+
+With learn=True, verified fallback readings are learned into the bank, so it
+adapts to the real font: a reading is verified when it matches the expected
+coordinates, or when a second fallback read of another crop agrees with it. A
+single unverified Tesseract reading is never learned, since one misread would
+stay in the bank for good.
+
+    glyphs = GlyphOCR()
+    glyphs.read_coordinates(gray_crop)  # -> (263, 494, 1004) or None
+
+Train a bank on the labelled coordinate boxes of real screenshots
+(roi_log.csv from screenshot_rename_crop.py):
+
+    python glyph_ocr.py train roi_log.csv --screenshots screenshots
+
+A starter bank can be bootstrapped from the coordinate strings in
+ocr_debug_log.txt, rendered with a stand-in font. It is never trusted on its
+own; it only gives learning a head start:
+
+    python glyph_ocr.py bootstrap ocr_debug_log.txt
+"""
+
+import logging
+import os
+import re
+
+import cv2
+import numpy as np
+
+from ocr_engine import get_engine
+
+logger = logging.getLogger("GlyphOCR")
+
+ALPHABET = "KXY:0123456789"
+GLYPH_SIZE = (12, 20)  # (width, height) every glyph is resampled to
+COORD_REGEX = re.compile(r"K\s*:?\s*(\d{1,5})\s*X\s*:?\s*(\d{1,5})\s*Y\s*:?\s*(\d{1,5})", re.IGNORECASE)
+FALLBACK_CONFIG = f"--psm 7 -c tessedit_char_whitelist={ALPHABET}"
+DEFAULT_BANK = "templates/glyph_bank.npz"
+
+
+def binarize(crop):
+    """Otsu-binarize a grayscale crop so the text is white (255) on black."""
+    _, binary = cv2.threshold(crop, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+    if np.count_nonzero(binary) > binary.size // 2:
+        binary = cv2.bitwise_not(binary)  # Dark text on a light banner
+    return binary
+
+
+def segment(binary, min_area=4):
+    """
+    Split a binarized crop into glyph boxes (x1, y1, x2, y2), left to right.
+    Components that overlap horizontally (the dots of ":") are merged.
+    """
+    count, _, stats, _ = cv2.connectedComponentsWithStats(binary, connectivity=8)
+    boxes = sorted(
+        [x, y, x + w, y + h] for x, y, w, h, area in stats[1:] if area >= min_area
+    )
+    merged = []
+    for box in boxes:
+        if merged and box[0] < merged[-1][2]:
+            last = merged[-1]
+            merged[-1] = [min(last[0], box[0]), min(last[1], box[1]), max(last[2], box[2]), max(last[3], box[3])]
+        else:
+            merged.append(box)
+    return [tuple(box) for box in merged]
+
+
+def glyph_vectors(binary, boxes):
+    """Resample each glyph to GLYPH_SIZE and return zero-mean, unit-norm row vectors."""
+    vectors = np.empty((len(boxes), GLYPH_SIZE[0] * GLYPH_SIZE[1]), dtype=np.float32)
+    for i, (x1, y1, x2, y2) in enumerate(boxes):
+        glyph = cv2.resize(binary[y1:y2, x1:x2], GLYPH_SIZE, interpolation=cv2.INTER_AREA).astype(np.float32).ravel()
+        glyph -= glyph.mean()
+        norm = np.linalg.norm(glyph)
+        vectors[i] = glyph / norm if norm else glyph
+    return vectors
+
+
+def _spaced(labels, boxes):
+    """Join labels, inserting a space where the gap is clearly wider than the usual letter gap."""
+    if not labels:
+        return ""
+    gaps = [box[0] - previous[2] for previous, box in zip(boxes, boxes[1:])]
+    height = np.median([y2 - y1 for _, y1, _, y2 in boxes])
+    space = max(2.5 * np.median(gaps), 0.25 * height) if gaps else 0
+    text = labels[0]
+    for label, gap in zip(labels[1:], gaps):
+        if gap > space:
+            text += " "
+        text += label
+    return text
+
+
+class GlyphBank:
+    """Labelled glyph vectors; matching is one matrix product against all of them."""
+
+    def __init__(self, max_per_label=20):
+        self.max_per_label = max_per_label
+        self.labels = np.empty(0, dtype="<U1")
+        self.vectors = np.empty((0, GLYPH_SIZE[0] * GLYPH_SIZE[1]), dtype=np.float32)
+        self.checked = 0  # Confident readings compared with a known-correct label
+        self.agreed = 0   # ... and how many of them matched it
+
+    @property
+    def agreement(self):
+        return self.agreed / self.checked if self.checked else 0.0
+
+    def __len__(self):
+        return len(self.labels)
+
+    def add(self, labels, vectors):
+        """Add glyph vectors; returns how many were kept (each label holds at most max_per_label)."""
+        keep = []
+        counts = {label: int(np.count_nonzero(self.labels == label)) for label in set(labels)}
+        for i, label in enumerate(labels):
+            if counts[label] < self.max_per_label:
+                counts[label] += 1
+                keep.append(i)
+        if keep:
+            self.labels = np.concatenate([self.labels, np.array([labels[i] for i in keep], dtype="<U1")])
+            self.vectors = np.vstack([self.vectors, vectors[keep]])
+        return len(keep)
+
+    def match(self, vectors):
+        """Return (labels, scores): the best bank label and its correlation for each vector."""
+        if not len(self) or not len(vectors):
+            return [], np.zeros(len(vectors), dtype=np.float32)
+        scores = vectors @ self.vectors.T
+        best = scores.argmax(axis=1)
+        return list(self.labels[best]), scores[np.arange(len(vectors)), best]
+
+    def save(self, path):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        np.savez_compressed(path, labels=self.labels, vectors=self.vectors,
+                            verification=np.array([self.checked, self.agreed], dtype=np.int64))
+
+    @classmethod
+    def load(cls, path, max_per_label=20):
+        bank = cls(max_per_label)
+        with np.load(path) as data:
+            bank.labels = data["labels"]
+            bank.vectors = data["vectors"].astype(np.float32)
+            if "verification" in data:  # Banks saved before verification was tracked are untrusted
+                bank.checked, bank.agreed = (int(v) for v in data["verification"])
+        return bank
+
+
+class GlyphOCR:
+    """Reads coordinate banners from the glyph bank, falling back to Tesseract when unsure."""
+
+    def __init__(self, bank_path=DEFAULT_BANK, min_confidence=0.85, engine=None, learn=False, save_every=50,
+                 max_pending=256, min_verified_accuracy=0.99, min_verified_samples=50):
+        """
+        Args:
+            bank_path (str): .npz glyph bank (created when glyphs are learned; None keeps it in memory).
+            min_confidence (float): Lowest per-glyph correlation accepted without a fallback.
+            min_verified_accuracy (float): Agreement with verified labels the bank needs before it
+                may bypass the fallback engine.
+            min_verified_samples (int): Verified confident readings needed before that.
+            engine (OCREngine): Fallback engine (defaults to the shared one, created on first fallback).
+            learn (bool): Learn glyphs from verified fallback readings (see confirm).
+            save_every (int): Learned glyphs between bank saves; save() or close() writes the rest.
+            max_pending (int): Unverified readings kept while waiting for an agreeing read.
+        """
+        self.bank_path = bank_path
+        self.min_confidence = min_confidence
+        self.engine = engine
+        self.learn_from_fallback = learn
+        self.save_every = save_every
+        self.max_pending = max_pending
+        self.min_verified_accuracy = min_verified_accuracy
+        self.min_verified_samples = min_verified_samples
+        self.bank = GlyphBank.load(bank_path) if bank_path and os.path.exists(bank_path) else GlyphBank()
+        self.stats = {"glyph": 0, "fallback": 0, "learned": 0, "rejected": 0, "disagreed": 0}
+        self._pending = {}  # (K, X, Y) -> (crop, text) of a reading not yet confirmed by a second one
+        self._unsaved = 0
+
+    def recognize(self, crop):
+        """
+        Read a grayscale crop from the glyph bank alone.
+
+        Returns:
+            tuple: (text, confidence) where confidence is the weakest glyph's correlation (0.0 if
+            nothing was recognized).
+        """
+        binary = binarize(crop)
+        boxes = segment(binary)
+        labels, scores = self.bank.match(glyph_vectors(binary, boxes))
+        if not labels:
+            return "", 0.0
+        return _spaced(labels, boxes), float(scores.min())
+
+    def learn(self, crop, text):
+        """Add the glyphs of `crop` labelled with `text`. Returns False if the segmentation does not line up."""
+        label_chars = [c for c in text.upper() if not c.isspace()]
+        if any(c not in ALPHABET for c in label_chars):
+            return False
+        binary = binarize(crop)
+        boxes = segment(binary)
+        if len(boxes) != len(label_chars):
+            return False
+        added = self.bank.add(label_chars, glyph_vectors(binary, boxes))
+        if added:
+            self.stats["learned"] += added
+            self._unsaved += added
+            if self._unsaved >= self.save_every:
+                self.save()
+        return True
+
+    def save(self):
+        """Write glyphs learned since the last save to the bank file (no-op in memory)."""
+        if self.bank_path and self._unsaved:
+            self.bank.save(self.bank_path)
+        self._unsaved = 0
+
+    def close(self):
+        self.save()
+
+    @property
+    def trusted(self):
+        """True once the bank's confident readings have agreed often enough with verified labels."""
+        return (self.bank.checked >= self.min_verified_samples
+                and self.bank.agreement >= self.min_verified_accuracy)
+
+    def _confident_reading(self, crop):
+        """(K, X, Y) the bank reads confidently from `crop`, or None."""
+        text, confidence = self.recognize(crop)
+        match = COORD_REGEX.search(text) if confidence >= self.min_confidence else None
+        return (tuple(map(int, match.groups())), text, confidence) if match else None
+
+    def verify(self, crop, expected):
+        """
+        Compare the bank's confident reading of `crop` with the known-correct (K, X, Y) and
+        count the result towards the bank's agreement rate. Returns the agreement (None if
+        the bank was not confident).
+        """
+        reading = self._confident_reading(crop)
+        if reading is None:
+            return None
+        agreed = reading[0] == tuple(expected)
+        self.bank.checked += 1
+        self.bank.agreed += agreed
+        if not agreed:
+            self.stats["disagreed"] += 1
+            logger.debug(f"Glyph bank read '{reading[1]}' where {tuple(expected)} was verified.")
+        return agreed
+
+    def read_confident(self, crop):
+        """
+        Glyph-bank-only read for callers that batch their own fallback OCR.
+        Returns (text, confidence) when the bank is trusted, every glyph matched confidently
+        and the text parses as coordinates, else None (OCR the crop and hand the result to
+        confirm()).
+        """
+        if not self.trusted:
+            return None
+        reading = self._confident_reading(crop)
+        if reading is None:
+            return None
+        self.stats["glyph"] += 1
+        return reading[1], reading[2]
+
+    def confirm(self, crop, text, expected=None):
+        """
+        Record a fallback reading of `crop`. With learning on, its glyphs are learned once the
+        reading is verified: it equals `expected` (K, X, Y), or, without an expectation, a
+        fallback read of another crop gave the same coordinates.
+        """
+        self.stats["fallback"] += 1
+        match = COORD_REGEX.search(text)
+        if not match:
+            return
+        reading = tuple(map(int, match.groups()))
+        if not self.learn_from_fallback:
+            if expected is not None and tuple(expected) == reading:
+                self.verify(crop, reading)
+            return
+        if expected is not None:
+            if tuple(expected) != reading:
+                self.stats["rejected"] += 1
+                logger.debug(f"'{text}' does not match the expected {expected}; not learned.")
+                return
+            self.verify(crop, reading)
+            self._learn_verified(crop, text)
+            return
+        earlier = self._pending.pop(reading, None)
+        if earlier is None:
+            self._pending[reading] = (np.array(crop, copy=True), text)
+            if len(self._pending) > self.max_pending:
+                self._pending.pop(next(iter(self._pending)))
+            return
+        self._learn_verified(*earlier)
+        self._learn_verified(crop, text)
+
+    def _learn_verified(self, crop, text):
+        if not self.learn(crop, text):
+            logger.debug(f"Could not align '{text}' with the crop's glyphs; not learned.")
+
+    def read(self, crop, expected=None):
+        """
+        Read a coordinate banner: glyph bank first, Tesseract when the match is weak.
+        `expected` (K, X, Y), when known, verifies the fallback reading for learning.
+
+        Returns:
+            tuple: (text, source) with source "glyph" or "fallback".
+        """
+        confident = self.read_confident(crop)
+        if confident is not None:
+            return confident[0], "glyph"
+        engine = self.engine or get_engine()
+        text = engine.image_to_string(crop, config=FALLBACK_CONFIG).strip()
+        self.confirm(crop, text, expected)
+        return text, "fallback"
+
+    def read_coordinates(self, crop, expected=None):
+        """Return (K, X, Y) read from the crop, or None."""
+        if crop is None or not crop.size:
+            return None
+        match = COORD_REGEX.search(self.read(crop, expected)[0])
+        return tuple(map(int, match.groups())) if match else None
+
+
+def load_debug_log(path="ocr_debug_log.txt"):
+    """Return every "K:.. X:.. Y:.." reading found in the OCR debug log, normalized."""
+    with open(path, "r", encoding="utf-8", errors="replace") as f:
+        return [f"K:{k} X:{x} Y:{y}" for k, x, y in COORD_REGEX.findall(f.read())]
+
+
+def render_text(text, scale=1.0, thickness=2):
+    """Render `text` as a dark-on-light grayscale banner (a stand-in for the game font)."""
+    font = cv2.FONT_HERSHEY_SIMPLEX
+    (width, height), baseline = cv2.getTextSize(text, font, scale, thickness)
+    image = np.full((height + baseline + 10, width + 10), 230, dtype=np.uint8)
+    cv2.putText(image, text, (5, height + 5), font, scale, 20, thickness, cv2.LINE_AA)
+    return image
+
+
+def train_from_crops(samples, bank_path=DEFAULT_BANK, validation_split=0.2, **kwargs):
+    """
+    Build a bank from labelled crops of real frames: learn the glyphs of the first
+    samples, then verify the bank on the held-out rest. The verification counts are
+    saved with the bank, so GlyphOCR trusts it only if enough of them agreed.
+
+    Args:
+        samples (list): (grayscale crop, "K:<k> X:<x> Y:<y>") pairs.
+        bank_path (str): Where to save the bank (None keeps it in memory).
+        **kwargs: Passed to GlyphOCR (e.g. min_confidence, min_verified_accuracy).
+
+    Returns:
+        tuple: (GlyphOCR, agreement on the held-out samples)
+    """
+    split = max(1, int(len(samples) * (1 - validation_split)))
+    glyphs = GlyphOCR(bank_path=None, learn=False, **kwargs)
+    skipped = sum(not glyphs.learn(crop, text) for crop, text in samples[:split])
+    if skipped:
+        logger.info(f"{skipped} training crops did not segment into their label's glyphs.")
+    for crop, text in samples[split:]:
+        glyphs.verify(crop, tuple(map(int, COORD_REGEX.search(text).groups())))
+    if bank_path:
+        glyphs.bank.save(bank_path)
+        glyphs.bank_path = bank_path
+    return glyphs, glyphs.bank.agreement
+
+
+def train_from_roi_log(csv_path="roi_log.csv", screenshots_dir="screenshots", bank_path=DEFAULT_BANK, **kwargs):
+    """train_from_crops on the labelled coordinate boxes of roi_log.csv (screenshot_rename_crop.py)."""
+    from frame import Frame
+    from ocr_batch import normalize_roi
+    from ocr_pipeline import load_roi_log
+
+    samples = []
+    for path, roi, text in load_roi_log(csv_path, screenshots_dir):
+        crop = Frame(path).crop(normalize_roi(roi))
+        if crop is not None and crop.size:
+            samples.append((crop, text))
+    return train_from_crops(samples, bank_path, **kwargs)
+
+
+def bootstrap_from_log(log_path="ocr_debug_log.txt", bank_path=DEFAULT_BANK, validation_split=0.2):
+    """
+    Build a starter bank from the debug log's coordinate strings: train on
+    renders of the first readings and report accuracy on the held-out rest.
+    The renders use a stand-in font, so the bank is saved unverified: it never
+    bypasses Tesseract until real verified readings vouch for it.
+
+    Returns:
+        tuple: (GlyphOCR, accuracy on the validation readings)
+    """
+    readings = sorted(set(load_debug_log(log_path)))
+    split = max(1, int(len(readings) * (1 - validation_split)))
+    glyphs = GlyphOCR(bank_path=None, learn=False)
+    for text in readings[:split]:
+        glyphs.learn(render_text(text), text)
+
+    validation = readings[split:]
+    correct = sum(glyphs.recognize(render_text(text, scale=1.1))[0] == text for text in validation)
+    accuracy = correct / len(validation) if validation else 0.0
+    if bank_path:
+        glyphs.bank.save(bank_path)
+        glyphs.bank_path = bank_path
+    return glyphs, accuracy
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Glyph bank tools for coordinate OCR.")
+    parser.add_argument("command", choices=["train", "bootstrap"])
+    parser.add_argument("log", nargs="?", help="roi_log.csv (train) or ocr_debug_log.txt (bootstrap)")
+    parser.add_argument("--screenshots", default="screenshots", help="Renamed screenshots roi_log.csv refers to")
+    parser.add_argument("--bank", default=DEFAULT_BANK)
+    args = parser.parse_args()
+
+    if args.command == "train":
+        glyphs, accuracy = train_from_roi_log(args.log or "roi_log.csv", args.screenshots, args.bank)
+        state = "trusted" if glyphs.trusted else "not trusted yet"
+        print(f"Bank of {len(glyphs.bank)} glyphs saved to {args.bank}; {accuracy:.1%} agreement over "
+              f"{glyphs.bank.checked} verified crops ({state})")
+    else:
+        glyphs, accuracy = bootstrap_from_log(args.log or "ocr_debug_log.txt", args.bank)
+        print(f"Bank of {len(glyphs.bank)} glyphs saved to {args.bank}; validation accuracy {accuracy:.1%} "
+              f"(unverified: it does not bypass Tesseract)")
@@ -8,6 +8,9 @@ with open(roi_file, "r") as f:
 fixed_rois = {}
 
 for key, roi_list in rois.items():
+    if key == "pipelines":  # OCR preprocessing settings, not ROIs (see ocr_pipeline.py)
+        fixed_rois[key] = roi_list
+        continue
     fixed_rois[key] = []
     for roi in roi_list:
         if len(roi) == 4:
@@ -2,7 +2,7 @@ import logging
 import ast
 import time
 from multiprocessing import Process, Lock, Manager
-from adb_module import ADBModule
+from unified_adb import ADBModule
 from navigation_tool import NavigationTool
 
 
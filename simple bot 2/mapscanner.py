@@ -2,29 +2,52 @@ import json
 import os
 import sqlite3
 import time
-import random
-import cv2
-import pytesseract
+import queue
 import re
 from datetime import datetime
-from adb_module import ADBModule
+from unified_adb import ADBModule
 from screenshot_processor import ScreenshotProcessor
+from frame import Frame
+from glyph_ocr import GlyphOCR
+from ocr_batch import normalize_roi, ocr_rois
+from ocr_engine import get_engine
+from ocr_pipeline import load_pipelines, pipeline_for
+from roi_fallback import FallbackChain
+from screencap import encode_png
+from ui_wait import frame_stable, popup_settled, wait_until
 from PIL import Image
 from fuzzywuzzy import fuzz  # Install with: pip install fuzzywuzzy
 
 
 class MapScanner:
-    def __init__(self, screenshots_dir="screenshots", db_path="map_data.db", step=100, roi_file="rois.json"):
+    # Where pop-up text shows up when a pop-up is open
+    POPUP_ROIS = [
+        (700, 200, 1100, 350),
+        (650, 190, 1150, 370),
+        (725, 220, 1075, 340)
+    ]
+    # View-center banner (as in digest_screenshots.py)
+    VIEW_CENTER_ROI = (786, 100, 1019, 137)
+
+    def __init__(self, screenshots_dir="screenshots", db_path="map_data.db", step=100, roi_file="rois.json", adb=None, settle_timeout=1.0, ocr_service=None,
+                 processor=None, engine=None):
         self.screenshots_dir = screenshots_dir
         self.db_path = db_path
         self.step = step
-        self.processor = ScreenshotProcessor()
-        self.adb = ADBModule()
+        self.processor = processor or ScreenshotProcessor()
+        self.adb = adb or ADBModule()
         self.roi_file = roi_file
-        self.ocr_config = r'--psm 6'  # OCR mode
+        self.settle_timeout = settle_timeout  # Upper bound on waiting for the UI (the old fixed sleep)
+        self.ocr_engine = engine or get_engine()
+        self.glyphs = GlyphOCR(engine=self.ocr_engine, learn=False)
+        self.ocr_service = ocr_service  # Optional OCRService: OCR runs in worker processes while tapping continues
+        self.coordinate_chain = FallbackChain("tile coordinates")  # Learned ocr_regions order with early exit
+        self._results = queue.Queue()  # (adb_x, adb_y, frame, future) of OCR jobs that have finished
+        self._outstanding = 0  # OCR jobs submitted whose results have not been handled yet
 
         with open(self.roi_file, "r") as f:
             self.rois = json.load(f)
+        self.pipelines = load_pipelines(self.roi_file)  # Per-ROI-type preprocessing and Tesseract config
 
         self._initialize_database()
 
@@ -46,53 +69,199 @@ class MapScanner:
             """)
 
     def process_tile(self, adb_x, adb_y):
-        """Processes a single tile: taps, extracts info, and logs results."""
+        """
+        Processes a single tile: taps, extracts info, and logs results. With an OCR service
+        the tile is classified later, on this thread, by handle_results() or drain().
+        """
+        self.handle_results()
         print(f"🔍 Processing tile at ({adb_x}, {adb_y})")
 
-        self.adb.tap_screen(adb_x, adb_y)
-        time.sleep(random.uniform(0.6, 1.0))  
+        # Tap and capture in one round trip, then keep capturing only until the pop-up has settled.
+        pending = [self.tile_sequence(adb_x, adb_y)]
 
-        screenshot_path = os.path.join(self.screenshots_dir, f"popup_{adb_x}_{adb_y}.png")
-        success = self.adb.capture_screenshot(screenshot_path)
+        def capture():
+            return self.adb.run_sequence(pending.pop()) if pending else self.adb.capture_frame()
+
+        try:
+            settled, frame = wait_until(capture, popup_settled(self.processor.close_button_np), self.settle_timeout)
+        except RuntimeError as e:
+            print(f"❌ ADB failed while capturing ({adb_x}, {adb_y}): {e}")
+            return
 
-        if not success or not os.path.exists(screenshot_path):
+        if frame is None:
             print(f"❌ Failed to capture valid screenshot for ({adb_x}, {adb_y})")
             return
 
-        if not self.is_popup_present(screenshot_path):
+        screenshot_path = os.path.join(self.screenshots_dir, f"popup_{adb_x}_{adb_y}.png")
+        os.makedirs(self.screenshots_dir, exist_ok=True)
+        with open(screenshot_path, "wb") as f:
+            f.write(encode_png(frame))
+
+        # Decode once; every ROI below is a memoized crop of this frame.
+        frame = Frame(frame)
+
+        if self.ocr_service is not None and settled:
+            # The pop-up is known to be open: hand the frame to the OCR workers and move on right away.
+            # Every coordinate region goes to the workers, so classifying never OCRs inline.
+            rois, coordinate_rois = self.tile_rois(include_popup_check=False, all_coordinates=True)
+            future = self.ocr_service.submit_rois(frame, rois, coordinate_rois=coordinate_rois,
+                                                  pipelines=self.tile_pipelines(rois))
+            self._queue_result(adb_x, adb_y, frame, future)
+            self.dismiss_popup(adb_x, adb_y)
+            return future
+
+        # One engine pass reads every ROI the checks below need.
+        texts = self.read_tile_text(frame, include_popup_check=not settled)
+        if self._classify_tile(adb_x, adb_y, frame, texts, settled):
+            self.dismiss_popup(adb_x, adb_y)
+
+    def _queue_result(self, adb_x, adb_y, frame, future):
+        """Queue the OCR future of a tile for handle_results() once it is done."""
+        self._outstanding += 1
+        # The worker callback thread only queues the result; the scanner's state stays on this thread.
+        future.add_done_callback(lambda done: self._results.put((adb_x, adb_y, frame, done)))
+
+    def handle_results(self, block=False, timeout=None):
+        """
+        Classify and store the tiles whose OCR has finished.
+
+        Args:
+            block (bool): Wait for a result when none is ready yet (at most `timeout` seconds).
+
+        Returns:
+            int: Tiles handled.
+        """
+        handled = 0
+        while self._outstanding:
+            try:
+                adb_x, adb_y, frame, done = self._results.get(block=block and not handled, timeout=timeout)
+            except queue.Empty:
+                break
+            self._outstanding -= 1
+            handled += 1
+            try:
+                texts = done.result()
+            except Exception as e:
+                print(f"❌ OCR failed for tile ({adb_x}, {adb_y}): {e}")
+                continue
+            self._classify_tile(adb_x, adb_y, frame, texts, True)
+        return handled
+
+    def drain(self, timeout=None):
+        """
+        Block until every tile handed to the OCR service has been classified and stored.
+
+        Returns:
+            bool: False if `timeout` expired first.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self._outstanding:
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                return False
+            self.handle_results(block=True, timeout=remaining)
+        return True
+
+    def _classify_tile(self, adb_x, adb_y, frame, texts, settled):
+        """Classify a tile from its OCR'd ROIs and store it. Returns False if no pop-up was found."""
+        # A settled frame already shows the Close button, so the OCR check is only needed on timeout.
+        if not settled and not self.is_popup_present(frame, texts):
             print(f"⚠️ No pop-up detected at ({adb_x}, {adb_y}). Skipping OCR.")
-            return
+            return False
 
-        k_val, x_val, y_val = self.extract_tile_coordinates(screenshot_path)
-        node_type = self.determine_tile_type(screenshot_path)
+        k_val, x_val, y_val = self.extract_tile_coordinates(frame, texts)
+        node_type = self.determine_tile_type(frame, texts)
 
         print(f"📍 Tile ({adb_x}, {adb_y}) detected as {node_type} at K:{k_val}, X:{x_val}, Y:{y_val}")
 
         self.store_in_db(adb_x, adb_y, k_val, x_val, y_val, node_type)
+        return True
 
+    def dismiss_popup(self, adb_x, adb_y):
+        """Close the pop-up with ESC and wait for the map to stop moving."""
         print(f"⬅️ Pressing ESC to close pop-up for ({adb_x}, {adb_y})")
         self.adb.press_escape()
-        time.sleep(random.uniform(0.4, 0.8))
-
-    def is_popup_present(self, screenshot_path):
-        """Detects if a pop-up is visible before running OCR."""
-        possible_popup_rois = [
-            (700, 200, 1100, 350),
-            (650, 190, 1150, 370),
-            (725, 220, 1075, 340)
+        self.adb.wait_until(frame_stable(), self.settle_timeout)
+
+    def tile_sequence(self, adb_x, adb_y, close_popup=False):
+        """
+        Action sequence for one tile: tap and capture, and optionally close the
+        pop-up with ESC in the same round trip. There is no fixed wait; the caller
+        polls with wait_until until the pop-up has settled.
+        """
+        sequence = [
+            {"action": "tap", "x": adb_x, "y": adb_y},
+            {"action": "capture"},
         ]
-
-        time.sleep(0.5)
-
-        for roi in possible_popup_rois:
-            extracted_text = self.ocr_from_roi(screenshot_path, roi)
+        if close_popup:
+            sequence.append({"action": "escape"})
+        return sequence
+
+    def read_tile_text(self, image, include_popup_check=True):
+        """
+        OCR every ROI used by is_popup_present, extract_tile_coordinates and
+        determine_tile_type in a single batched engine pass.
+
+        Returns:
+            dict: ROI name (see _roi_name) -> {"text", "conf"}.
+        """
+        rois, coordinate_rois = self.tile_rois(include_popup_check)
+        return ocr_rois(image, rois, engine=self.ocr_engine, glyphs=self.glyphs, coordinate_rois=coordinate_rois,
+                        pipelines=self.tile_pipelines(rois))
+
+    def tile_rois(self, include_popup_check=True, all_coordinates=False):
+        """
+        All ROIs read for a tile, by name, and the names of the coordinate-banner ROIs among them.
+        Only the best-ranked coordinate region is included unless `all_coordinates` is set.
+        """
+        rois = {}
+        if include_popup_check:
+            for i, roi in enumerate(self.POPUP_ROIS):
+                rois[self._roi_name("popup", i)] = roi
+        # By default only the best-ranked coordinate region; extract_tile_coordinates reads the rest if needed.
+        regions = self.coordinate_regions()
+        for name in self.coordinate_chain.order(list(regions))[:None if all_coordinates else 1]:
+            rois[name] = regions[name]
+        for node_type, node_rois in self.rois["node_types"].items():
+            for i, roi in enumerate(node_rois):
+                rois[self._roi_name(node_type, i)] = roi
+        coordinate_rois = [name for name in regions if name in rois]
+        return rois, coordinate_rois
+
+    def coordinate_regions(self):
+        """ROI name -> box for every configured coordinate region, in rois.json order."""
+        return {self._roi_name("ocr_region", i): roi for i, roi in enumerate(self.rois["ocr_regions"])}
+
+    @staticmethod
+    def _roi_name(group, index):
+        return f"{group}:{index}"
+
+    def _pipeline(self, group):
+        """Pipeline of a ROI group: the rois.json type it comes from ("popup" ROIs are "popups")."""
+        roi_type = {"popup": "popups", "ocr_region": "ocr_regions"}.get(group, "node_types")
+        return pipeline_for(self.pipelines, roi_type)
+
+    def tile_pipelines(self, rois):
+        """ROI name -> Pipeline for the names returned by tile_rois."""
+        return {name: self._pipeline(name.split(":")[0]) for name in rois}
+
+    def _text(self, image, texts, group, index, roi):
+        """Text of one ROI: from the batched results when given, else a single OCR call."""
+        if texts is not None and self._roi_name(group, index) in texts:
+            return texts[self._roi_name(group, index)]["text"]
+        return self.ocr_from_roi(image, roi, self._pipeline(group))
+
+    def is_popup_present(self, image, texts=None):
+        """Detects if a pop-up is visible before running OCR."""
+        for i, roi in enumerate(self.POPUP_ROIS):
+            extracted_text = self._text(image, texts, "popup", i, roi)
             if len(extracted_text.strip()) > 2:
                 print(f"🔍 Pop-up detected using ROI: {roi}")
                 return True
 
         return False
 
-    def determine_tile_type(self, screenshot_path):
+    def determine_tile_type(self, image, texts=None):
         """Determines the tile type dynamically using fuzzy matching."""
         priority_order = {
             "castle": ["troops killed", "might"],
@@ -103,8 +272,8 @@ class MapScanner:
         }
 
         for node_type, keywords in priority_order.items():
-            for roi in self.rois["node_types"].get(node_type, []):
-                extracted_text = self.ocr_from_roi(screenshot_path, roi)
+            for i, roi in enumerate(self.rois["node_types"].get(node_type, [])):
+                extracted_text = self._text(image, texts, node_type, i, roi)
                 for keyword in keywords:
                     similarity = fuzz.ratio(keyword, extracted_text)
                     if similarity > 75:
@@ -114,39 +283,50 @@ class MapScanner:
         print(f"⚠️ No match found. Tile classified as 'unknown'.")
         return "unknown"
 
-    def extract_tile_coordinates(self, screenshot_path):
-        """Extracts (K, X, Y) from OCR."""
-        for roi in self.rois["ocr_regions"]:
-            extracted_text = self.ocr_from_roi(screenshot_path, roi)
-            match = self.parse_coordinates(extracted_text)
-            if match:
-                return match
-
-        return None, None, None
-
-    def ocr_from_roi(self, image_path, roi):
-        """Extracts text from a specified ROI using OCR."""
-        x1, y1, x2, y2 = sorted(map(int, roi))
-
-        img = cv2.imread(image_path, cv2.IMREAD_GRAYSCALE)
-        if img is None:
-            print(f"❌ Could not read image: {image_path}")
+    def extract_tile_coordinates(self, image, texts=None):
+        """
+        Extracts (K, X, Y) from OCR. `texts` are optional batched results from read_tile_text.
+        Regions are tried in learned order and the first confident parse wins; regions missing
+        from `texts` are OCR'd in one batch only when needed.
+        """
+        regions = self.coordinate_regions()
+
+        def read(names):
+            results = {name: texts[name] for name in names if texts is not None and name in texts}
+            missing = {name: regions[name] for name in names if name not in results}
+            if missing:
+                results.update(ocr_rois(image, missing, engine=self.ocr_engine, glyphs=self.glyphs,
+                                        coordinate_rois=missing, pipelines=self.tile_pipelines(missing)))
+            return results
+
+        def parse(text):
+            coords = self.parse_coordinates(text)
+            return coords if coords[0] is not None else None
+
+        _, coords = self.coordinate_chain.run(list(regions), read, parse)
+        return coords or (None, None, None)
+
+    def ocr_from_roi(self, image, roi, pipeline=None):
+        """
+        Extracts text from a specified ROI using OCR. `image` is a path, a decoded frame or a
+        Frame; pass a Frame to share the decode and preprocessed crops across ROIs.
+        `pipeline` defaults to the "default" pipeline of rois.json.
+        """
+        x1, y1, x2, y2 = normalize_roi(roi)
+
+        frame = Frame.of(image)
+        if not frame.is_valid():
+            print(f"❌ Could not read image: {image}")
             return ""
 
-        height, width = img.shape
-        x1, y1 = max(0, x1), max(0, y1)
-        x2, y2 = min(width, x2), min(height, y2)
-
-        if x1 >= x2 or y1 >= y2:
+        # Enhance image for OCR
+        pipeline = pipeline or self.pipelines["default"]
+        cropped = frame.preprocess((x1, y1, x2, y2), pipeline)
+        if cropped is None:
             print(f"⚠️ Invalid ROI {roi}. Skipping OCR.")
             return ""
 
-        cropped = img[y1:y2, x1:x2]
-
-        # Enhance image for OCR
-        _, cropped = cv2.threshold(cropped, 128, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
-
-        text = pytesseract.image_to_string(cropped, config=self.ocr_config).strip()
+        text = self.ocr_engine.image_to_string(cropped, config=pipeline.config).strip()
 
         if text:
             print(f"✅ OCR detected text: '{text}'")
@@ -155,6 +335,10 @@ class MapScanner:
 
         return text if text else "NO_TEXT_DETECTED"
 
+    def read_view_center(self, frame):
+        """(K, X, Y) of the view-center banner of a frame, e.g. for NavigationTool.wait_for_arrival."""
+        return self.processor.get_view_center_coords(frame, self.VIEW_CENTER_ROI)
+
     def parse_coordinates(self, text):
         """Parses coordinates (K, X, Y) from OCR output."""
         match = re.search(r"K\s*[:=]?\s*(\d+)\s*X\s*[:=]?\s*(\d+)\s*Y\s*[:=]?\s*(\d+)", text, re.IGNORECASE)
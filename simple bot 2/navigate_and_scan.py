@@ -5,7 +5,6 @@ import logging
 from adb_module import ADBModule
 from navigation_tool import NavigationTool
 from mapscanner import MapScanner
-import time
 
 class PopupCoordinateLogger:
     """
@@ -100,14 +99,15 @@ class NavigatorScanner:
 
         # 1) Navigate
         print(f"Navigating to K={self.kingdom}, X={self.tile_x}, Y={self.tile_y}...")
+        before = self.adb.capture_frame()  # Arrival = the view center differs from this frame's
         self.nav_tool.navigate_to_coordinates(
             kingdom=self.kingdom,
             x=self.tile_x,
             y=self.tile_y
         )
 
-        # Wait a bit for the map to load
-        time.sleep(2.0)
+        # Wait for the map to load
+        self.nav_tool.wait_for_arrival(read_center=self.map_scanner.read_view_center, timeout=2.0, reference=before)
 
         # 2) Scan
         print("Starting tile scan...")
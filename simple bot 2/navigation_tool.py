@@ -2,9 +2,26 @@
 
 import logging
 from adb_module import ADBModule
+from sequence_compiler import KEYPAD_KEY_DELAY, tap_keypad_sequence
+from ui_wait import all_of, center_changed, frame_changed, frame_stable
 import time
 
 class NavigationTool:
+    NAV_MENU_POSITION = (843, 118)
+    # Tap positions for fields and "Go" button
+    FIELD_TAP_POSITIONS = {
+        "kingdom": (685, 335),  # Kingdom input field
+        "x": (821, 335),        # X coordinate input field
+        "y": (969, 335)         # Y coordinate input field
+    }
+    GO_BUTTON_POSITION = (765, 467)  # "Go" button
+    KEYPAD_POSITIONS = {
+        "0": (1098, 619), "1": (1065, 379), "2": (1195, 367),
+        "3": (1290, 367), "4": (1065, 430), "5": (1195, 430),
+        "6": (1290, 430), "7": (1065, 530), "8": (1195, 530),
+        "9": (1290, 530), "check": (1275, 630)  # Checkmark button
+    }
+
     def __init__(self, adb=None):
         self.adb = adb or ADBModule()
         self.logger = logging.getLogger("NavigationTool")
@@ -42,39 +59,14 @@ class NavigationTool:
         """
         self.validate_coordinates(kingdom, x, y)
 
-        # Tap positions for fields and "Go" button
-        field_tap_positions = {
-            "kingdom": (685, 335),  # Kingdom input field
-            "x": (821, 335),        # X coordinate input field
-            "y": (969, 335)         # Y coordinate input field
-        }
-        go_button_position = (765, 467)  # "Go" button
-
         for attempt in range(retries):
             try:
                 self.logger.info(f"Navigating to coordinates: Kingdom={kingdom}, X={x}, Y={y} (Attempt {attempt + 1})")
+                sequence = self.build_navigation_sequence(kingdom, x, y, last_kingdom, last_x, last_y)
 
-                # Tap navigation menu button
-                self.adb.tap_screen(843, 118)
-
-                # Change kingdom only if it's different from the last kingdom
-                if last_kingdom != kingdom:
-                    self.logger.info(f"Updating Kingdom to {kingdom}")
-                    self._tap_and_enter(field_tap_positions["kingdom"], kingdom)
-
-                # Change X coordinate only if it's different from the last X coordinate
-                if last_x != x:
-                    self.logger.info(f"Updating X coordinate to {x}")
-                    self._tap_and_enter(field_tap_positions["x"], x)
-
-                # Change Y coordinate only if it's different from the last Y coordinate
-                if last_y != y:
-                    self.logger.info(f"Updating Y coordinate to {y}")
-                    self._tap_and_enter(field_tap_positions["y"], y)
-
-                # Tap the "Go" button
-                self.logger.info(f"Tapping 'Go' button")
-                self.adb.tap_screen(*go_button_position)
+                # The whole keypad entry runs as one compiled device-side script.
+                if self.adb.run_sequence(sequence) is None:
+                    raise RuntimeError("Compiled navigation sequence failed.")
                 self.logger.info(f"Triggered navigation to specified coordinates.")
                 return  # Exit after successful navigation
 
@@ -83,29 +75,53 @@ class NavigationTool:
 
         self.logger.critical(f"Navigation failed after maximum retries.")
 
-    def _tap_and_enter(self, tap_position, value):
-        """Tap on a field and enter a value."""
-        keypad_positions = {
-            "0": (1098, 619), "1": (1065, 379), "2": (1195, 367),
-            "3": (1290, 367), "4": (1065, 430), "5": (1195, 430),
-            "6": (1290, 430), "7": (1065, 530), "8": (1195, 530),
-            "9": (1290, 530), "check": (1275, 630)  # Checkmark button
-        }
-
-        x, y = tap_position
-        self.adb.tap_screen(x, y)
-        self.logger.info(f"Tapped on input field at position: {tap_position}")
-
-        # Enter value digit by digit
-        for digit in str(value):
-            if digit in keypad_positions:
-                key_x, key_y = keypad_positions[digit]
-                self.adb.tap_screen(key_x, key_y)
-                self.logger.info(f"Tapped key '{digit}' at position: ({key_x}, {key_y})")
-            else:
-                raise ValueError(f"Invalid digit '{digit}' for keypad entry.")
-
-        # Tap checkmark to confirm
-        check_x, check_y = keypad_positions["check"]
-        self.adb.tap_screen(check_x, check_y)
-        self.logger.info(f"Tapped checkmark at position: ({check_x}, {check_y})")
+    def wait_for_arrival(self, previous_center=None, read_center=None, timeout=3.0, reference=None):
+        """
+        Wait until the map has moved and stopped animating, instead of sleeping a fixed time.
+
+        Args:
+            previous_center (tuple): The (kingdom, x, y) before navigating. Read from
+                `reference` with `read_center` when omitted.
+            read_center (callable): frame -> (kingdom, x, y), e.g. an OCR of the view-center box.
+                With a previous center, the wait also requires the center to change.
+            timeout (float): Upper bound in seconds.
+            reference (numpy.ndarray): The frame captured before navigating; the wait requires
+                the frame to differ from it, so the still, pre-move map never counts as arrived.
+
+        Returns:
+            bool: True if the map settled before the timeout.
+        """
+        predicates = [frame_stable()]
+        if reference is not None:
+            predicates.append(frame_changed(reference))
+            if previous_center is None and read_center is not None:
+                previous_center = read_center(reference)
+        if read_center is not None and previous_center and None not in previous_center:
+            predicates.append(center_changed(read_center, previous_center))
+        if len(predicates) == 1:
+            self.logger.warning("wait_for_arrival without a reference frame or previous center: "
+                                "the pre-move map may pass as arrived.")
+        settled, _ = self.adb.wait_until(all_of(*predicates), timeout)
+        if not settled:
+            self.logger.warning(f"Map did not settle within {timeout}s after navigation.")
+        return settled
+
+    def build_navigation_sequence(self, kingdom, x, y, last_kingdom=None, last_x=None, last_y=None,
+                                  key_delay=KEYPAD_KEY_DELAY):
+        """
+        Build the action sequence for navigating to (kingdom, x, y): open the navigation
+        menu, re-enter only the fields that changed, and tap "Go".
+
+        Returns:
+            list: Action dicts for ADBModule.run_sequence.
+        """
+        sequence = [{"action": "tap", "x": self.NAV_MENU_POSITION[0], "y": self.NAV_MENU_POSITION[1]}]
+
+        # Change each field only if it's different from the last value
+        for field, value, last_value in (("kingdom", kingdom, last_kingdom), ("x", x, last_x), ("y", y, last_y)):
+            if last_value != value:
+                self.logger.info(f"Updating {field} to {value}")
+                sequence += tap_keypad_sequence(self.FIELD_TAP_POSITIONS[field], value, self.KEYPAD_POSITIONS, key_delay)
+
+        sequence.append({"action": "tap", "x": self.GO_BUTTON_POSITION[0], "y": self.GO_BUTTON_POSITION[1]})
+        return sequence
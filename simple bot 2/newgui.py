@@ -99,6 +99,13 @@ class TileScannerGUI:
         self.rectangles.append(roi_data)
         print(f"✅ ROI added: {roi_data}")
 
+    def load_existing_rois(self):
+        """Load rois.json whole, so saving keeps the other ROI types and the "pipelines" settings."""
+        self.all_rois = {}
+        if os.path.exists(self.roi_file):
+            with open(self.roi_file, "r") as f:
+                self.all_rois = json.load(f)
+
     def save_rois(self):
         """Saves labeled ROIs to a file."""
         self.all_rois["regions"] = self.rectangles
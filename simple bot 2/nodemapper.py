@@ -2,19 +2,25 @@ import os
 import sqlite3
 import re
 import json
+from concurrent.futures import Future
 from typing import Tuple, Dict, Optional
 
-from adb_module import ADBModule
+from unified_adb import ADBModule
 from ocr_module import OCRModule
+from ocr_service import OCRService
+from popup_locator import PopupLocator
 
 class NodeMapper:
     """Minimal node mapper used for tests."""
     def __init__(self, db_path: str = "grid_data.db", adb: Optional[ADBModule] = None,
-                 ocr: Optional[OCRModule] = None, device_id: Optional[str] = None):
+                 ocr: Optional[OCRModule] = None, device_id: Optional[str] = None,
+                 ocr_service: Optional[OCRService] = None, popup_locator: Optional[PopupLocator] = None):
         self.db_path = db_path
         self.adb = adb or ADBModule()
         self.ocr = ocr or OCRModule()
         self.device_id = device_id
+        self.ocr_service = ocr_service  # Optional: OCR in worker processes (see process_node_async)
+        self.popup_locator = popup_locator or PopupLocator()
         self.screenshot_dir = "screenshots"
         os.makedirs(self.screenshot_dir, exist_ok=True)
         os.makedirs("raw_text", exist_ok=True)
@@ -91,14 +97,43 @@ class NodeMapper:
 
         return node_type, details, kingdom
 
-    def process_node(self, adb_x: int, adb_y: int):
+    def _capture_node(self, adb_x: int, adb_y: int):
+        """Tap a node and screenshot it. Returns the pop-up panel crop, or the screenshot path if none is found."""
         screenshot_path = os.path.join(self.screenshot_dir, f"node_{adb_x}_{adb_y}.png")
         self.adb.tap(self.device_id, adb_x, adb_y)
         self.adb.capture_screenshot(self.device_id, screenshot_path)
-        ocr_text = self.ocr.extract_text(screenshot_path)
+        # OCR only the pop-up panel when it can be found; otherwise the whole screenshot.
+        panel = self.popup_locator.crop(screenshot_path) if os.path.exists(screenshot_path) else None
+        return panel if panel is not None else screenshot_path
+
+    def process_node(self, adb_x: int, adb_y: int) -> Tuple[str, Dict[str, str], Optional[str]]:
+        """Tap, capture and classify a node, waiting for the OCR.
+
+        Returns:
+            tuple: (node_type, details, kingdom) as from classify_node.
+        """
+        if self.ocr_service is not None:
+            return self.process_node_async(adb_x, adb_y).result()
+        ocr_text = self.ocr.extract_text(self._capture_node(adb_x, adb_y))
         cleaned = self.clean_ocr_text(ocr_text)
         return self.classify_node(cleaned)
 
+    def process_node_async(self, adb_x: int, adb_y: int) -> Future:
+        """Tap and capture a node now; OCR and classify it in the ocr_service workers.
+
+        The next node can be tapped while this one is being read. Without an ocr_service the node is
+        processed synchronously and an already resolved Future is returned.
+
+        Returns:
+            Future: resolves to (node_type, details, kingdom) as from classify_node.
+        """
+        if self.ocr_service is None:
+            done = Future()
+            done.set_result(self.process_node(adb_x, adb_y))
+            return done
+        return self.ocr_service.then(self.ocr_service.submit_text(self._capture_node(adb_x, adb_y)),
+                                     lambda text: self.classify_node(self.clean_ocr_text(text)))
+
     def store_data(self, adb_x: int, adb_y: int, x: int, y: int, node_type: str,
                    details: Dict[str, str], kingdom: Optional[str], kingdom_x: int, kingdom_y: int):
         details_json = json.dumps(details) if isinstance(details, dict) else str(details)
@@ -0,0 +1,163 @@
+"""
+Batched OCR: read many ROIs of one frame in a single engine pass.
+
+The requested crops are stacked into one padded mosaic (one crop per row),
+the engine runs once with word-level boxes (image_to_data), and every word
+is assigned back to the ROI whose slot contains its center.
+
+    results = ocr_rois(frame, {"center": (786, 100, 1019, 137), "monster": (340, 715, 569, 746)})
+    results["center"]  # {"text": "K:263 X:494 Y:1004", "conf": 91.3}
+"""
+
+import re
+
+import numpy as np
+
+from frame import Frame
+from ocr_cache import cache_key
+from ocr_engine import get_engine, parse_config
+
+# Block mode: the mosaic is one column of short text lines.
+BATCH_CONFIG = "--psm 6"
+SINGLE_LINE_PSMS = (7, 8, 13)  # Modes that read the whole image as one line or word
+
+
+def normalize_roi(roi):
+    """
+    Return (x1, y1, x2, y2) with x1 <= x2 and y1 <= y2. ROIs saved by the ROI
+    tools keep the drag direction, e.g. [747, 310, 1060, 263].
+    """
+    x1, y1, x2, y2 = map(int, roi)
+    return min(x1, x2), min(y1, y2), max(x1, x2), max(y1, y2)
+
+
+def mosaic_config(config, count):
+    """
+    Config for a mosaic of `count` crops. The crops sit on separate lines, so
+    single-line page segmentation modes fall back to block mode.
+    """
+    if count > 1 and parse_config(config)[1] in SINGLE_LINE_PSMS:
+        return re.sub(r"--psm\s+\d+", "--psm 6", config)
+    return config
+
+
+def _background(crop):
+    """Padding value that blends in with the crop: the median of its border pixels."""
+    border = np.concatenate([crop[0], crop[-1], crop[:, 0], crop[:, -1]])
+    return int(np.median(border))
+
+
+def build_mosaic(crops, padding=20):
+    """
+    Stack crops vertically, each on its own padded row.
+
+    Args:
+        crops (dict): name -> 2-D uint8 crop.
+        padding (int): Pixels around every crop, so Tesseract sees separate lines.
+
+    Returns:
+        tuple: (mosaic, slots) where slots maps name -> (x1, y1, x2, y2) inside the mosaic.
+    """
+    width = max(crop.shape[1] for crop in crops.values()) + 2 * padding
+    height = sum(crop.shape[0] + 2 * padding for crop in crops.values())
+    mosaic = np.full((height, width), 255, dtype=np.uint8)
+    slots = {}
+    top = 0
+    for name, crop in crops.items():
+        h, w = crop.shape
+        row = top + padding
+        mosaic[top:row + h + padding, :] = _background(crop)
+        mosaic[row:row + h, padding:padding + w] = crop
+        slots[name] = (padding, row, padding + w, row + h)
+        top = row + h + padding
+    return mosaic, slots
+
+
+def split_words(data, slots, padding=20):
+    """Group image_to_data words by the slot (ROI) containing their center."""
+    words = {name: [] for name in slots}
+    for i, text in enumerate(data["text"]):
+        cx = data["left"][i] + data["width"][i] / 2
+        cy = data["top"][i] + data["height"][i] / 2
+        for name, (x1, y1, x2, y2) in slots.items():
+            if y1 - padding <= cy < y2 + padding and x1 - padding <= cx < x2 + padding:
+                words[name].append((data["line"][i], data["left"][i], text, data["conf"][i]))
+                break
+    return words
+
+
+def ocr_rois(image, rois, engine=None, config=BATCH_CONFIG, threshold=None, padding=20, glyphs=None, coordinate_rois=(),
+             pipelines=None):
+    """
+    OCR every ROI of one frame with a single engine call (one per distinct
+    Tesseract config when `pipelines` differ in psm or whitelist).
+
+    Args:
+        image: Path, decoded frame or Frame.
+        rois (dict): name -> (x1, y1, x2, y2).
+        engine (OCREngine): Defaults to the shared engine.
+        config (str): Tesseract config for the mosaic.
+        threshold (str): None for plain grayscale crops, or a Frame.threshold method ("otsu", "adaptive").
+        padding (int): Gap around each crop in the mosaic.
+        glyphs (GlyphOCR): Optional glyph recognizer tried first on `coordinate_rois`; only the
+            ROIs it cannot read confidently go into the mosaic (and their readings train it).
+        coordinate_rois (iterable): Names of the ROIs holding K/X/Y coordinate banners.
+        pipelines (dict): Optional name -> ocr_pipeline.Pipeline. Those ROIs are preprocessed and
+            read with their pipeline instead of `threshold` and `config`.
+
+    Returns:
+        dict: name -> {"text": str, "conf": float}. ROIs outside the frame (or an unreadable
+        frame) yield {"text": "", "conf": -1.0}; ROIs without words get conf 0.0.
+    """
+    frame = Frame.of(image)
+    results = {name: {"text": "", "conf": -1.0} for name in rois}
+    if not frame.is_valid():
+        return results
+    engine = engine or get_engine()
+    cache = getattr(engine, "cache", None)  # Set on ocr_cache.CachedEngine
+    keys = {}
+
+    groups = {}  # Mosaic config -> {name: crop}
+    for name, roi in rois.items():
+        box = normalize_roi(roi)
+        pipeline = pipelines.get(name) if pipelines else None
+        if pipeline is not None:
+            crop = frame.preprocess(box, pipeline)
+            roi_config = pipeline.config
+        else:
+            crop = frame.threshold(box, threshold) if threshold else frame.crop(box)
+            roi_config = config
+        if crop is None or not crop.size:
+            continue
+        if glyphs is not None and name in coordinate_rois:
+            confident = glyphs.read_confident(frame.crop(box))
+            if confident is not None:
+                results[name] = {"text": confident[0], "conf": confident[1] * 100}
+                continue
+        if cache is not None:
+            # Per-ROI lookup: a crop seen before (e.g. the view-center banner) skips the mosaic.
+            keys[name] = cache_key(crop, roi_config, "roi", engine.identity)
+            cached = cache.get(keys[name])
+            if cached is not None:
+                results[name] = dict(cached)
+                continue
+        groups.setdefault(roi_config, {})[name] = crop
+
+    for roi_config, crops in groups.items():
+        mosaic, slots = build_mosaic(crops, padding)
+        data = engine.image_to_data(mosaic, config=mosaic_config(roi_config, len(crops)))
+
+        for name, words in split_words(data, slots, padding).items():
+            lines = {}
+            for line, left, text, conf in sorted(words):
+                lines.setdefault(line, []).append(text)
+            confs = [conf for *_, conf in words if conf >= 0]
+            results[name] = {
+                "text": "\n".join(" ".join(texts) for _, texts in sorted(lines.items())),
+                "conf": float(np.mean(confs)) if confs else 0.0,
+            }
+            if name in keys:
+                cache.put(keys[name], results[name])
+            if glyphs is not None and name in coordinate_rois:
+                glyphs.confirm(frame.crop(normalize_roi(rois[name])), results[name]["text"])
+    return results
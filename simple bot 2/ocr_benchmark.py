@@ -0,0 +1,293 @@
+"""
+OCR accuracy and latency benchmark.
+
+Replays a labeled corpus through every OCR backend and preprocessing
+variant, and reports per-ROI-type accuracy, p50/p95 latency and throughput
+as JSON so runs can be compared across commits.
+
+Labeled samples come from:
+  * roi_log.csv (screenshot_rename_crop.py): coordinate boxes with their
+    K/X/Y and tile-type boxes with their tile type;
+  * a FrameCorpus directory (fake_device.py): the view-center banner of every
+    recorded frame, labeled with the recorded center;
+  * ocr_debug_log.txt: real K/X/Y readings rendered as banners (see
+    glyph_ocr.render_text), for when no screenshots are at hand. These are
+    synthetic: they are reported in their own "(synthetic)" rows and kept out
+    of the headline "all" row.
+
+    python ocr_benchmark.py run --roi-log roi_log.csv --corpus recordings --output bench.json
+    python ocr_benchmark.py compare baseline.json bench.json   # exit code 1 on regressions
+"""
+
+import csv
+import json
+import logging
+import os
+import time
+from collections import Counter
+
+import numpy as np
+
+from benchmark_utils import git_commit
+from fake_device import FrameCorpus
+from frame import Frame
+from glyph_ocr import COORD_REGEX, DEFAULT_BANK, GlyphOCR, load_debug_log, render_text
+from ocr_batch import normalize_roi
+from ocr_engine import available_engines, create_engine
+from ocr_pipeline import Pipeline, load_pipelines, load_roi_log, pipeline_for
+from tile_types import detect_tile_type
+
+logger = logging.getLogger("OCRBenchmark")
+
+CENTER_ROI = (786, 100, 1019, 137)  # View-center banner, as in digest_screenshots.py
+SYNTHETIC = " (synthetic)"  # Suffix of the report rows scored on rendered rather than captured crops
+
+# Preprocessing variants; None stands for the pipeline rois.json declares for the sample's ROI type.
+DEFAULT_VARIANTS = {
+    "declared": None,
+    "raw": Pipeline(threshold="none", psm=6, name="raw"),
+    "otsu": Pipeline(threshold="otsu", psm=6, name="otsu"),
+    "otsu-x2": Pipeline(scale=2.0, threshold="otsu", psm=6, name="otsu-x2"),
+}
+
+
+def _sample(source, roi_type, image, roi, expected, kind="coordinates", synthetic=False):
+    return {"source": source, "roi_type": roi_type, "image": image, "roi": tuple(roi),
+            "expected": expected, "kind": kind, "synthetic": synthetic}
+
+
+def samples_from_roi_log(csv_path="roi_log.csv", screenshots_dir="screenshots"):
+    """Coordinate and tile-type samples from the renaming tool's log (rows it could label)."""
+    samples = [_sample("roi_log", "tile_coordinates", image, roi, expected)
+               for image, roi, expected in load_roi_log(csv_path, screenshots_dir)]
+    with open(csv_path, "r", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            path = os.path.join(screenshots_dir, row.get("new_filename") or "")
+            if not row.get("tile_type") or not row.get("new_filename") or not os.path.exists(path):
+                continue
+            roi = tuple(int(float(row[f"type_box_{side}"])) for side in ("left", "top", "right", "bottom"))
+            samples.append(_sample("roi_log", "node_types", path, roi, row["tile_type"], kind="tile_type"))
+    return samples
+
+
+def samples_from_corpus(corpus_dir, roi=CENTER_ROI):
+    """The view-center banner of every recorded frame, labeled with the recorded center."""
+    corpus = FrameCorpus(corpus_dir)
+    return [_sample("corpus", "center_tile", os.path.join(corpus_dir, name), roi, "K:{} X:{} Y:{}".format(*center))
+            for (center, _), name in sorted(corpus.entries.items(), key=lambda item: item[1])]
+
+
+def samples_from_debug_log(log_path="ocr_debug_log.txt", limit=200):
+    """Distinct K/X/Y readings of the debug log rendered as banners (synthetic samples), evenly spread over the log."""
+    readings = sorted(set(load_debug_log(log_path)))
+    if limit and len(readings) > limit:
+        readings = [readings[i] for i in np.linspace(0, len(readings) - 1, limit).astype(int)]
+    samples = []
+    for text in readings:
+        banner = render_text(text, scale=1.1)
+        samples.append(_sample("debug_log", "ocr_regions", banner, (0, 0, banner.shape[1], banner.shape[0]), text,
+                               synthetic=True))
+    return samples
+
+
+def is_correct(sample, text):
+    """Coordinates must parse to the expected K/X/Y; tile types must classify as expected."""
+    if sample["kind"] == "tile_type":
+        # The classifier that produced the labels (screenshot_rename_crop.py)
+        return detect_tile_type(text or "") == sample["expected"]
+    found = COORD_REGEX.search(text or "")
+    return found is not None and found.groups() == COORD_REGEX.search(sample["expected"]).groups()
+
+
+def default_backends(glyph_bank=DEFAULT_BANK):
+    """
+    name -> (read(crop, config) -> text, uses_pipelines). Every installed engine (uncached, so
+    timings are real), plus the glyph bank for coordinate ROIs when one exists.
+    """
+    backends = {}
+    for name in available_engines():
+        engine = create_engine(name)
+        backends[name] = (engine.image_to_string, True)
+    if glyph_bank and os.path.exists(glyph_bank):
+        glyphs = GlyphOCR(bank_path=glyph_bank, learn=False)
+        backends["glyph"] = (lambda crop, config: glyphs.recognize(crop)[0], False)
+    return backends
+
+
+def _summary(latencies, correct):
+    latencies = np.asarray(latencies, dtype=np.float64)
+    total = latencies.sum()
+    return {
+        "samples": int(len(latencies)),
+        "accuracy": float(np.mean(correct)) if len(correct) else 0.0,
+        "p50_ms": float(np.percentile(latencies, 50) * 1000) if len(latencies) else 0.0,
+        "p95_ms": float(np.percentile(latencies, 95) * 1000) if len(latencies) else 0.0,
+        "rois_per_second": float(len(latencies) / total) if total else 0.0,
+    }
+
+
+def run_benchmark(samples, backends=None, variants=None, pipelines=None, repeats=1):
+    """
+    Time and score every (backend, variant) on `samples`.
+
+    Args:
+        samples (list): Sample dicts from the samples_from_* loaders.
+        backends (dict): name -> (read(crop, config), uses_pipelines); see default_backends.
+            Backends that ignore pipelines run once, as variant "-".
+        variants (dict): name -> Pipeline, or None for the declared pipeline of each ROI type.
+        pipelines (dict): Declared pipelines (default: load_pipelines("rois.json")).
+        repeats (int): Passes over the corpus; latencies of all passes are pooled.
+
+    Returns:
+        dict: {"meta": {...}, "results": [{"backend", "variant", "roi_type", "samples", "accuracy",
+        "p50_ms", "p95_ms", "rois_per_second"}, ...]} with roi_type "all" rows per backend/variant.
+        Synthetic samples are scored in "<roi_type> (synthetic)" and "all (synthetic)" rows, never in "all".
+    """
+    backends = backends if backends is not None else default_backends()
+    variants = variants if variants is not None else DEFAULT_VARIANTS
+    pipelines = pipelines or load_pipelines()
+    frames = {}
+    crops = []
+    for sample in samples:
+        key = sample["image"] if isinstance(sample["image"], str) else id(sample["image"])
+        frame = frames.setdefault(key, Frame.of(sample["image"]))  # Decode each screenshot once
+        crops.append(frame.crop(normalize_roi(sample["roi"])) if frame.is_valid() else None)
+
+    results = []
+    errors = {}
+    for backend_name, (read, uses_pipelines) in backends.items():
+        for variant_name, variant in (variants.items() if uses_pipelines else [("-", None)]):
+            timings = {}
+            try:
+                for _ in range(repeats):
+                    for sample, crop in zip(samples, crops):
+                        pipeline = variant or pipeline_for(pipelines, sample["roi_type"])
+                        start = time.perf_counter()
+                        if crop is None:
+                            text = ""
+                        elif uses_pipelines:
+                            text = read(pipeline.apply(crop), pipeline.config)
+                        else:
+                            text = read(crop, "")
+                        elapsed = time.perf_counter() - start
+                        group = sample["roi_type"] + (SYNTHETIC if sample.get("synthetic") else "")
+                        timings.setdefault(group, ([], []))
+                        timings[group][0].append(elapsed)
+                        timings[group][1].append(is_correct(sample, text))
+            except Exception as e:
+                logger.warning(f"Backend {backend_name} failed: {e}")
+                errors[backend_name] = str(e)
+                break
+            pooled = {"all": ([], []), "all" + SYNTHETIC: ([], [])}
+            for roi_type, (latencies, correct) in sorted(timings.items()):
+                results.append(dict(backend=backend_name, variant=variant_name, roi_type=roi_type,
+                                    **_summary(latencies, correct)))
+                pool = pooled["all" + SYNTHETIC if roi_type.endswith(SYNTHETIC) else "all"]
+                pool[0].extend(latencies)
+                pool[1].extend(correct)
+            for roi_type, pool in pooled.items():
+                if pool[0]:
+                    results.append(dict(backend=backend_name, variant=variant_name, roi_type=roi_type,
+                                        **_summary(*pool)))
+
+    return {"meta": _meta(samples, repeats, errors), "results": results}
+
+
+def _meta(samples, repeats, errors):
+    return {
+        "commit": git_commit(),
+        "created": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "repeats": repeats,
+        "samples": dict(Counter(sample["source"] for sample in samples)),
+        "synthetic_samples": sum(1 for sample in samples if sample.get("synthetic")),
+        "errors": errors,
+    }
+
+
+def compare_reports(baseline, current, max_accuracy_drop=0.01, max_slowdown=1.25):
+    """
+    Rows of `current` that regressed against `baseline` (matched on backend, variant, ROI type).
+    A baseline row with no counterpart in `current` (e.g. a backend that failed to load) is a
+    regression too.
+
+    Returns:
+        list: Human-readable regression messages; empty when nothing regressed.
+    """
+    previous = {(r["backend"], r["variant"], r["roi_type"]): r for r in baseline["results"]}
+    measured = {(r["backend"], r["variant"], r["roi_type"]) for r in current["results"]}
+    regressions = [f"{'/'.join(key)}: missing from the current report" for key in previous if key not in measured]
+    for row in current["results"]:
+        key = (row["backend"], row["variant"], row["roi_type"])
+        old = previous.get(key)
+        if old is None:
+            continue
+        label = "/".join(key)
+        if row["accuracy"] < old["accuracy"] - max_accuracy_drop:
+            regressions.append(f"{label}: accuracy {old['accuracy']:.1%} -> {row['accuracy']:.1%}")
+        if old["p50_ms"] and row["p50_ms"] > old["p50_ms"] * max_slowdown:
+            regressions.append(f"{label}: p50 {old['p50_ms']:.1f} ms -> {row['p50_ms']:.1f} ms")
+        if old["p95_ms"] and row["p95_ms"] > old["p95_ms"] * max_slowdown:
+            regressions.append(f"{label}: p95 {old['p95_ms']:.1f} ms -> {row['p95_ms']:.1f} ms")
+    return regressions
+
+
+def print_report(report):
+    for row in report["results"]:
+        print(f"{row['backend']:12s} {row['variant']:9s} {row['roi_type']:23s} {row['samples']:5d}  "
+              f"accuracy {row['accuracy']:6.1%}  p50 {row['p50_ms']:7.1f} ms  p95 {row['p95_ms']:7.1f} ms  "
+              f"{row['rois_per_second']:7.1f} ROI/s")
+    if report["meta"].get("synthetic_samples"):
+        print(f"ℹ️ {report['meta']['synthetic_samples']} samples are banners rendered from the debug log; "
+              f"they are scored only in the '{SYNTHETIC.strip()}' rows, not in 'all'.")
+    for backend, error in report["meta"]["errors"].items():
+        print(f"⚠️ {backend} skipped: {error}")
+
+
+if __name__ == "__main__":
+    import argparse
+    import sys
+
+    parser = argparse.ArgumentParser(description="OCR accuracy/latency benchmark.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    run_parser = sub.add_parser("run", help="Benchmark every backend and variant on a labeled corpus")
+    run_parser.add_argument("--roi-log", help="roi_log.csv with labeled boxes")
+    run_parser.add_argument("--screenshots", default="screenshots", help="Directory of the roi_log screenshots")
+    run_parser.add_argument("--corpus", help="FrameCorpus directory (index.json + PNGs)")
+    run_parser.add_argument("--debug-log", default="ocr_debug_log.txt", help="Render readings of this log ('' to skip)")
+    run_parser.add_argument("--limit", type=int, default=200, help="Readings taken from the debug log")
+    run_parser.add_argument("--repeats", type=int, default=1)
+    run_parser.add_argument("--glyph-bank", default=DEFAULT_BANK)
+    run_parser.add_argument("--output", default="ocr_benchmark.json")
+    compare_parser = sub.add_parser("compare", help="Report regressions between two benchmark runs")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument("--max-accuracy-drop", type=float, default=0.01)
+    compare_parser.add_argument("--max-slowdown", type=float, default=1.25)
+    args = parser.parse_args()
+
+    if args.command == "run":
+        corpus = []
+        if args.roi_log:
+            corpus += samples_from_roi_log(args.roi_log, args.screenshots)
+        if args.corpus:
+            corpus += samples_from_corpus(args.corpus)
+        if args.debug_log:
+            corpus += samples_from_debug_log(args.debug_log, args.limit)
+        if not corpus:
+            parser.error("No labeled samples.")
+        report = run_benchmark(corpus, default_backends(args.glyph_bank), repeats=args.repeats)
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print_report(report)
+        print(f"💾 Report written to {args.output}")
+    else:
+        with open(args.baseline) as f:
+            baseline_report = json.load(f)
+        with open(args.current) as f:
+            current_report = json.load(f)
+        found = compare_reports(baseline_report, current_report, args.max_accuracy_drop, args.max_slowdown)
+        for message in found:
+            print(f"❌ {message}")
+        if not found:
+            print("✅ No regressions.")
+        sys.exit(1 if found else 0)
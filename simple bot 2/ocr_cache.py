@@ -0,0 +1,183 @@
+"""
+Content-addressed OCR result cache.
+
+Results are keyed by a BLAKE2b hash of the preprocessed pixels plus the OCR
+config and the engine name and version, so a pixel-identical crop (the view-center banner on every tap of a
+view, static pop-up labels, a re-digested screenshot) never reaches the engine
+twice, while a Tesseract upgrade never serves stale readings. The first tier
+is an in-memory LRU; an optional SQLite file keeps results across runs (writes
+are committed in batches and on flush()/close()).
+
+    engine = CachedEngine(create_engine(), OCRCache(db_path="ocr_cache.db"))
+    engine.image_to_string(crop, config="--psm 6")
+    engine.cache.stats()  # {"hits": ..., "misses": ..., "disk_hits": ..., "hit_rate": ...}
+"""
+
+import hashlib
+import json
+import sqlite3
+import threading
+from collections import OrderedDict
+
+import numpy as np
+from PIL import Image
+
+from ocr_engine import OCREngine
+
+
+def cache_key(pixels, config="", kind="string", engine=""):
+    """Hash of the pixel bytes, shape, dtype, OCR config, result kind and engine identity (name/version)."""
+    pixels = np.ascontiguousarray(pixels)
+    digest = hashlib.blake2b(pixels.tobytes(), digest_size=16)
+    digest.update(f"|{pixels.shape}|{pixels.dtype}|{config}|{kind}|{engine}".encode("utf-8"))
+    return digest.hexdigest()
+
+
+class OCRCache:
+    """In-memory LRU of OCR results with an optional SQLite tier."""
+
+    def __init__(self, max_entries=4096, db_path=None, commit_every=100):
+        """
+        Args:
+            max_entries (int): Results kept in memory (least recently used are evicted).
+            db_path (str): Optional SQLite file that persists results across runs.
+            commit_every (int): Disk writes buffered per SQLite commit.
+        """
+        self.max_entries = max_entries
+        self.commit_every = commit_every
+        self._pending = 0
+        self.db_path = None
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        if db_path:
+            self.enable_disk(db_path)
+
+    def enable_disk(self, db_path):
+        """Attach (or switch) the SQLite tier."""
+        with self._lock:
+            if self._db is not None:
+                self._db.commit()
+                self._db.close()
+            self._pending = 0
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute("CREATE TABLE IF NOT EXISTS ocr_cache (key TEXT PRIMARY KEY, value TEXT)")
+            self._db.commit()
+            self.db_path = db_path
+
+    def get(self, key):
+        """Return the cached result for `key`, or None."""
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            if self._db is not None:
+                row = self._db.execute("SELECT value FROM ocr_cache WHERE key = ?", (key,)).fetchone()
+                if row is not None:
+                    value = json.loads(row[0])
+                    self._remember(key, value)
+                    self.hits += 1
+                    self.disk_hits += 1
+                    return value
+            self.misses += 1
+            return None
+
+    def put(self, key, value):
+        with self._lock:
+            self._remember(key, value)
+            if self._db is not None:
+                self._db.execute("INSERT OR REPLACE INTO ocr_cache (key, value) VALUES (?, ?)", (key, json.dumps(value)))
+                self._pending += 1
+                if self._pending >= self.commit_every:
+                    self._commit()
+
+    def _commit(self):
+        self._db.commit()
+        self._pending = 0
+
+    def flush(self):
+        """Commit buffered disk writes."""
+        with self._lock:
+            if self._db is not None:
+                self._commit()
+
+    def _remember(self, key, value):
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def stats(self):
+        """Hit/miss counters; disk_hits are the hits served by the SQLite tier."""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "entries": len(self._entries),
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM ocr_cache")
+                self._commit()
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._commit()
+                self._db.close()
+                self._db = None
+
+
+def _pixels(image):
+    """Pixel array used for hashing (paths and PIL images are loaded)."""
+    if isinstance(image, np.ndarray):
+        return image
+    if isinstance(image, str):
+        with Image.open(image) as img:
+            return np.asarray(img)
+    return np.asarray(image)
+
+
+class CachedEngine(OCREngine):
+    """Wraps any OCREngine so identical pixels + config are only recognized once."""
+
+    @property
+    def version(self):
+        return self.engine.version
+
+    def __init__(self, engine, cache=None):
+        self.engine = engine
+        self.cache = cache or OCRCache()
+        self.name = engine.name
+        self.identity = f"{engine.name}/{engine.version}"
+
+    def image_to_string(self, image, config=""):
+        pixels = _pixels(image)
+        key = cache_key(pixels, config, "string", self.identity)
+        text = self.cache.get(key)
+        if text is None:
+            text = self.engine.image_to_string(image, config)
+            self.cache.put(key, text)
+        return text
+
+    def image_to_data(self, image, config=""):
+        pixels = _pixels(image)
+        key = cache_key(pixels, config, "data", self.identity)
+        data = self.cache.get(key)
+        if data is None:
+            data = self.engine.image_to_data(image, config)
+            self.cache.put(key, data)
+        return data
+
+    def close(self):
+        self.engine.close()
+        self.cache.close()
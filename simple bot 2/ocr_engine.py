@@ -0,0 +1,302 @@
+"""
+OCR engines behind one small interface.
+
+pytesseract writes a temp image and spawns the `tesseract` binary (which reloads
+its language data) on every call, which costs ~100-300 ms per ROI. When the
+optional `tesserocr` binding is installed, TesserocrEngine keeps initialized
+Tesseract APIs in-process instead. get_engine() returns the shared default:
+tesserocr when available, pytesseract otherwise.
+
+    from ocr_engine import get_engine
+    text = get_engine().image_to_string(gray_crop, config="--psm 6")
+
+Run `python ocr_engine.py image.png ...` to compare the engines' throughput.
+"""
+
+import abc
+import logging
+import shlex
+import threading
+import time
+
+import numpy as np
+import pytesseract
+from PIL import Image
+
+from screencap import load_grayscale
+
+try:
+    import tesserocr
+except ImportError:  # Optional: pip install tesserocr
+    tesserocr = None
+
+logger = logging.getLogger("OCREngine")
+
+DEFAULT_LANG = "eng"
+DEFAULT_PSM = 3  # Tesseract's default: fully automatic page segmentation
+
+
+def parse_config(config):
+    """
+    Split a pytesseract-style config string into (lang, psm, variables).
+
+    "--psm 6 -c tessedit_char_whitelist=0123456789" -> ("eng", 6, {"tessedit_char_whitelist": "0123456789"})
+    """
+    lang, psm, variables = DEFAULT_LANG, DEFAULT_PSM, {}
+    tokens = shlex.split(config or "")
+    i = 0
+    while i < len(tokens):
+        token = tokens[i]
+        value = tokens[i + 1] if i + 1 < len(tokens) else None
+        if token == "--psm" and value is not None:
+            psm = int(value)
+            i += 1
+        elif token == "-l" and value is not None:
+            lang = value
+            i += 1
+        elif token == "-c" and value is not None and "=" in value:
+            name, setting = value.split("=", 1)
+            variables[name] = setting
+            i += 1
+        elif token == "--oem":
+            i += 1  # The engine mode is fixed when the API is created.
+        i += 1
+    return lang, psm, variables
+
+
+def to_pil(image):
+    """Accept a PIL image, a path, or a (gray/BGR/RGBA) array and return a PIL image."""
+    if isinstance(image, Image.Image):
+        return image
+    if isinstance(image, str):
+        return Image.open(image)
+    if isinstance(image, np.ndarray):
+        return Image.fromarray(load_grayscale(image))
+    raise TypeError(f"Unsupported image type for OCR: {type(image).__name__}")
+
+
+class OCREngine(abc.ABC):
+    """
+    Interface every engine implements.
+
+    image_to_data returns word-level results as a dict of parallel lists
+    (text, conf, left, top, width, height, line), with `line` numbering the
+    text lines of the image from 0.
+    """
+
+    name = "base"
+
+    @property
+    def version(self):
+        """Version of the underlying recognizer; part of every OCR cache key."""
+        return ""
+
+    @abc.abstractmethod
+    def image_to_string(self, image, config=""):
+        """Text of the whole image."""
+
+    @abc.abstractmethod
+    def image_to_data(self, image, config=""):
+        """Word-level results (see the class docstring)."""
+
+    def close(self):
+        pass
+
+
+class PytesseractEngine(OCREngine):
+    """Spawns the tesseract binary per call. Always available; the fallback."""
+
+    name = "pytesseract"
+    _version = None
+
+    @property
+    def version(self):
+        if self._version is None:
+            try:
+                self._version = str(pytesseract.get_tesseract_version())
+            except Exception:  # Binary missing; recognition will fail anyway
+                self._version = "unknown"
+        return self._version
+
+    def image_to_string(self, image, config=""):
+        return pytesseract.image_to_string(to_pil(image), config=config)
+
+    def image_to_data(self, image, config=""):
+        raw = pytesseract.image_to_data(to_pil(image), config=config, output_type=pytesseract.Output.DICT)
+        data = {key: [] for key in ("text", "conf", "left", "top", "width", "height", "line")}
+        lines = {}
+        for i, text in enumerate(raw["text"]):
+            if raw["level"][i] != 5 or not text.strip():
+                continue
+            line_key = (raw["block_num"][i], raw["par_num"][i], raw["line_num"][i])
+            data["line"].append(lines.setdefault(line_key, len(lines)))
+            data["text"].append(text)
+            data["conf"].append(float(raw["conf"][i]))
+            for key in ("left", "top", "width", "height"):
+                data[key].append(int(raw[key][i]))
+        return data
+
+
+class TesserocrEngine(OCREngine):
+    """
+    In-process Tesseract via the tesserocr binding. One initialized API is kept
+    per (lang, psm, variables) combination, so language data is loaded once.
+    """
+
+    name = "tesserocr"
+
+    def __init__(self, tessdata_path=None):
+        if tesserocr is None:
+            raise ImportError("tesserocr is not installed.")
+        self.tessdata_path = tessdata_path
+        self._apis = {}
+        self._lock = threading.Lock()
+
+    @property
+    def version(self):
+        # e.g. "tesseract 4.1.1\n leptonica-1.79.0 ..."; the first line names the recognizer
+        return tesserocr.tesseract_version().splitlines()[0].strip()
+
+    def _api(self, config):
+        lang, psm, variables = parse_config(config)
+        key = (lang, psm, tuple(sorted(variables.items())))
+        if key not in self._apis:
+            kwargs = {"lang": lang, "psm": psm}
+            if self.tessdata_path:
+                kwargs["path"] = self.tessdata_path
+            api = tesserocr.PyTessBaseAPI(**kwargs)
+            for name, value in variables.items():
+                api.SetVariable(name, value)
+            self._apis[key] = api
+        return self._apis[key]
+
+    def image_to_string(self, image, config=""):
+        # A Tesseract API is not thread-safe; calls are serialized per engine.
+        with self._lock:
+            api = self._api(config)
+            api.SetImage(to_pil(image))
+            return api.GetUTF8Text()
+
+    def image_to_data(self, image, config=""):
+        data = {key: [] for key in ("text", "conf", "left", "top", "width", "height", "line")}
+        level = tesserocr.RIL.WORD
+        with self._lock:
+            api = self._api(config)
+            api.SetImage(to_pil(image))
+            api.Recognize()
+            line = -1
+            for word in tesserocr.iterate_level(api.GetIterator(), level):
+                if word.IsAtBeginningOf(tesserocr.RIL.TEXTLINE):
+                    line += 1
+                text = word.GetUTF8Text(level)
+                box = word.BoundingBox(level)
+                if not text or not text.strip() or box is None:
+                    continue
+                x1, y1, x2, y2 = box
+                data["text"].append(text)
+                data["conf"].append(float(word.Confidence(level)))
+                data["left"].append(x1)
+                data["top"].append(y1)
+                data["width"].append(x2 - x1)
+                data["height"].append(y2 - y1)
+                data["line"].append(max(line, 0))
+        return data
+
+    def close(self):
+        with self._lock:
+            for api in self._apis.values():
+                api.End()
+            self._apis = {}
+
+
+ENGINES = {
+    PytesseractEngine.name: PytesseractEngine,
+    TesserocrEngine.name: TesserocrEngine,
+}
+
+_default_engine = None
+_default_lock = threading.Lock()
+
+
+def available_engines():
+    """Names of the engines that can run here, fastest first."""
+    names = []
+    if tesserocr is not None:
+        names.append(TesserocrEngine.name)
+    names.append(PytesseractEngine.name)
+    return names
+
+
+def create_engine(name=None):
+    """Create an engine by name, or the fastest available one."""
+    name = name or available_engines()[0]
+    if name not in ENGINES:
+        raise ValueError(f"Unknown OCR engine: {name}")
+    return ENGINES[name]()
+
+
+def get_engine():
+    """
+    Return the process-wide shared engine, created on first use. It is wrapped
+    in an ocr_cache.CachedEngine, so identical crops are only recognized once.
+    """
+    from ocr_cache import CachedEngine  # ocr_cache builds on this module
+
+    global _default_engine
+    with _default_lock:
+        if _default_engine is None:
+            engine = create_engine()
+            if engine.name == PytesseractEngine.name:
+                logger.info("tesserocr is not installed; falling back to pytesseract (one process per call).")
+            _default_engine = CachedEngine(engine)
+        return _default_engine
+
+
+def set_engine(engine):
+    """Replace the shared engine (e.g. with a specific backend or a test double)."""
+    global _default_engine
+    with _default_lock:
+        _default_engine = engine
+
+
+def benchmark_engines(images, engines=None, config="", repeats=1):
+    """
+    Time image_to_string over `images` for each engine.
+
+    Returns:
+        dict: {engine name: {"calls", "seconds", "ms_per_call", "calls_per_second"}}
+    """
+    engines = engines or [create_engine(name) for name in available_engines()]
+    results = {}
+    for engine in engines:
+        engine.image_to_string(images[0], config)  # Warm-up: loads language data once
+        start = time.perf_counter()
+        calls = 0
+        for _ in range(repeats):
+            for image in images:
+                engine.image_to_string(image, config)
+                calls += 1
+        seconds = time.perf_counter() - start
+        results[engine.name] = {
+            "calls": calls,
+            "seconds": seconds,
+            "ms_per_call": seconds * 1000 / calls,
+            "calls_per_second": calls / seconds if seconds else float("inf"),
+        }
+    return results
+
+
+if __name__ == "__main__":
+    import argparse
+
+    import cv2
+
+    parser = argparse.ArgumentParser(description="Compare OCR engine throughput on screenshots or ROI crops.")
+    parser.add_argument("images", nargs="+", help="Image files to OCR")
+    parser.add_argument("--config", default="--psm 6", help="Tesseract config string")
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    crops = [cv2.imread(path, cv2.IMREAD_GRAYSCALE) for path in args.images]
+    for name, stats in benchmark_engines([c for c in crops if c is not None], config=args.config, repeats=args.repeats).items():
+        print(f"{name:12s} {stats['calls']:5d} calls  {stats['ms_per_call']:8.1f} ms/call  {stats['calls_per_second']:7.1f} calls/s")
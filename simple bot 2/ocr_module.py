@@ -1,9 +1,22 @@
 import logging
-import pytesseract
+import numpy as np
 from PIL import Image
+from ocr_engine import get_engine
+from text_proposals import read_text_regions
 
 class OCRModule:
-    def __init__(self):
+    def __init__(self, engine=None, propose_regions=False):
+        """
+        Args:
+            engine (OCREngine): Defaults to the shared engine.
+            propose_regions (bool): OCR only the proposed text boxes of an image (see
+                text_proposals) instead of the whole image; blank images skip OCR entirely.
+                Opt-in: the joined box texts differ from a whole-image read, so enable it
+                only where the output has been checked (BaseModule's calibrate_offset and
+                capture_and_process_point call read_text_regions directly).
+        """
+        self.engine = engine or get_engine()
+        self.propose_regions = propose_regions
         self.logger = logging.getLogger("OCRModule")
         self._setup_logging()
 
@@ -16,13 +29,26 @@ class OCRModule:
 
     def extract_text(self, image_path):
         """
-        Uses Tesseract (pytesseract) to extract text from `image_path`.
+        Uses the shared OCR engine (see ocr_engine) to extract text from `image_path`,
+        or from an image already in memory (e.g. a pop-up crop from popup_locator).
         Returns a string of recognized text.
         """
+        if isinstance(image_path, np.ndarray):
+            self.logger.info(f"OCR on a {image_path.shape[1]}x{image_path.shape[0]} crop")
+            try:
+                if self.propose_regions:
+                    return read_text_regions(image_path, engine=self.engine)
+                return self.engine.image_to_string(image_path)
+            except Exception as e:
+                self.logger.error(f"Failed to perform OCR on the crop. Error: {e}")
+                return ""
+
         self.logger.info(f"OCR on {image_path}")
         try:
+            if self.propose_regions:
+                return read_text_regions(image_path, engine=self.engine)
             with Image.open(image_path) as img:
-                text = pytesseract.image_to_string(img)
+                text = self.engine.image_to_string(img)
             return text
         except Exception as e:
             self.logger.error(f"Failed to perform OCR on {image_path}. Error: {e}")
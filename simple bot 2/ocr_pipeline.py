@@ -0,0 +1,299 @@
+"""
+Declarative OCR preprocessing, one pipeline per ROI type.
+
+Each ROI type in rois.json (ocr_regions, tile_coordinates, node_types, ...)
+can declare how its crops are prepared and read under a top-level
+"pipelines" key; types without an entry use DEFAULT_PIPELINES:
+
+    "pipelines": {
+        "ocr_regions": {"scale": 2.0, "threshold": "otsu", "psm": 7, "whitelist": "KXY:0123456789"},
+        "node_types": {"threshold": "otsu", "invert": false, "dilate": 0, "psm": 6}
+    }
+
+A Pipeline is compiled once into a list of OpenCV steps and applied to
+in-memory crops; Frame.preprocess memoizes the result per ROI.
+
+    pipelines = load_pipelines("rois.json")
+    crop = Frame.of(image).preprocess(roi, pipelines["ocr_regions"])
+    text = get_engine().image_to_string(crop, config=pipelines["ocr_regions"].config)
+
+`python ocr_pipeline.py tune --roi-log roi_log.csv --roi-type ocr_regions`
+picks the fastest candidate pipeline that reaches an accuracy bar on a
+labeled set.
+"""
+
+import csv
+import itertools
+import json
+import logging
+import os
+import re
+import time
+
+import cv2
+import numpy as np
+
+from frame import Frame
+from ocr_batch import normalize_roi
+from ocr_engine import get_engine
+
+logger = logging.getLogger("OCRPipeline")
+
+THRESHOLDS = ("none", "otsu", "adaptive")
+
+DEFAULT_PIPELINES = {
+    "default": {"threshold": "otsu", "psm": 6},
+    # K/X/Y coordinate banners: one short line of a known alphabet.
+    "ocr_regions": {"scale": 2.0, "threshold": "otsu", "psm": 7, "whitelist": "KXY:0123456789"},
+    "tile_coordinates": {"scale": 2.0, "threshold": "otsu", "psm": 7, "whitelist": "KXY:0123456789"},
+    "center_tile": {"scale": 2.0, "threshold": "otsu", "psm": 7, "whitelist": "KXY:0123456789"},
+    "popups": {"threshold": "otsu", "psm": 6},
+    "node_types": {"threshold": "otsu", "psm": 6},
+    "resource_type": {"threshold": "otsu", "psm": 6},
+    "occupier": {"threshold": "otsu", "psm": 6},
+    # Whole-screen reads (calibration, grid sweeps) with uneven backgrounds.
+    "full_screen": {"threshold": "adaptive", "psm": 3},
+}
+
+
+class Pipeline:
+    """A fixed sequence of preprocessing steps plus the Tesseract config to read the result with."""
+
+    def __init__(self, scale=1.0, threshold="otsu", invert=False, dilate=0, psm=6, whitelist=None, name=None):
+        """
+        Args:
+            scale (float): Resize factor applied first (cubic when enlarging, area when shrinking).
+            threshold (str): "otsu", "adaptive" or "none".
+            invert (bool): Flip black and white after thresholding (Tesseract prefers dark text on light).
+            dilate (int): Square kernel size for a dilation after inversion; 0 disables it.
+                On dark text over a light background this thins the strokes.
+            psm (int): Tesseract page segmentation mode.
+            whitelist (str): Characters Tesseract may output; None allows all.
+            name (str): Label for logs and tuning reports.
+        """
+        threshold = threshold or "none"
+        if threshold not in THRESHOLDS:
+            raise ValueError(f"Unknown threshold method: {threshold}")
+        self.scale = float(scale)
+        self.threshold = threshold
+        self.invert = bool(invert)
+        self.dilate = int(dilate)
+        self.psm = int(psm)
+        self.whitelist = whitelist or None
+        self.name = name
+        self.key = (self.scale, self.threshold, self.invert, self.dilate)  # Pixel steps only
+        self.config = self._build_config()
+        self._steps = self._compile()
+
+    def _build_config(self):
+        config = f"--psm {self.psm}"
+        if self.whitelist:
+            config += f" -c tessedit_char_whitelist={self.whitelist}"
+        return config
+
+    def _compile(self):
+        steps = []
+        if self.scale != 1.0:
+            interpolation = cv2.INTER_CUBIC if self.scale > 1.0 else cv2.INTER_AREA
+            scale = self.scale
+            steps.append(lambda img: cv2.resize(img, None, fx=scale, fy=scale, interpolation=interpolation))
+        if self.threshold == "otsu":
+            steps.append(lambda img: cv2.threshold(img, 128, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)[1])
+        elif self.threshold == "adaptive":
+            steps.append(lambda img: cv2.adaptiveThreshold(img, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
+                                                           cv2.THRESH_BINARY, 11, 2))
+        if self.invert:
+            steps.append(cv2.bitwise_not)
+        if self.dilate > 0:
+            kernel = np.ones((self.dilate, self.dilate), dtype=np.uint8)
+            steps.append(lambda img: cv2.dilate(img, kernel))
+        return steps
+
+    def apply(self, gray):
+        """Run the compiled steps on a 2-D uint8 crop."""
+        for step in self._steps:
+            gray = step(gray)
+        return gray
+
+    def to_dict(self):
+        spec = {"scale": self.scale, "threshold": self.threshold, "invert": self.invert,
+                "dilate": self.dilate, "psm": self.psm}
+        if self.whitelist:
+            spec["whitelist"] = self.whitelist
+        return spec
+
+    @classmethod
+    def from_dict(cls, spec, name=None):
+        return cls(name=name, **spec)
+
+    def __reduce__(self):
+        # Compiled steps are closures; rebuild them instead of pickling (OCRService workers).
+        return (self.__class__, (self.scale, self.threshold, self.invert, self.dilate, self.psm,
+                                 self.whitelist, self.name))
+
+    def __repr__(self):
+        return f"Pipeline({self.name or ''}: {self.to_dict()})"
+
+
+def load_pipelines(roi_file="rois.json"):
+    """
+    Compile the pipelines declared in `roi_file` over DEFAULT_PIPELINES.
+
+    Returns:
+        dict: ROI type -> Pipeline. Always contains "default".
+    """
+    specs = {name: dict(spec) for name, spec in DEFAULT_PIPELINES.items()}
+    try:
+        with open(roi_file, "r") as f:
+            declared = json.load(f).get("pipelines", {})
+    except (OSError, ValueError) as e:
+        logger.warning(f"Could not read pipelines from {roi_file}: {e}; using defaults.")
+        declared = {}
+    for name, spec in declared.items():
+        specs[name] = dict(spec)
+    return {name: Pipeline.from_dict(spec, name=name) for name, spec in specs.items()}
+
+
+def pipeline_for(pipelines, roi_type):
+    """The pipeline of `roi_type`, or the default one."""
+    return pipelines.get(roi_type) or pipelines["default"]
+
+
+def save_pipeline(roi_file, roi_type, pipeline):
+    """Declare `pipeline` for `roi_type` in `roi_file`, keeping everything else."""
+    with open(roi_file, "r") as f:
+        rois = json.load(f)
+    rois.setdefault("pipelines", {})[roi_type] = pipeline.to_dict()
+    with open(roi_file, "w") as f:
+        json.dump(rois, f, indent=4)
+
+
+# -- tuning -------------------------------------------------------------------
+
+def _normalize_text(text):
+    return re.sub(r"\s+", "", text or "").upper()
+
+
+def candidate_pipelines(scales=(1.0, 2.0), thresholds=("none", "otsu", "adaptive"), inverts=(False,),
+                        dilates=(0, 2), psms=(6, 7), whitelists=(None,)):
+    """Every combination of the given settings, as Pipelines."""
+    candidates = []
+    for scale, threshold, invert, dilate, psm, whitelist in itertools.product(
+            scales, thresholds, inverts, dilates, psms, whitelists):
+        candidates.append(Pipeline(scale, threshold, invert, dilate, psm, whitelist,
+                                   name=f"s{scale:g}-{threshold}{'-inv' if invert else ''}-d{dilate}-psm{psm}"
+                                        f"{'-wl' if whitelist else ''}"))
+    return candidates
+
+
+def evaluate(pipeline, samples, engine=None, matches=None):
+    """
+    Accuracy and speed of one pipeline on a labeled set.
+
+    Args:
+        samples (list): (image, roi, expected_text) tuples; images are paths, arrays or Frames.
+        engine (OCREngine): Defaults to the shared engine (pass an uncached one for fair timings).
+        matches (callable): matches(text, expected) -> bool; defaults to equality ignoring
+            whitespace and case.
+
+    Returns:
+        dict: {"name", "accuracy", "ms_per_roi", "pipeline"}
+    """
+    engine = engine or get_engine()
+    matches = matches or (lambda text, expected: _normalize_text(text) == _normalize_text(expected))
+    correct = 0
+    seconds = 0.0
+    for image, roi, expected in samples:
+        frame = Frame.of(image)
+        start = time.perf_counter()
+        crop = frame.crop(normalize_roi(roi))
+        text = "" if crop is None else engine.image_to_string(pipeline.apply(crop), config=pipeline.config)
+        seconds += time.perf_counter() - start
+        correct += bool(matches(text, expected))
+    return {
+        "name": pipeline.name,
+        "accuracy": correct / len(samples) if samples else 0.0,
+        "ms_per_roi": seconds * 1000 / len(samples) if samples else 0.0,
+        "pipeline": pipeline.to_dict(),
+    }
+
+
+def tune(samples, candidates=None, engine=None, min_accuracy=0.95, matches=None):
+    """
+    Pick the fastest candidate whose accuracy on `samples` is at least `min_accuracy`.
+
+    Returns:
+        tuple: (best Pipeline or None, list of evaluate() reports sorted fastest first)
+    """
+    candidates = candidates or candidate_pipelines()
+    frames = [(Frame.of(image), roi, expected) for image, roi, expected in samples]  # Decode once for all candidates
+    reports = sorted((evaluate(p, frames, engine, matches) for p in candidates), key=lambda r: r["ms_per_roi"])
+    by_name = {p.name: p for p in candidates}
+    for report in reports:
+        if report["accuracy"] >= min_accuracy:
+            return by_name[report["name"]], reports
+    return None, reports
+
+
+def load_roi_log(csv_path="roi_log.csv", screenshots_dir="screenshots"):
+    """
+    Labeled coordinate crops from the renaming tool's roi_log.csv: the renamed
+    screenshot, its coordinate box and "K:<k> X:<x> Y:<y>".
+    """
+    samples = []
+    with open(csv_path, "r", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            if not row.get("k_val") or not row.get("new_filename"):
+                continue
+            path = os.path.join(screenshots_dir, row["new_filename"])
+            if not os.path.exists(path):
+                continue
+            roi = tuple(int(float(row[f"coord_box_{side}"])) for side in ("left", "top", "right", "bottom"))
+            samples.append((path, roi, f"K:{row['k_val']} X:{row['x_val']} Y:{row['y_val']}"))
+    return samples
+
+
+def load_labels(json_path):
+    """Labeled crops from a JSON list of {"image", "roi", "text"} objects."""
+    with open(json_path, "r") as f:
+        return [(entry["image"], tuple(entry["roi"]), entry["text"]) for entry in json.load(f)]
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from ocr_engine import create_engine
+
+    parser = argparse.ArgumentParser(description="OCR preprocessing pipelines.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    tune_parser = sub.add_parser("tune", help="Pick the fastest pipeline meeting an accuracy bar")
+    tune_parser.add_argument("--labels", help='JSON list of {"image", "roi", "text"}')
+    tune_parser.add_argument("--roi-log", help="roi_log.csv written by screenshot_rename_crop.py")
+    tune_parser.add_argument("--screenshots", default="screenshots")
+    tune_parser.add_argument("--roi-type", default="ocr_regions", help="rois.json ROI type to tune")
+    tune_parser.add_argument("--min-accuracy", type=float, default=0.95)
+    tune_parser.add_argument("--whitelist", help="Also try this character whitelist")
+    tune_parser.add_argument("--roi-file", default="rois.json")
+    tune_parser.add_argument("--write", action="store_true", help="Save the winner to --roi-file")
+    args = parser.parse_args()
+
+    labeled = []
+    if args.labels:
+        labeled += load_labels(args.labels)
+    if args.roi_log:
+        labeled += load_roi_log(args.roi_log, args.screenshots)
+    if not labeled:
+        parser.error("No labeled samples (use --labels and/or --roi-log).")
+
+    whitelists = (None, args.whitelist) if args.whitelist else (None,)
+    best, results = tune(labeled, candidate_pipelines(whitelists=whitelists), engine=create_engine(),
+                         min_accuracy=args.min_accuracy)
+    for result in results:
+        print(f"{result['name']:32s} accuracy {result['accuracy']:6.1%}  {result['ms_per_roi']:8.1f} ms/ROI")
+    if best is None:
+        print(f"❌ No pipeline reached {args.min_accuracy:.0%} on {len(labeled)} samples.")
+    else:
+        print(f"✅ Fastest pipeline at >= {args.min_accuracy:.0%}: {best.name} {best.to_dict()}")
+        if args.write:
+            save_pipeline(args.roi_file, args.roi_type, best)
+            print(f"💾 Saved as the '{args.roi_type}' pipeline in {args.roi_file}")
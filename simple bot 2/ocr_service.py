@@ -0,0 +1,187 @@
+"""
+Process-pool OCR service.
+
+OCR is CPU-bound, so running it inline on the thread that drives the device
+leaves the emulator idle. OCRService owns a pool of worker processes (each
+with its own engine, cache and glyph bank) behind a bounded submission
+queue: submit_text / submit_rois return futures immediately, and block
+(backpressure) only when `max_pending` jobs are already queued.
+
+    with OCRService() as service:
+        future = service.submit_rois(frame, {"center": (786, 100, 1019, 137)})
+        ...keep tapping...
+        texts = future.result()
+
+Work done on a result should be chained with service.then(future, fn) rather
+than future.add_done_callback: drain() then also waits for those callbacks,
+not only for the OCR jobs themselves.
+"""
+
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor, wait as wait_futures
+
+from cpu_cores import physical_cores
+from frame import Frame
+from glyph_ocr import DEFAULT_BANK, GlyphOCR
+from ocr_batch import BATCH_CONFIG, ocr_rois
+from ocr_cache import CachedEngine
+from ocr_engine import create_engine
+
+logger = logging.getLogger("OCRService")
+
+
+# -- worker process side ------------------------------------------------------
+
+_worker_engine = None
+_worker_glyphs = None
+
+
+def _init_worker(engine_factory, engine_name, bank_path):
+    global _worker_engine, _worker_glyphs
+    engine = engine_factory() if engine_factory else create_engine(engine_name)
+    _worker_engine = CachedEngine(engine)
+    _worker_glyphs = GlyphOCR(bank_path=bank_path, engine=_worker_engine)
+    _worker_glyphs.bank_path = None  # Learn in memory only; workers must not race on the bank file
+
+
+def _worker_text(image, config):
+    return _worker_engine.image_to_string(image, config)
+
+
+def _worker_rois(image, rois, config, threshold, coordinate_rois, pipelines):
+    return ocr_rois(image, rois, engine=_worker_engine, config=config, threshold=threshold,
+                    glyphs=_worker_glyphs if coordinate_rois else None, coordinate_rois=coordinate_rois,
+                    pipelines=pipelines)
+
+
+# -- caller side --------------------------------------------------------------
+
+def then(future, fn):
+    """Return a Future for fn(future.result()), resolved when `future` is."""
+    chained = Future()
+
+    def resolve(done):
+        try:
+            chained.set_result(fn(done.result()))
+        except Exception as e:
+            chained.set_exception(e)
+
+    future.add_done_callback(resolve)
+    return chained
+
+
+class OCRService:
+    """Pool of OCR worker processes with a bounded queue of pending jobs."""
+
+    def __init__(self, workers=None, max_pending=None, engine_name=None, engine_factory=None, bank_path=DEFAULT_BANK):
+        """
+        Args:
+            workers (int): Worker processes (default: the number of physical cores).
+            max_pending (int): Jobs queued or running before submit() blocks (default: 2 per worker).
+            engine_name (str): Engine for the workers (see ocr_engine.ENGINES; default: fastest available).
+            engine_factory (callable): Picklable callable returning an OCREngine; overrides engine_name.
+            bank_path (str): Glyph bank the workers load for coordinate ROIs.
+        """
+        self.workers = workers or physical_cores()
+        self.max_pending = max_pending or 2 * self.workers
+        self.logger = logging.getLogger("OCRService")
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+        self._pending = set()
+        self._callbacks = set()  # Futures of then() callbacks that have not finished yet
+        self._lock = threading.Lock()
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            initializer=_init_worker,
+            initargs=(engine_factory, engine_name, bank_path if bank_path and os.path.exists(bank_path) else None),
+        )
+        self.stats = {"submitted": 0, "completed": 0, "failed": 0, "blocked": 0, "blocked_seconds": 0.0}
+        self.logger.info(f"OCR service started with {self.workers} workers (queue of {self.max_pending})")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _submit(self, fn, *args, timeout=None):
+        if not self._slots.acquire(blocking=False):
+            # Backpressure: wait for a running job to finish before queueing more.
+            start = time.perf_counter()
+            if not self._slots.acquire(timeout=timeout):
+                raise queue.Full(f"OCR queue still full after {timeout}s")
+            self.stats["blocked"] += 1
+            self.stats["blocked_seconds"] += time.perf_counter() - start
+        try:
+            future = self._executor.submit(fn, *args)
+        except Exception:
+            self._slots.release()
+            raise
+        with self._lock:
+            self._pending.add(future)
+            self.stats["submitted"] += 1
+        future.add_done_callback(self._done)
+        return future
+
+    def _done(self, future):
+        with self._lock:
+            self._pending.discard(future)
+            self.stats["failed" if future.cancelled() or future.exception() else "completed"] += 1
+        self._slots.release()
+
+    @staticmethod
+    def _payload(image):
+        """What to send to a worker: a path stays a path, a Frame sends its decoded pixels."""
+        if isinstance(image, Frame):
+            return image.path if image.path is not None else image.image
+        return image
+
+    def submit_text(self, image, config="", timeout=None):
+        """Queue image_to_string for a path or frame. Returns a Future of the text."""
+        return self._submit(_worker_text, self._payload(image), config, timeout=timeout)
+
+    def submit_rois(self, image, rois, config=BATCH_CONFIG, threshold=None, coordinate_rois=(), timeout=None,
+                    pipelines=None):
+        """Queue a batched ocr_rois call (see ocr_batch.ocr_rois). Returns a Future of name -> {text, conf}."""
+        return self._submit(_worker_rois, self._payload(image), dict(rois), config, threshold,
+                            list(coordinate_rois), pipelines, timeout=timeout)
+
+    def then(self, future, fn):
+        """Like then(future, fn), but drain() also waits for fn to return."""
+        chained = then(future, fn)
+        with self._lock:
+            self._callbacks.add(chained)
+        chained.add_done_callback(self._callback_done)
+        return chained
+
+    def _callback_done(self, chained):
+        with self._lock:
+            self._callbacks.discard(chained)
+
+    def pending(self):
+        with self._lock:
+            return len(self._pending)
+
+    def drain(self, timeout=None):
+        """
+        Block until every submitted job, and every callback chained with then(), has finished.
+
+        Returns:
+            bool: False if `timeout` expired first.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._lock:
+                waiting = list(self._pending | self._callbacks)
+            if not waiting:
+                return True
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                return False
+            wait_futures(waiting, timeout=remaining)
+
+    def close(self, wait=True):
+        self._executor.shutdown(wait=wait)
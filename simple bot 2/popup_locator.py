@@ -0,0 +1,148 @@
+"""
+Find the pop-up panel in a screenshot so OCR reads the panel, not the map.
+
+OCR-ing a whole 1600x900 frame to read a small pop-up is slow and returns
+map labels along with the pop-up text. PopupLocator finds the panel
+rectangle from the long straight edges of a downscaled frame (panel borders
+survive a line-shaped morphological opening; map blobs and text do not) and,
+when the Close button template is available, prefers the rectangle the
+button is anchored to. Callers fall back to the full frame when no panel is
+found.
+
+    locator = PopupLocator("templates/close_button.png")
+    panel = locator.crop(frame)          # grayscale panel crop, or None
+    text = ocr.extract_text(panel if panel is not None else screenshot_path)
+"""
+
+import logging
+import os
+
+import cv2
+import numpy as np
+
+from frame import Frame
+from screencap import load_grayscale
+from ui_wait import CLOSE_BUTTON_POSITIONS, find_close_button
+
+CLOSE_BUTTON_TEMPLATE = "templates/close_button.png"
+
+
+def _area(box):
+    return (box[2] - box[0]) * (box[3] - box[1])
+
+
+class PopupLocator:
+    """Locates the pop-up panel rectangle by contours, anchored on the Close button when possible."""
+
+    def __init__(self, template=CLOSE_BUTTON_TEMPLATE, scale=0.25, min_area=0.02, max_area=0.9,
+                 min_fill=0.85, min_line=0.1, margin=4, anchor_distance=120):
+        """
+        Args:
+            template (str or numpy.ndarray): Close button template; a missing path disables the anchor.
+            scale (float): Downscale factor for the edge search (edges of a panel survive it).
+            min_area (float): Smallest panel, as a fraction of the frame area.
+            max_area (float): Largest panel, as a fraction of the frame area.
+            min_fill (float): Contour area / bounding box area; panels are near-perfect rectangles.
+            min_line (float): Shortest border segment kept, as a fraction of the frame width/height.
+            margin (int): Pixels added around the panel (full resolution).
+            anchor_distance (int): How far (full resolution) the Close button may sit from a
+                panel for that panel to count as anchored.
+        """
+        self.logger = logging.getLogger("PopupLocator")
+        if isinstance(template, str):
+            template = load_grayscale(template) if os.path.exists(template) else None
+        self.template = template
+        self.scale = scale
+        self.min_area = min_area
+        self.max_area = max_area
+        self.min_fill = min_fill
+        self.min_line = min_line
+        self.margin = margin
+        self.anchor_distance = anchor_distance
+        self._kernel = np.ones((3, 3), dtype=np.uint8)
+        self.stats = {"panel": 0, "anchored": 0, "fallback": 0}
+
+    def find_anchor(self, gray):
+        """Center of the Close button, or None (no template or no match)."""
+        if self.template is None:
+            return None
+        return find_close_button(gray, self.template, CLOSE_BUTTON_POSITIONS)
+
+    def candidates(self, gray):
+        """Panel-like rectangles (x1, y1, x2, y2) at full resolution, largest first."""
+        small = cv2.resize(gray, None, fx=self.scale, fy=self.scale, interpolation=cv2.INTER_AREA)
+        edges = cv2.dilate(cv2.Canny(small, 50, 150), self._kernel)
+        # Keep only long horizontal and vertical segments: the panel border.
+        height, width = small.shape
+        horizontal = cv2.morphologyEx(edges, cv2.MORPH_OPEN, np.ones((1, max(3, int(width * self.min_line))), np.uint8))
+        vertical = cv2.morphologyEx(edges, cv2.MORPH_OPEN, np.ones((max(3, int(height * self.min_line)), 1), np.uint8))
+        lines = cv2.morphologyEx(horizontal | vertical, cv2.MORPH_CLOSE, self._kernel, iterations=2)
+        contours, _ = cv2.findContours(lines, cv2.RETR_LIST, cv2.CHAIN_APPROX_SIMPLE)
+
+        frame_area = small.shape[0] * small.shape[1]
+        boxes = []
+        for contour in contours:
+            x, y, w, h = cv2.boundingRect(contour)
+            area = w * h
+            if not self.min_area * frame_area <= area <= self.max_area * frame_area:
+                continue
+            if cv2.contourArea(contour) < self.min_fill * area:
+                continue
+            boxes.append((x, y, x + w, y + h))
+        # A border yields an outer and an inner contour, and the outer one can pick up map
+        # clutter touching the panel; keep the inner one of such nested pairs.
+        boxes = [b for b in boxes if not any(self._nested(inner, b) for inner in boxes if inner != b)]
+        boxes.sort(key=_area, reverse=True)
+        return [tuple(int(round(v / self.scale)) for v in box) for box in boxes]
+
+    @staticmethod
+    def _nested(inner, outer, min_ratio=0.8):
+        """`inner` lies inside `outer` and covers most of it."""
+        inside = inner[0] >= outer[0] and inner[1] >= outer[1] and inner[2] <= outer[2] and inner[3] <= outer[3]
+        return inside and _area(inner) >= min_ratio * _area(outer)
+
+    def _anchored(self, box, anchor):
+        """Distance from the anchor to the box (0 inside it)."""
+        x1, y1, x2, y2 = box
+        ax, ay = anchor
+        dx = max(x1 - ax, 0, ax - x2)
+        dy = max(y1 - ay, 0, ay - y2)
+        return max(dx, dy)
+
+    def locate(self, image):
+        """
+        Return the pop-up panel as (x1, y1, x2, y2), or None if no panel was found.
+
+        Args:
+            image: Path, decoded frame or Frame.
+        """
+        frame = Frame.of(image)
+        if not frame.is_valid():
+            return None
+        gray = frame.gray
+        boxes = self.candidates(gray)
+        if not boxes:
+            return None
+        anchor = self.find_anchor(gray)
+        box = boxes[0]
+        if anchor is not None:
+            anchored = [b for b in boxes if self._anchored(b, anchor) <= self.anchor_distance]
+            if anchored:
+                # The Close button sits on the panel's top-right corner.
+                box = min(anchored, key=lambda b: abs(b[2] - anchor[0]) + abs(b[1] - anchor[1]))
+                self.stats["anchored"] += 1
+        height, width = gray.shape
+        x1, y1, x2, y2 = box
+        return (max(x1 - self.margin, 0), max(y1 - self.margin, 0),
+                min(x2 + self.margin, width), min(y2 + self.margin, height))
+
+    def crop(self, image):
+        """Grayscale crop of the pop-up panel, or None (OCR the full frame instead)."""
+        frame = Frame.of(image)
+        box = self.locate(frame)
+        if box is None:
+            self.stats["fallback"] += 1
+            self.logger.debug("No pop-up panel found; use the full frame.")
+            return None
+        self.stats["panel"] += 1
+        return frame.crop(box)
@@ -0,0 +1,143 @@
+"""
+Confidence-driven early exit over alternative ROIs.
+
+Several fields can appear in one of a few places: the clicked tile's
+coordinates sit in a different pop-up ROI per pop-up type, and the
+coordinate banner has several candidate `ocr_regions`. FallbackChain tries
+them in a learned order (most recently successful first, then most often
+successful) and stops at the first parse whose OCR confidence clears the
+bar; the remaining ROIs are only read, in one batch, when that fails.
+
+    chain = FallbackChain("popup", min_confidence=80)
+    name, coords = chain.run(["popup:0", "popup:1"], read, parse_coordinates)
+    chain.savings()  # {"expected_reads": ..., "fixed_order_reads": ..., ...}
+"""
+
+import logging
+from collections import Counter
+
+
+class FallbackChain:
+    """Learned ordering and early exit for ROIs that are alternatives for the same field."""
+
+    def __init__(self, name, min_confidence=80.0, log_every=50):
+        """
+        Args:
+            name (str): Label for logs.
+            min_confidence (float): OCR confidence (0-100) at which a successful parse ends the chain.
+            log_every (int): Log the expected-cost savings every this many runs (0 disables it).
+        """
+        self.name = name
+        self.min_confidence = min_confidence
+        self.log_every = log_every
+        self.logger = logging.getLogger("FallbackChain")
+        self._tick = 0
+        self.last_success = {}  # context -> {roi name: tick of its last success}
+        self.successes = {}     # context -> Counter of successes per roi name
+        self.runs = Counter()   # context -> runs
+        self.names = {}         # context -> the fixed ROI order last passed to run()
+        self.stats = {"runs": 0, "early_exits": 0, "near_misses": 0, "failures": 0,
+                      "rois_read": 0, "rois_available": 0}
+
+    def order(self, names, context="default"):
+        """`names` sorted most recently successful first, then by success count; ties keep their order."""
+        last = self.last_success.get(context, {})
+        counts = self.successes.get(context, Counter())
+        position = {name: i for i, name in enumerate(names)}
+        return sorted(names, key=lambda name: (-last.get(name, -1), -counts[name], position[name]))
+
+    def record(self, name, context="default"):
+        self._tick += 1
+        self.last_success.setdefault(context, {})[name] = self._tick
+        self.successes.setdefault(context, Counter())[name] += 1
+
+    def run(self, names, read, parse, context="default"):
+        """
+        Read ROIs until one parses with enough confidence.
+
+        Args:
+            names (list): ROI names in their fixed (configured) order.
+            read (callable): read(list of names) -> {name: {"text", "conf"}}; called with the
+                top-ranked name first, then (only if needed) with all the others at once.
+            parse (callable): parse(text) -> value, or None when the text does not parse.
+            context (str): Orderings are learned separately per context (e.g. per scan area).
+
+        Returns:
+            tuple: (name, value) of the winning ROI. A parse below min_confidence is kept as a
+            near miss and returned only if no ROI clears the bar; (None, None) if nothing parses.
+        """
+        ordered = self.order(list(names), context)
+        self.stats["runs"] += 1
+        self.stats["rois_available"] += len(ordered)
+        self.runs[context] += 1
+        self.names[context] = list(names)
+        near_miss = None
+        for stage, batch in enumerate((ordered[:1], ordered[1:])):
+            if not batch:
+                continue
+            texts = read(batch)
+            self.stats["rois_read"] += len(batch)
+            for name in batch:
+                result = texts.get(name) or {"text": "", "conf": -1.0}
+                value = parse(result["text"])
+                if value is None:
+                    continue
+                if result["conf"] >= self.min_confidence:
+                    if stage == 0:
+                        self.stats["early_exits"] += 1
+                    return self._won(name, value, context)
+                if near_miss is None:
+                    near_miss = (name, value)
+        if near_miss is not None:
+            self.stats["near_misses"] += 1
+            return self._won(*near_miss, context)
+        self.stats["failures"] += 1
+        self._maybe_log(context)
+        return None, None
+
+    def _won(self, name, value, context):
+        self.record(name, context)
+        self._maybe_log(context)
+        return name, value
+
+    def expected_reads(self, order, context="default"):
+        """
+        Expected ROIs read per run if ROIs were tried one by one in `order`, from the observed
+        success rates: a run that no ROI satisfies reads them all.
+        """
+        runs = self.runs[context]
+        if not runs:
+            return float(len(order))
+        counts = self.successes.get(context, Counter())
+        expected = 0.0
+        for position, name in enumerate(order, start=1):
+            expected += position * counts[name] / runs
+        unresolved = max(0.0, 1.0 - sum(counts[name] for name in order) / runs)
+        return expected + unresolved * len(order)
+
+    def savings(self, names=None, context="default"):
+        """
+        Expected ROI reads per run under the learned order versus the fixed order, plus the
+        reads actually spent so far compared with reading every ROI on every run.
+        """
+        names = list(names) if names is not None else self.names.get(context, [])
+        learned = self.expected_reads(self.order(names, context), context)
+        fixed = self.expected_reads(names, context)
+        available = self.stats["rois_available"]
+        return {
+            "expected_reads": learned,
+            "fixed_order_reads": fixed,
+            "expected_saving": 1.0 - learned / fixed if fixed else 0.0,
+            "rois_read": self.stats["rois_read"],
+            "rois_available": available,
+            "actual_saving": 1.0 - self.stats["rois_read"] / available if available else 0.0,
+        }
+
+    def _maybe_log(self, context):
+        if self.log_every and self.stats["runs"] % self.log_every == 0:
+            savings = self.savings(context=context)
+            self.logger.info(
+                f"{self.name}: {self.stats['early_exits']}/{self.stats['runs']} early exits, "
+                f"read {self.stats['rois_read']} of {self.stats['rois_available']} ROIs "
+                f"({savings['actual_saving']:.0%} saved); expected {savings['expected_reads']:.2f} reads/run "
+                f"learned vs {savings['fixed_order_reads']:.2f} in fixed order")
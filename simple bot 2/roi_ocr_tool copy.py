@@ -48,7 +48,8 @@ class ROISelector:
         self.load_existing_rois()
 
         # Dropdown for ROI Type Selection
-        roi_types = list(self.all_rois.keys()) + list(self.all_rois["node_types"].keys())
+        # "pipelines" holds OCR preprocessing settings (see ocr_pipeline.py), not rectangles
+        roi_types = [key for key in self.all_rois if key != "pipelines"] + list(self.all_rois["node_types"].keys())
         self.roi_type_menu = tk.StringVar(master)
         self.roi_type_menu.set("tile_scanning")
         self.dropdown = tk.OptionMenu(master, self.roi_type_menu, *roi_types, command=self.change_roi_type)
@@ -0,0 +1,133 @@
+import gzip
+import statistics
+import struct
+import time
+
+import cv2
+import numpy as np
+
+# Shell commands run through `exec-out` for each capture mode.
+#   png  - PNG encoded on the device (small transfer, slow encode)
+#   raw  - framebuffer dump: a small header followed by RGBA bytes
+#   gzip - raw framebuffer compressed on the device with a fast gzip level
+CAPTURE_COMMANDS = {
+    "png": "screencap -p",
+    "raw": "screencap",
+    "gzip": "screencap | gzip -1",
+}
+
+
+def decode_png(data):
+    """
+    Decode the PNG bytes produced by `screencap -p` into a BGR image.
+
+    Args:
+        data (bytes): Raw PNG data as streamed from the device.
+
+    Returns:
+        numpy.ndarray: The decoded frame (height x width x 3, BGR).
+    """
+    frame = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+    if frame is None:
+        raise ValueError("Failed to decode screencap PNG data.")
+    return frame
+
+
+def decode_raw(data):
+    """
+    Wrap the output of a plain `screencap` in an RGBA array without copying.
+
+    The header is width, height and pixel format as little-endian uint32
+    (Android 9+ appends a fourth colorspace field). The returned array is a
+    read-only view over `data`, so ROI crops such as frame[100:137, 786:1019]
+    are views as well.
+
+    Args:
+        data (bytes): Raw screencap output.
+
+    Returns:
+        numpy.ndarray: The frame (height x width x 4, RGBA).
+    """
+    if len(data) < 12:
+        raise ValueError("Raw screencap data is too short.")
+    width, height, _pixel_format = struct.unpack_from("<III", data, 0)
+    pixel_bytes = width * height * 4
+    header_size = len(data) - pixel_bytes
+    if header_size not in (12, 16):
+        raise ValueError(f"Unexpected raw screencap size {len(data)} for {width}x{height}.")
+    return np.frombuffer(memoryview(data), dtype=np.uint8, count=pixel_bytes, offset=header_size).reshape(height, width, 4)
+
+
+def decode_capture(mode, data):
+    """Decode the bytes streamed for `mode` (see CAPTURE_COMMANDS)."""
+    if mode == "png":
+        return decode_png(data)
+    if mode == "raw":
+        return decode_raw(data)
+    if mode == "gzip":
+        return decode_raw(gzip.decompress(data))
+    raise ValueError(f"Unknown capture mode: {mode}")
+
+
+def encode_png(frame):
+    """Encode a decoded frame (BGR or RGBA) back into PNG bytes for saving."""
+    if frame.ndim == 3 and frame.shape[2] == 4:
+        frame = cv2.cvtColor(frame, cv2.COLOR_RGBA2BGR)
+    ok, png = cv2.imencode(".png", frame)
+    if not ok:
+        raise ValueError("Failed to encode frame as PNG.")
+    return png.tobytes()
+
+
+def benchmark_capture_modes(capture, modes=("png", "raw", "gzip"), samples=3):
+    """
+    Time each capture mode end to end (device encode, transfer and decode).
+
+    Args:
+        capture (callable): capture(mode) -> bytes streamed from the device.
+        modes (iterable): Modes to try.
+        samples (int): Captures per mode; the median is used.
+
+    Returns:
+        dict: mode -> {"seconds": median time, "bytes": transfer size,
+              "bandwidth": bytes per second over the link}. Modes that
+              failed on the device are left out.
+    """
+    results = {}
+    for mode in modes:
+        timings = []
+        size = 0
+        try:
+            for _ in range(samples):
+                start = time.perf_counter()
+                data = capture(mode)
+                decode_capture(mode, data)
+                timings.append(time.perf_counter() - start)
+                size = len(data)
+        except Exception:
+            continue
+        seconds = statistics.median(timings)
+        results[mode] = {"seconds": seconds, "bytes": size, "bandwidth": size / seconds if seconds else 0.0}
+    return results
+
+
+def choose_capture_mode(results, default="png"):
+    """Pick the fastest mode from benchmark_capture_modes() results."""
+    if not results:
+        return default
+    return min(results, key=lambda mode: results[mode]["seconds"])
+
+
+def load_grayscale(image):
+    """
+    Return a grayscale array for `image`, which may be a file path or an
+    already decoded frame (BGR from PNG captures, RGBA from raw captures).
+    Returns None if a path cannot be read.
+    """
+    if isinstance(image, str):
+        return cv2.imread(image, cv2.IMREAD_GRAYSCALE)
+    if image.ndim == 3 and image.shape[2] == 4:
+        return cv2.cvtColor(image, cv2.COLOR_RGBA2GRAY)
+    if image.ndim == 3:
+        return cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    return image
@@ -2,11 +2,20 @@
 
 import os
 import re
-from typing import Optional, Tuple
+from typing import Optional, Tuple, Union
 from PIL import Image, ImageOps
-import pytesseract
 import cv2
 import numpy as np
+from frame import Frame
+from glyph_ocr import GlyphOCR
+from ocr_batch import ocr_rois
+from ocr_engine import get_engine
+from ocr_pipeline import load_pipelines, pipeline_for
+from roi_fallback import FallbackChain
+
+# A screenshot on disk, a frame already decoded in memory (e.g. from ADBModule.capture_frame),
+# or a Frame shared between extractors.
+ImageSource = Union[str, np.ndarray, Frame]
 
 class ScreenshotProcessor:
     """
@@ -28,7 +37,12 @@ class ScreenshotProcessor:
         re.IGNORECASE
     )
 
-    def __init__(self, template_path='templates/close_button.png'):
+    def __init__(self, template_path='templates/close_button.png', engine=None, roi_file="rois.json"):
+        self.engine = engine or get_engine()
+        self.glyphs = GlyphOCR(engine=self.engine, learn=False)
+        self.pipelines = load_pipelines(roi_file)  # Preprocessing for the center and pop-up coordinate ROIs
+        self.popup_chain = FallbackChain("popup coordinates")  # Learned pop-up ROI order with early exit
+
         # Load the Close button template once during initialization
         if not os.path.exists(template_path):
             raise FileNotFoundError(f"Close button template not found at {template_path}")
@@ -37,18 +51,27 @@ class ScreenshotProcessor:
         self.close_button_np = np.array(template_image)
         self.template_width, self.template_height = template_image.size
 
-    def extract_text_from_roi(self, image_path: str, roi: Tuple[int, int, int, int]) -> str:
-        """Crop image to ROI, optionally preprocess, run OCR, return text."""
-        if not os.path.exists(image_path):
-            print(f"[WARN] Image not found: {image_path}")
+    def extract_text_from_roi(self, image: ImageSource, roi: Tuple[int, int, int, int],
+                              roi_type: Optional[str] = None) -> str:
+        """
+        Crop image to ROI, run OCR, return text. With `roi_type` the crop is preprocessed
+        and read with that type's rois.json pipeline; without it the raw crop is read with
+        the engine's default config, as before pipelines existed.
+        """
+        if isinstance(image, str) and not os.path.exists(image):
+            print(f"[WARN] Image not found: {image}")
             return ""
 
         try:
-            with Image.open(image_path) as img:
-                cropped = img.crop(roi).convert("L")
-                # Optional: Apply thresholding to improve OCR accuracy
-                # cropped = cropped.point(lambda x: 0 if x < 128 else 255, '1')
-                text = pytesseract.image_to_string(cropped).strip()
+            if roi_type is None:
+                cropped, config = Frame.of(image).crop(roi), ""
+            else:
+                pipeline = pipeline_for(self.pipelines, roi_type)
+                cropped, config = Frame.of(image).preprocess(roi, pipeline), pipeline.config
+            if cropped is None:
+                print(f"[WARN] Could not crop ROI {roi} from {image}")
+                return ""
+            text = self.engine.image_to_string(cropped, config=config).strip()
             print(f"[DEBUG] OCR from ROI {roi}: {text}")
             return text
         except Exception as e:
@@ -79,7 +102,7 @@ class ScreenshotProcessor:
 
         return None
 
-    def find_close_button(self, image_path: str) -> Optional[Tuple[int, int]]:
+    def find_close_button(self, image: ImageSource) -> Optional[Tuple[int, int]]:
         """
         Detects the Close button in the screenshot using template matching.
         Checks two known positions:
@@ -87,14 +110,14 @@ class ScreenshotProcessor:
           - (1540, 60)
         Returns the position where the Close button was found, or None.
         """
-        if not os.path.exists(image_path):
-            print(f"[WARN] Image not found: {image_path}")
+        if isinstance(image, str) and not os.path.exists(image):
+            print(f"[WARN] Image not found: {image}")
             return None
 
         try:
-            img = cv2.imread(image_path, cv2.IMREAD_GRAYSCALE)
+            img = Frame.of(image).gray
             if img is None:
-                print(f"[ERROR] Failed to read image: {image_path}")
+                print(f"[ERROR] Failed to read image: {image}")
                 return None
 
             # Define the two close button positions
@@ -141,22 +164,22 @@ class ScreenshotProcessor:
             return None
 
     def get_view_center_coords(
-        self, image_path: str, roi_center: Tuple[int, int, int, int]
+        self, image: ImageSource, roi_center: Tuple[int, int, int, int]
     ) -> Optional[Tuple[Optional[int], Optional[int], Optional[int]]]:
         """
         Extract 'view center' coords from the known bounding box.
         """
-        text_center = self.extract_text_from_roi(image_path, roi_center)
+        text_center = self.extract_text_from_roi(image, roi_center, roi_type="center_tile")
         return self.parse_coordinates(text_center)
 
-    def get_clicked_tile_coords(self, image_path: str, roi: Tuple[int, int, int, int]) -> Optional[Tuple[Optional[int], Optional[int], Optional[int]]]:
+    def get_clicked_tile_coords(self, image: ImageSource, roi: Tuple[int, int, int, int]) -> Optional[Tuple[Optional[int], Optional[int], Optional[int]]]:
         """OCR a single ROI for the 'clicked tile' coords."""
-        text_popup = self.extract_text_from_roi(image_path, roi)
+        text_popup = self.extract_text_from_roi(image, roi, roi_type="tile_coordinates")
         return self.parse_coordinates(text_popup)
 
     def process_screenshot(
         self,
-        screenshot_path: str,
+        screenshot_path: ImageSource,
         roi_center: Tuple[int, int, int, int],
         roi_popup_castle_darknest: Optional[Tuple[int, int, int, int]] = None,
         roi_popup_monster: Optional[Tuple[int, int, int, int]] = None,
@@ -169,22 +192,57 @@ class ScreenshotProcessor:
           center_coords -> (K, X, Y) or (None, X, Y) or None
           clicked_coords -> first successful parse from any of the 4 popup ROIs
         """
-        # 1) OCR for center tile
-        center_coords = self.get_view_center_coords(screenshot_path, roi_center)
+        # Decode once so every ROI below is a memoized crop of the same frame.
+        image = Frame.of(screenshot_path)
+        if not image.is_valid():
+            print(f"[WARN] Could not read screenshot: {screenshot_path}")
+            return None, None
+
+        rois = self.screenshot_rois(roi_center, roi_popup_castle_darknest, roi_popup_monster,
+                                    roi_popup_rss_tile, roi_popup_vacant_tile)
+        pipelines = self.screenshot_pipelines(rois)
+        texts = {}
+
+        def read(names):
+            # The center ROI rides along with the first batch.
+            batch = {name: rois[name] for name in names}
+            if "center" not in texts:
+                batch["center"] = roi_center
+            # All of them are coordinate banners: the glyph bank reads them first.
+            texts.update(ocr_rois(image, batch, engine=self.engine, glyphs=self.glyphs, coordinate_rois=batch,
+                                  pipelines={name: pipelines[name] for name in batch}))
+            return texts
+
+        # 1) + 2) The most recently successful pop-up ROI is read with the center tile; the other
+        # pop-up ROIs are only OCR'd (together) if it does not parse with high confidence.
+        popups = [name for name in rois if name != "center"]
+        _, clicked_coords = self.popup_chain.run(popups, read, self.parse_coordinates)
+        if "center" not in texts:
+            read([])
+        center_coords = self.parse_coordinates(texts["center"]["text"])
+        return center_coords, clicked_coords
+
+    @staticmethod
+    def screenshot_rois(roi_center, *popup_rois):
+        """Name the center ROI "center" and each given pop-up ROI "popup:<i>"."""
+        rois = {"center": roi_center}
+        rois.update({f"popup:{i}": roi for i, roi in enumerate(popup_rois) if roi is not None})
+        return rois
+
+    def screenshot_pipelines(self, rois):
+        """ROI name -> Pipeline for the names returned by screenshot_rois."""
+        return {name: pipeline_for(self.pipelines, "center_tile" if name == "center" else "tile_coordinates")
+                for name in rois}
+
+    def coordinates_from_texts(self, texts):
+        """(center_coords, clicked_coords) from the OCR results of screenshot_rois."""
+        center_coords = self.parse_coordinates(texts["center"]["text"])
 
-        # 2) OCR for clicked tile: check each possible ROI in turn
-        # The first one that yields valid coords is returned. If none match, it's None.
+        # The first pop-up ROI that yields valid coords wins. If none match, it's None.
         clicked_coords = None
-        popup_rois = [
-            roi_popup_castle_darknest,
-            roi_popup_monster,
-            roi_popup_rss_tile,
-            roi_popup_vacant_tile
-        ]
-        for roi in popup_rois:
-            if roi is None:
-                continue
-            coords = self.get_clicked_tile_coords(screenshot_path, roi)
+        popups = sorted((name for name in texts if name.startswith("popup:")), key=lambda name: int(name.split(":")[1]))
+        for name in popups:
+            coords = self.parse_coordinates(texts[name]["text"])
             if coords:
                 clicked_coords = coords
                 break
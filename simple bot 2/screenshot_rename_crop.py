@@ -5,7 +5,10 @@ import logging
 import tkinter as tk
 from tkinter import NW
 from PIL import Image, ImageTk
+from frame import Frame
 from ocr_module import OCRModule
+from ocr_pipeline import load_pipelines, pipeline_for
+from tile_types import detect_tile_type
 
 ROI_LOG_FILE = "roi_log.csv"
 
@@ -104,49 +107,6 @@ def select_crop_region(image_path, prompt_title="Select Crop Region"):
 
     return crop_box
 
-def detect_tile_type(ocr_text):
-    """
-    Simple logic to classify tile type based on keywords in OCR text.
-    Adjust to match your actual game terms. 
-    """
-
-    text_lower = ocr_text.lower()
-
-    # Monster
-    if any(keyword in text_lower for keyword in ["monster hunt", "dmg", "monster"]):
-        return "monster"
-
-    # Resource
-    if any(keyword in text_lower for keyword in [
-        "gather", "field", "timber", "rich vein", "rocks", "occupier", 
-        "wood", "ore", "stone", "food", "gold", "ruins"
-    ]):
-        return "rss"
-
-    # Vacant
-    if any(keyword in text_lower for keyword in [
-        "transfer", "forest", "magma path", 
-        "grassland", "mountain", "shore", "sea", 
-        "volcano", "lava hill", "glacier"
-    ]):
-        return "vacant"
-
-    # Darknest (check first if you specifically see "darknest" in the text)
-    if "darknest" in text_lower:
-        return "darknest"
-
-    # Castle
-    # Here we also include "scout", "rally attack", "attack", etc. 
-    # because many castle/darknest screens are similar. But "darknest"
-    # is specifically matched above if "darknest" is found in text_lower.
-    if any(keyword in text_lower for keyword in [
-        "scout", "rally attack", "attack", "troops killed:",
-        "might:", "guild:", "kingdom:", "view profile", "enter turf"
-    ]):
-        return "castle"
-
-    return "unknown"
-
 def main():
     """
     For each .png in 'screenshots/':
@@ -162,6 +122,7 @@ def main():
     logger = logging.getLogger("ScreenshotDoubleCrop")
 
     ocr = OCRModule()
+    pipelines = load_pipelines()
     coords_pattern = re.compile(r"K\s*:\s*(\d+).*?X\s*:\s*(\d+).*?Y\s*:\s*(\d+)", re.IGNORECASE | re.DOTALL)
 
     # Make sure roi_log.csv has a header
@@ -192,34 +153,29 @@ def main():
             append_roi_log(filename, coord_box, (0,0,0,0))
             continue
 
-        # 2) Crop & OCR
-        coord_crop_path = os.path.join(screenshots_dir, "temp_coord_crop.png")
-        type_crop_path = os.path.join(screenshots_dir, "temp_type_crop.png")
+        # 2) Crop & OCR in memory, each box with its rois.json pipeline
+        frame = Frame(original_path)
 
-        def safe_crop_and_ocr(crop_box_local, input_path, output_path):
-            # Crop image to 'crop_box_local' and run OCR, or return "" on error
+        def safe_crop_and_ocr(crop_box_local, roi_type):
+            # Preprocess 'crop_box_local' and run OCR, or return "" on error
+            if not frame.is_valid():
+                logger.error(f"Failed to read '{filename}'.")
+                return ""
+            h, w = frame.shape
+            (cx1, cy1, cx2, cy2) = crop_box_local
+            # Validate bounds
+            if cx1 < 0 or cy1 < 0 or cx2 > w or cy2 > h:
+                return ""
+            pipeline = pipeline_for(pipelines, roi_type)
             try:
-                from PIL import Image
-                with Image.open(input_path) as img:
-                    w, h = img.size
-                    (cx1, cy1, cx2, cy2) = crop_box_local
-                    # Validate bounds
-                    if cx1 < 0 or cy1 < 0 or cx2 > w or cy2 > h:
-                        return ""
-                    cropped_img = img.crop(crop_box_local)
-                    cropped_img.save(output_path)
+                text = ocr.engine.image_to_string(frame.preprocess(crop_box_local, pipeline), config=pipeline.config)
             except Exception as e:
-                logger.error(f"Failed to crop '{filename}' box {crop_box_local}: {e}")
+                logger.error(f"Failed to OCR '{filename}' box {crop_box_local}: {e}")
                 return ""
-
-            text = ocr.extract_text(output_path)
-            # Clean up
-            if os.path.exists(output_path):
-                os.remove(output_path)
             return text or ""
 
-        coord_text = safe_crop_and_ocr(coord_box, original_path, coord_crop_path)
-        type_text = safe_crop_and_ocr(type_box, original_path, type_crop_path)
+        coord_text = safe_crop_and_ocr(coord_box, "tile_coordinates")
+        type_text = safe_crop_and_ocr(type_box, "node_types")
 
         combined_text = coord_text + "\n" + type_text
         if not combined_text.strip():
@@ -0,0 +1,108 @@
+import shlex
+
+from screencap import CAPTURE_COMMANDS
+
+KEYCODE_ESCAPE = 111
+
+# Pauses inside keypad entry (seconds); see tap_keypad_sequence.
+KEYPAD_OPEN_DELAY = 0.3
+KEYPAD_KEY_DELAY = 0.05
+
+
+def _number(action, key):
+    if key not in action:
+        raise ValueError(f"Action {action} is missing '{key}'.")
+    return int(action[key])
+
+
+def compile_action(action, mode="png"):
+    """
+    Turn one sequence action into a device shell command.
+
+    Supported actions (as stored by BaseModule.save_sequence):
+        {"action": "tap", "x": 100, "y": 200}
+        {"action": "swipe", "x1": 50, "y1": 50, "x2": 200, "y2": 200, "duration": 300}
+        {"action": "keyevent", "keycode": 111}
+        {"action": "escape"}
+        {"action": "text", "text": "hello"}
+        {"action": "wait", "seconds": 0.2}   ("sleep" is accepted as an alias)
+        {"action": "capture"}
+    """
+    kind = action.get("action")
+    if kind == "tap":
+        return f"input tap {_number(action, 'x')} {_number(action, 'y')}"
+    if kind == "swipe":
+        coords = " ".join(str(_number(action, key)) for key in ("x1", "y1", "x2", "y2"))
+        return f"input swipe {coords} {int(action.get('duration', 300))}"
+    if kind == "keyevent":
+        return f"input keyevent {_number(action, 'keycode')}"
+    if kind == "escape":
+        return f"input keyevent {KEYCODE_ESCAPE}"
+    if kind == "text":
+        return f"input text {shlex.quote(str(action['text']))}"
+    if kind in ("wait", "sleep"):
+        seconds = float(action.get("seconds", 0))
+        if seconds < 0:
+            raise ValueError(f"Negative wait in {action}.")
+        return f"sleep {seconds:g}"
+    if kind == "capture":
+        return CAPTURE_COMMANDS[mode]
+    raise ValueError(f"Unknown sequence action: {kind!r}")
+
+
+def compile_sequence(sequence, mode="png"):
+    """
+    Compile a whole sequence into a single device-side shell script so it runs
+    in one round trip, e.g.
+
+        input tap 843 118; sleep 0.2; input keyevent 111; screencap -p
+
+    Only the (at most one) capture action writes to stdout; everything else is
+    silenced so the output is a clean frame for `exec-out`.
+
+    Args:
+        sequence (list): Action dicts (see compile_action).
+        mode (str): Capture mode for the capture action (see screencap.CAPTURE_COMMANDS).
+
+    Returns:
+        str: The shell script.
+    """
+    if sum(1 for action in sequence if action.get("action") == "capture") > 1:
+        raise ValueError("A compiled sequence can capture at most one frame.")
+    commands = []
+    for action in sequence:
+        command = compile_action(action, mode)
+        if action.get("action") in ("capture", "wait", "sleep"):
+            commands.append(command)
+        else:
+            commands.append(f"{command} >/dev/null 2>&1")
+    return "; ".join(commands)
+
+
+def captures_frame(sequence):
+    """Return True if the sequence contains a capture action."""
+    return any(action.get("action") == "capture" for action in sequence)
+
+
+def tap_keypad_sequence(field_position, value, keypad_positions, key_delay=KEYPAD_KEY_DELAY,
+                        open_delay=KEYPAD_OPEN_DELAY):
+    """
+    Actions to tap an input field, type `value` on the keypad and confirm with the check button.
+
+    A compiled sequence runs without round trips between taps, so the keypad dialog gets
+    `open_delay` seconds to open after the field tap and the game `key_delay` seconds to
+    register each key; without them the first digits race the dialog opening.
+    """
+    actions = [{"action": "tap", "x": field_position[0], "y": field_position[1]}]
+    if open_delay:
+        actions.append({"action": "wait", "seconds": open_delay})
+    for digit in str(value):
+        if digit not in keypad_positions:
+            raise ValueError(f"Invalid digit '{digit}' for keypad entry.")
+        key_x, key_y = keypad_positions[digit]
+        actions.append({"action": "tap", "x": key_x, "y": key_y})
+        if key_delay:
+            actions.append({"action": "wait", "seconds": key_delay})
+    check_x, check_y = keypad_positions["check"]
+    actions.append({"action": "tap", "x": check_x, "y": check_y})
+    return actions
@@ -0,0 +1,244 @@
+"""
+Templates loaded once, reloaded only when their files change.
+
+TemplateMatchingModule used to re-read and decode every
+templates/<category>_<level>.png for every screenshot. TemplateBank decodes
+each template once, then on access only stats the files (at most every
+`check_interval` seconds) and reloads the ones whose mtime or size changed.
+metadata.json is read, never written. A packed .npz bundle of all decoded
+templates makes cold start one bundle read plus a hash of each PNG: an entry
+is used only while the PNG's content hash still matches the one it was
+decoded from, so a file replaced with the same size and mtime (cp -p, a
+restored backup) is never served stale.
+
+    bank = TemplateBank("templates", bundle_path="templates/bundle.npz")
+    for category, levels in bank.templates().items():
+        for level, template in levels.items():
+            ...
+    bank.save_bundle()   # after adding or editing templates
+
+    python template_bank.py bundle [templates_dir]
+"""
+
+import hashlib
+import json
+import logging
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+from template_search import scale_template
+
+DEFAULT_BUNDLE = "bundle.npz"
+
+
+def _signature(path):
+    """(mtime_ns, size) of `path`, or None if it does not exist."""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def _content_hash(data):
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def _file_hash(path):
+    """Content hash of `path`, or None if it cannot be read."""
+    try:
+        with open(path, "rb") as f:
+            return _content_hash(f.read())
+    except OSError:
+        return None
+
+
+class TemplateBank:
+    """Decoded grayscale templates keyed by category and level, kept in sync with the templates folder."""
+
+    def __init__(self, templates_dir="templates", bundle_path=None, check_interval=1.0):
+        """
+        Args:
+            templates_dir (str): Folder holding metadata.json and <category>_<level>.png files.
+            bundle_path (str): Packed .npz bundle; defaults to <templates_dir>/bundle.npz.
+                Used for cold start for the templates whose files still hash the same.
+            check_interval (float): Seconds between mtime checks (0 checks on every access).
+        """
+        self.logger = logging.getLogger("TemplateBank")
+        self.templates_dir = templates_dir
+        self.metadata_file = os.path.join(templates_dir, "metadata.json")
+        self.bundle_path = bundle_path or os.path.join(templates_dir, DEFAULT_BUNDLE)
+        self.check_interval = check_interval
+        self.metadata = {}
+        self._metadata_signature = None
+        self._templates = {}   # (category, level) -> grayscale template
+        self._signatures = {}  # (category, level) -> (mtime_ns, size) of the loaded file
+        self._hashes = {}      # (category, level) -> content hash of the PNG the template was decoded from
+        self._scaled = {}      # (category, level, scale) -> downscaled template
+        self._missing = set()
+        self._last_check = None
+        self.stats = {"decoded": 0, "from_bundle": 0, "reloads": 0}
+        self._load_bundle()
+        self.refresh(force=True)
+
+    def path_for(self, category, level):
+        return os.path.join(self.templates_dir, f"{category}_{level}.png")
+
+    def _load_metadata(self):
+        signature = _signature(self.metadata_file)
+        if signature == self._metadata_signature:
+            return False
+        self._metadata_signature = signature
+        if signature is None:
+            self.logger.warning("Metadata file not found. Starting with an empty metadata dictionary.")
+            self.metadata = {}
+        else:
+            with open(self.metadata_file, "r") as f:
+                self.metadata = json.load(f)
+        return True
+
+    def _drop_scaled(self, key):
+        for scaled_key in [k for k in self._scaled if k[:2] == key]:
+            del self._scaled[scaled_key]
+
+    def refresh(self, force=False):
+        """
+        Bring the bank in line with the templates folder: reload changed files, drop removed ones.
+
+        Args:
+            force (bool): Check now, even if `check_interval` has not elapsed.
+
+        Returns:
+            bool: True if anything was (re)loaded or dropped.
+        """
+        now = time.monotonic()
+        if not force and self._last_check is not None and now - self._last_check < self.check_interval:
+            return False
+        self._last_check = now
+
+        changed = self._load_metadata()
+        wanted = {(category, level) for category, levels in self.metadata.items() for level in levels}
+        for key in set(self._templates) - wanted:
+            del self._templates[key]
+            self._signatures.pop(key, None)
+            self._hashes.pop(key, None)
+            self._drop_scaled(key)
+            changed = True
+
+        for key in sorted(wanted):
+            path = self.path_for(*key)
+            signature = _signature(path)
+            if signature is None:
+                if key not in self._missing:
+                    self.logger.warning(f"Template file not found: {path}")
+                    self._missing.add(key)
+                if self._templates.pop(key, None) is not None:
+                    self._signatures.pop(key, None)
+                    self._hashes.pop(key, None)
+                    self._drop_scaled(key)
+                    changed = True
+                continue
+            self._missing.discard(key)
+            if self._signatures.get(key) == signature:
+                continue
+            try:
+                with open(path, "rb") as f:
+                    data = f.read()
+            except OSError:
+                data = b""
+            template = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_GRAYSCALE) if data else None
+            if template is None:
+                self.logger.warning(f"Failed to load template: {path}")
+                continue
+            if key in self._templates:
+                self.stats["reloads"] += 1
+                self.logger.info(f"Reloaded changed template {path}")
+            self._templates[key] = template
+            self._signatures[key] = signature
+            self._hashes[key] = _content_hash(data)
+            self._drop_scaled(key)
+            self.stats["decoded"] += 1
+            changed = True
+        return changed
+
+    def templates(self):
+        """{category: {level: grayscale template}}, refreshed if the files changed."""
+        self.refresh()
+        grouped = {}
+        for (category, level), template in sorted(self._templates.items()):
+            grouped.setdefault(category, {})[level] = template
+        return grouped
+
+    def get(self, category, level):
+        self.refresh()
+        return self._templates.get((category, str(level)))
+
+    def scaled(self, category, level, scale):
+        """The template downscaled by `scale` (for pyramid search), computed once per template version."""
+        template = self.get(category, level)
+        if template is None:
+            return None
+        key = (category, str(level), scale)
+        if key not in self._scaled:
+            self._scaled[key] = scale_template(template, scale)
+        return self._scaled[key]
+
+    def __len__(self):
+        return len(self._templates)
+
+    def save_bundle(self, path=None):
+        """
+        Pack every loaded template, with the content hash of the PNG it was decoded from, into one .npz file.
+
+        Returns:
+            str: The bundle path.
+        """
+        path = path or self.bundle_path
+        self.refresh(force=True)
+        keys = sorted(self._templates)
+        arrays = {f"t{i}": self._templates[key] for i, key in enumerate(keys)}
+        index = [[category, level, self._hashes[(category, level)]] for category, level in keys]
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "wb") as f:
+            np.savez(f, index=np.array(json.dumps(index)), **arrays)
+        self.logger.info(f"Bundled {len(keys)} templates into {path}")
+        return path
+
+    def _load_bundle(self):
+        """
+        Take the templates whose PNG still hashes as bundled; refresh() decodes the rest. Bundled
+        templates get the file's current mtime/size, so later refreshes only stat them.
+        """
+        if not os.path.exists(self.bundle_path):
+            return
+        try:
+            with np.load(self.bundle_path) as data:
+                index = json.loads(str(data["index"]))
+                for i, (category, level, content_hash) in enumerate(index):
+                    path = self.path_for(category, level)
+                    signature = _signature(path)
+                    if not isinstance(content_hash, str) or _file_hash(path) != content_hash:
+                        continue  # Changed since bundling (or a bundle from before content hashes)
+                    self._templates[(category, level)] = data[f"t{i}"]
+                    self._signatures[(category, level)] = signature
+                    self._hashes[(category, level)] = content_hash
+        except Exception as e:
+            self.logger.warning(f"Ignoring unreadable template bundle {self.bundle_path}: {e}")
+            self._templates.clear()
+            self._signatures.clear()
+            self._hashes.clear()
+            return
+        self.stats["from_bundle"] = len(self._templates)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    if len(sys.argv) < 2 or sys.argv[1] != "bundle":
+        print("Usage: python template_bank.py bundle [templates_dir]")
+        sys.exit(1)
+    bank = TemplateBank(sys.argv[2] if len(sys.argv) > 2 else "templates")
+    print(f"📦 {bank.save_bundle()} ({len(bank)} templates)")
@@ -0,0 +1,190 @@
+"""
+Template matching speed/recall benchmark.
+
+Runs every search strategy of template_search over the same screenshots and
+reports per-screenshot p50/p95 latency, the speedup over exhaustive search,
+and recall: the share of the exhaustive search's matches (after NMS) that a
+strategy also finds. With synthetic screenshots, recall against the pasted
+ground truth is reported as well.
+
+    python template_benchmark.py run --templates templates --screenshots screenshots --output template_benchmark.json
+    python template_benchmark.py run --synthetic 10    # frames built from the templates themselves
+"""
+
+import glob
+import json
+import logging
+import os
+import time
+
+import cv2
+import numpy as np
+
+from benchmark_utils import git_commit
+from template_matching import TemplateMatchingModule
+from template_search import ExhaustiveSearch, PyramidSearch
+
+logger = logging.getLogger("TemplateBenchmark")
+
+
+def default_searches():
+    """Exhaustive search (the baseline, first) and a few pyramid settings along the speed/recall curve."""
+    return [
+        ExhaustiveSearch(),
+        PyramidSearch(scale=0.5),
+        PyramidSearch(scale=0.25),
+        PyramidSearch(scale=0.25, coarse_margin=0.3, max_candidates=50),
+    ]
+
+
+def load_screenshots(folder, limit=None):
+    """[(name, grayscale screenshot, None)] for the PNGs of `folder`."""
+    shots = []
+    for path in sorted(glob.glob(os.path.join(folder, "*.png")))[:limit]:
+        image = cv2.imread(path, cv2.IMREAD_GRAYSCALE)
+        if image is not None:
+            shots.append((os.path.basename(path), image, None))
+    return shots
+
+
+def synthetic_screenshots(templates, count=5, per_frame=6, size=(900, 1600), seed=0):
+    """
+    Map-like frames with templates pasted at random, non-overlapping places.
+
+    Args:
+        templates (dict): {category: {level: template}} (e.g. TemplateBank.templates()).
+
+    Returns:
+        list: (name, grayscale frame, [(template name, x, y), ...]) tuples.
+    """
+    rng = np.random.default_rng(seed)
+    flat = [(f"{category}_{level}", template) for category, levels in sorted(templates.items())
+            for level, template in sorted(levels.items())]
+    height, width = size
+    shots = []
+    for index in range(count):
+        frame = np.tile(np.linspace(60, 160, width).astype(np.uint8), (height, 1))
+        for _ in range(40):
+            center = (int(rng.integers(0, width)), int(rng.integers(0, height)))
+            cv2.circle(frame, center, int(rng.integers(5, 30)), int(rng.integers(0, 255)), -1)
+        truths, taken = [], []
+        for _ in range(min(per_frame, len(flat))):
+            name, template = flat[int(rng.integers(0, len(flat)))]
+            h, w = template.shape[:2]
+            for _ in range(50):
+                x, y = int(rng.integers(0, width - w)), int(rng.integers(0, height - h))
+                if all(x + w <= tx or tx + tw <= x or y + h <= ty or ty + th <= y for tx, ty, tw, th in taken):
+                    frame[y:y + h, x:x + w] = template
+                    taken.append((x, y, w, h))
+                    truths.append((name, x, y))
+                    break
+        shots.append((f"synthetic_{index}", frame, truths))
+    return shots
+
+
+def _found(match_set, name, x, y, tolerance=2):
+    return any(n == name and abs(mx - x) <= tolerance and abs(my - y) <= tolerance for n, mx, my in match_set)
+
+
+def _recall(expected, found):
+    if not expected:
+        return 1.0
+    return sum(_found(found, *item) for item in expected) / len(expected)
+
+
+def run_benchmark(matcher, screenshots, searches=None, threshold=0.8, nms_threshold=0.5, repeats=1):
+    """
+    Time every search strategy on every screenshot.
+
+    Args:
+        matcher (TemplateMatchingModule): Supplies the templates (its bank) and NMS. Build it with
+            regions=False to time the searches themselves over the full frame.
+        screenshots (list): (name, grayscale screenshot, ground truth or None) tuples.
+        searches (list): Strategies; the first is the recall baseline (default_searches()).
+        threshold (float): Match threshold for every category.
+        repeats (int): Timed runs per screenshot (the matches of the last run are scored).
+
+    Returns:
+        dict: {"meta": {...}, "results": [row per strategy]}.
+    """
+    searches = searches or default_searches()
+    threshold_config = {category: threshold for category in matcher.load_templates()}
+    per_search = []
+    for search in searches:
+        latencies, found = [], {}
+        for name, screenshot, _ in screenshots:
+            for _ in range(repeats):
+                start = time.perf_counter()
+                matches = matcher.match_templates(screenshot, threshold_config, nms_threshold, search=search)
+                latencies.append(time.perf_counter() - start)
+            found[name] = [(m["template"], int(m["position"][0]), int(m["position"][1])) for m in matches]
+        per_search.append((search, latencies, found))
+
+    baseline_p50 = float(np.percentile(per_search[0][1], 50)) if screenshots else 0.0
+    baseline_found = per_search[0][2]
+    results = []
+    for search, latencies, found in per_search:
+        p50 = float(np.percentile(latencies, 50)) if latencies else 0.0
+        row = {
+            "search": search.name,
+            "params": {k: v for k, v in vars(search).items() if k not in ("name", "stats")},
+            "screenshots": len(screenshots),
+            "p50_ms": p50 * 1000,
+            "p95_ms": float(np.percentile(latencies, 95)) * 1000 if latencies else 0.0,
+            "speedup": baseline_p50 / p50 if p50 else 0.0,
+            "matches": sum(len(v) for v in found.values()),
+            "recall": float(np.mean([_recall(baseline_found[name], found[name]) for name, _, _ in screenshots]))
+            if screenshots else 0.0,
+        }
+        truths = [(name, truth) for name, _, truth in screenshots if truth is not None]
+        if truths:
+            row["truth_recall"] = float(np.mean([_recall(truth, found[name]) for name, truth in truths]))
+        results.append(row)
+
+    meta = {
+        "commit": git_commit(),
+        "created": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "repeats": repeats,
+        "templates": len(matcher.bank),
+        "threshold": threshold,
+        "nms_threshold": nms_threshold,
+    }
+    return {"meta": meta, "results": results}
+
+
+def print_report(report):
+    for row in report["results"]:
+        truth = f"  truth {row['truth_recall']:6.1%}" if "truth_recall" in row else ""
+        print(f"{row['search']:14s} p50 {row['p50_ms']:8.1f} ms  p95 {row['p95_ms']:8.1f} ms  "
+              f"x{row['speedup']:5.1f}  recall {row['recall']:6.1%}{truth}  {row['matches']} matches")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Template matching speed/recall benchmark.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    run_parser = sub.add_parser("run", help="Benchmark exhaustive against pyramid search")
+    run_parser.add_argument("--templates", default="templates")
+    run_parser.add_argument("--screenshots", help="Directory of screenshots to match")
+    run_parser.add_argument("--limit", type=int, help="Screenshots taken from --screenshots")
+    run_parser.add_argument("--synthetic", type=int, default=0, help="Also build N frames from the templates")
+    run_parser.add_argument("--threshold", type=float, default=0.8)
+    run_parser.add_argument("--repeats", type=int, default=1)
+    run_parser.add_argument("--workers", type=int, help="Matching threads (default: physical cores)")
+    run_parser.add_argument("--output", default="template_benchmark.json")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    matcher = TemplateMatchingModule(templates_dir=args.templates, regions=False, workers=args.workers)
+    logging.getLogger("TemplateMatchingModule").setLevel(logging.WARNING)
+    shots = load_screenshots(args.screenshots, args.limit) if args.screenshots else []
+    if args.synthetic:
+        shots += synthetic_screenshots(matcher.load_templates(), args.synthetic)
+    if not shots or not len(matcher.bank):
+        parser.error("Need templates and at least one screenshot (--screenshots or --synthetic).")
+    report = run_benchmark(matcher, shots, threshold=args.threshold, repeats=args.repeats)
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print_report(report)
+    print(f"💾 Report written to {args.output}")
@@ -1,36 +1,70 @@
+import itertools
 import os
 import cv2
 import numpy as np
 import logging
-from adb_module2 import ADBModule  # Assuming ADBModule is in the project folder
+from unified_adb import ADBModule
 import json
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from cpu_cores import physical_cores
+from template_bank import TemplateBank
+from template_regions import TemplateRegions
+from template_search import MATCH_DTYPE, ExhaustiveSearch, PyramidSearch, nms_by_category, search_window
 
 
 class TemplateMatchingModule:
-    def __init__(self, templates_dir="templates", output_dir="output"):
+    def __init__(self, templates_dir="templates", output_dir="output", adb=None, bank=None, search=None,
+                 regions=None, workers=None):
+        """
+        Args:
+            templates_dir (str): Folder holding metadata.json and the template images.
+            output_dir (str): Where marked screenshots are saved.
+            adb (ADBModule): Defaults to a new ADBModule, connected on first use.
+            bank (TemplateBank): Decoded templates; defaults to a bank over `templates_dir`.
+                Metadata is only read here; validate_metadata(save=True) rewrites it.
+            search: Search strategy from template_search; ExhaustiveSearch() by default,
+                PyramidSearch(...) for coarse-to-fine matching.
+            regions (TemplateRegions): Per-template search windows; defaults to declared regions
+                plus UI Button positions learned in <templates_dir>/search_regions.json. False searches
+                every template over the full frame.
+            workers (int): Threads the templates are matched on (cv2.matchTemplate releases the
+                GIL); defaults to the number of physical cores, 1 matches serially.
+        """
         self.templates_dir = templates_dir
         self.output_dir = output_dir
-        self.adb = ADBModule()
+        self._adb = adb
         self.logger = logging.getLogger("TemplateMatchingModule")
         logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
         os.makedirs(self.output_dir, exist_ok=True)
 
-        # Load metadata for organized templates
-        self.metadata_file = os.path.join(self.templates_dir, "metadata.json")
-        self.templates_metadata = self._load_metadata()
-        self.validate_metadata()
-
-    def _load_metadata(self):
-        """Load metadata for templates."""
-        if os.path.exists(self.metadata_file):
-            with open(self.metadata_file, "r") as f:
-                return json.load(f)
-        else:
-            self.log_message(f"Metadata file not found. Starting with an empty metadata dictionary.", level=logging.WARNING)
-            return {}
+        # Templates are decoded once and reloaded only when their files change
+        self.bank = bank or TemplateBank(templates_dir)
+        self.metadata_file = self.bank.metadata_file
+        self.search = search or ExhaustiveSearch()
+        if regions is None:
+            regions = TemplateRegions(os.path.join(templates_dir, "search_regions.json"))
+        self.regions = regions or None
+        self.workers = workers or physical_cores()
+        self._executor = None
+
+    @property
+    def adb(self):
+        if self._adb is None:
+            self._adb = ADBModule()
+        return self._adb
+
+    @property
+    def templates_metadata(self):
+        return self.bank.metadata
+
+    def validate_metadata(self, save=False):
+        """
+        Drop metadata entries whose template file is missing.
 
-    def validate_metadata(self):
-        """Validate and clean metadata to ensure templates exist."""
+        Args:
+            save (bool): Also rewrite metadata.json with the cleaned entries.
+        """
         cleaned_metadata = {}
         for category, levels in self.templates_metadata.items():
             for level, details in levels.items():
@@ -39,10 +73,12 @@ class TemplateMatchingModule:
                     cleaned_metadata.setdefault(category, {})[level] = details
                 else:
                     self.log_message(f"Removing invalid entry for {category} level {level}", level=logging.WARNING)
-        self.templates_metadata = cleaned_metadata
-        with open(self.metadata_file, "w") as f:
-            json.dump(cleaned_metadata, f, indent=4)
+        if save:
+            with open(self.metadata_file, "w") as f:
+                json.dump(cleaned_metadata, f, indent=4)
+            self.bank.refresh(force=True)
         self.log_message("Metadata validated and cleaned.")
+        return cleaned_metadata
 
     def log_message(self, message, level=logging.INFO):
         """Log messages at the specified logging level."""
@@ -61,33 +97,20 @@ class TemplateMatchingModule:
 
     def load_templates(self):
         """
-        Load categorized templates based on metadata.
+        Categorized templates from the template bank (decoded once, reloaded when changed on disk).
 
         Returns:
             dict: Dictionary with templates categorized by type and level.
         """
-        templates = {}
-        for category, levels in self.templates_metadata.items():
-            templates[category] = {}
-            for level, details in levels.items():
-                template_path = os.path.join(self.templates_dir, f"{category}_{level}.png")
-                if not os.path.exists(template_path):
-                    self.log_message(f"Template file not found: {template_path}", level=logging.WARNING)
-                    continue
-
-                template_image = cv2.imread(template_path, cv2.IMREAD_GRAYSCALE)
-                if template_image is not None:
-                    templates[category][level] = template_image
-                else:
-                    self.log_message(f"Failed to load template: {template_path}", level=logging.WARNING)
-        return templates
+        return self.bank.templates()
 
     def non_max_suppression(self, matches, overlap_thresh=0.5):
         """
-        Perform Non-Maximum Suppression (NMS) on matches to remove duplicates.
+        Perform Non-Maximum Suppression (NMS) on matches to remove duplicates, per category and
+        best score first.
 
         Args:
-            matches (list): List of matches with their positions and dimensions.
+            matches (list): List of matches with their positions, dimensions, category and score.
             overlap_thresh (float): Threshold for overlap. Defaults to 0.5.
 
         Returns:
@@ -96,76 +119,172 @@ class TemplateMatchingModule:
         if not matches:
             return []
 
-        # Convert matches to numpy array
-        boxes = np.array([[match["position"][0], match["position"][1],
-                            match["position"][0] + match["dimensions"][0],
-                            match["position"][1] + match["dimensions"][1]] for match in matches])
-
-        indices = np.arange(len(boxes))
-        pick = []
-
-        # Coordinates of boxes
-        x1, y1, x2, y2 = boxes[:, 0], boxes[:, 1], boxes[:, 2], boxes[:, 3]
-        area = (x2 - x1) * (y2 - y1)
-        idxs = np.argsort(y2)  # Sort by bottom-right y-coordinate
-
-        while len(idxs) > 0:
-            last = idxs[-1]
-            pick.append(last)
-
-            # Compare this box to all others
-            xx1 = np.maximum(x1[last], x1[idxs[:-1]])
-            yy1 = np.maximum(y1[last], y1[idxs[:-1]])
-            xx2 = np.minimum(x2[last], x2[idxs[:-1]])
-            yy2 = np.minimum(y2[last], y2[idxs[:-1]])
-
-            # Calculate overlap
-            w = np.maximum(0, xx2 - xx1)
-            h = np.maximum(0, yy2 - yy1)
-            overlap = (w * h) / area[idxs[:-1]]
+        records = np.empty(len(matches), dtype=MATCH_DTYPE)
+        categories = {}
+        for i, match in enumerate(matches):
+            records[i] = (match["position"][0], match["position"][1], match["dimensions"][0],
+                          match["dimensions"][1], match.get("score", 0.0), i,
+                          categories.setdefault(match["category"], len(categories)))
+        return [matches[i] for i in nms_by_category(records, overlap_thresh)]
+
+    def _map(self, fn, items):
+        """map() on the thread pool, or serially with one worker or one item."""
+        if self.workers <= 1 or len(items) <= 1:
+            return [fn(item) for item in items]
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="template")
+        return list(self._executor.map(fn, items))
+
+    def close(self):
+        """Shut down the matching threads."""
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    @staticmethod
+    def _read_screenshot(screenshot):
+        if isinstance(screenshot, np.ndarray):
+            return screenshot
+        return cv2.imread(screenshot, cv2.IMREAD_GRAYSCALE)
+
+    def _plan(self, screenshot, templates, search, threshold_config):
+        """Search jobs of every template for one screenshot (window and scaled templates resolved here)."""
+        plan = {"screenshot": screenshot, "prepared": search.prepare(screenshot), "names": [], "categories": [],
+                "windows": [], "jobs": [],
+                "sweep": self.regions.start_screenshot() if self.regions else True}
+        for category, levels in templates.items():
+            threshold = threshold_config.get(category, 0.8) if threshold_config else 0.8
+            for level, template in levels.items():
+                window = None
+                if self.regions:
+                    details = self.templates_metadata.get(category, {}).get(level)
+                    # A sweep searches the full frame; its window is only kept to spot drift in _finish.
+                    lookup = self.regions.window if plan["sweep"] else self.regions.region_for
+                    window = lookup(category, level, details, template.shape, screenshot.shape)
+                small_template = (self.bank.scaled(category, level, search.scale)
+                                  if isinstance(search, PyramidSearch) else None)
+                plan["jobs"].append((len(plan["names"]), len(plan["categories"]), template, threshold,
+                                     window if not plan["sweep"] else None, small_template))
+                plan["names"].append((category, level))
+                plan["windows"].append(window)
+            plan["categories"].append(category)
+        return plan
+
+    @staticmethod
+    def _run_job(search, plan, job):
+        """
+        Peaks of one template as MATCH_DTYPE records, plus the search counters of this job
+        (runs on a worker thread, so the counters are kept per job and merged by the caller).
+        """
+        index, category, template, threshold, window, small_template = job
+        counts = Counter()
+        if window is not None:
+            peaks = search_window(plan["screenshot"], template, threshold, window)
+        else:
+            peaks = search.search(plan["prepared"], template, threshold, small_template=small_template, stats=counts)
+        batch = np.empty(len(peaks), dtype=MATCH_DTYPE)
+        batch["x"], batch["y"], batch["score"] = peaks["x"], peaks["y"], peaks["score"]
+        batch["w"], batch["h"] = template.shape[1], template.shape[0]
+        batch["template"], batch["category"] = index, category
+        return batch, counts
+
+    def _finish(self, plan, found, nms_threshold):
+        """Merge the per-template peaks of one screenshot, run NMS and build the match dicts."""
+        names, categories, windows, sweep = plan["names"], plan["categories"], plan["windows"], plan["sweep"]
+        matches = np.concatenate(found) if found else np.empty(0, dtype=MATCH_DTYPE)
+        kept = matches[nms_by_category(matches, nms_threshold)] if len(matches) else matches
+        filtered_matches = []
+        for x, y, w, h, score, index, _ in kept.tolist():
+            category, level = names[index]
+            if self.regions:
+                # During a full sweep a match outside its window is drift.
+                self.regions.record(category, level, x, y, windows[index] if sweep else None)
+            filtered_matches.append({
+                "template": f"{category}_{level}",
+                "category": category,
+                "level": level,
+                "position": (x, y),
+                "score": score,
+                "dimensions": (w, h)  # (width, height)
+            })
+
+        per_category = ", ".join(f"{categories[c]}: {n}" for c, n in
+                                 zip(*np.unique(kept["category"], return_counts=True)))
+        searched = "full frame" if sweep else f"{sum(w is not None for w in windows)} windowed"
+        self.log_message(f"{len(names)} templates ({searched}): {len(matches)} peaks, "
+                         f"{len(filtered_matches)} after NMS" + (f" ({per_category})" if per_category else ""))
+        return filtered_matches
+
+    def match_batch(self, screenshots, threshold_config=None, nms_threshold=0.5, search=None, chunk_size=None):
+        """
+        Match all templates against many screenshots at once (e.g. an offline digest).
 
-            idxs = idxs[np.where(overlap <= overlap_thresh)[0]]
+        Screenshots are decoded and prepared a chunk at a time, so memory stays bounded however
+        many there are. Every (screenshot, template) search of a chunk goes to the same thread
+        pool, so the pool stays busy across screenshot boundaries; results are merged per
+        screenshot before NMS.
 
-        return [matches[i] for i in pick]
+        Args:
+            screenshots (iterable): Paths and/or grayscale screenshots.
+            threshold_config (dict): Optional threshold configuration by category.
+            nms_threshold (float): Overlap threshold for Non-Maximum Suppression.
+            search: Search strategy for this call (defaults to self.search).
+            chunk_size (int): Screenshots decoded and in flight at once (default: 2 per worker).
 
-    def match_templates(self, screenshot_path, threshold_config=None, nms_threshold=0.5):
+        Returns:
+            list: One list of matches per screenshot ([] for a screenshot that cannot be read).
+        """
+        templates = self.load_templates()
+        search = search or self.search
+        chunk_size = chunk_size or 2 * self.workers
+        screenshots = iter(screenshots)
+        results = []
+        while True:
+            chunk = list(itertools.islice(screenshots, chunk_size))
+            if not chunk:
+                return results
+            results.extend(self._match_chunk(chunk, templates, search, threshold_config, nms_threshold))
+
+    def _match_chunk(self, screenshots, templates, search, threshold_config, nms_threshold):
+        """match_batch for one chunk of screenshots."""
+        images = self._map(self._read_screenshot, screenshots)
+        plans = []
+        for source, image in zip(screenshots, images):
+            if image is None:
+                self.log_message(f"Failed to load screenshot {source}", level=logging.WARNING)
+            plans.append(self._plan(image, templates, search, threshold_config) if image is not None else None)
+
+        work = [(plan, job) for plan in plans if plan is not None for job in plan["jobs"]]
+        results = self._map(lambda item: self._run_job(search, *item), work)
+        stats = getattr(search, "stats", None)
+        found = {}
+        for (plan, _), (batch, counts) in zip(work, results):
+            if len(batch):
+                found.setdefault(id(plan), []).append(batch)
+            if stats is not None:
+                for key, count in counts.items():
+                    stats[key] += count
+        return [self._finish(plan, found.get(id(plan), []), nms_threshold) if plan is not None else []
+                for plan in plans]
+
+    def match_templates(self, screenshot_path, threshold_config=None, nms_threshold=0.5, search=None):
         """
         Match all templates against the given screenshot.
 
         Args:
-            screenshot_path (str): Path to the screenshot.
+            screenshot_path (str): Path to the screenshot, or the grayscale screenshot itself.
             threshold_config (dict): Optional threshold configuration by category.
             nms_threshold (float): Overlap threshold for Non-Maximum Suppression.
+            search: Search strategy for this call (defaults to self.search).
 
         Returns:
-            list: List of matches with their coordinates, dimensions, category, level, and landscape.
+            list: List of matches with their coordinates, dimensions, category, level, and score.
         """
         try:
-            screenshot = cv2.imread(screenshot_path, cv2.IMREAD_GRAYSCALE)
+            screenshot = self._read_screenshot(screenshot_path)
             if screenshot is None:
                 raise RuntimeError("Failed to load screenshot.")
-
-            templates = self.load_templates()
-            matches = []
-
-            for category, levels in templates.items():
-                threshold = threshold_config.get(category, 0.8) if threshold_config else 0.8
-                for level, template in levels.items():
-                    result = cv2.matchTemplate(screenshot, template, cv2.TM_CCOEFF_NORMED)
-                    locations = np.where(result >= threshold)
-                    for pt in zip(*locations[::-1]):
-                        matches.append({
-                            "template": f"{category}_{level}",
-                            "category": category,
-                            "level": level,
-                            "position": pt,
-                            "dimensions": (template.shape[1], template.shape[0])  # (width, height)
-                        })
-                        self.log_message(f"Match found for {category} (level {level}) at {pt}")
-
-            filtered_matches = self.non_max_suppression(matches, overlap_thresh=nms_threshold)
-            self.log_message(f"Matches after NMS: {len(filtered_matches)}")
-            return filtered_matches
+            return self.match_batch([screenshot], threshold_config, nms_threshold, search)[0]
         except Exception as e:
             raise RuntimeError(f"Template matching failed: {e}")
 
@@ -215,6 +334,8 @@ class TemplateMatchingModule:
             # Draw matches and save marked screenshot
             output_path = os.path.join(self.output_dir, f"{device_id}_marked.png")
             self.draw_matches(screenshot_path, matches, output_path)
+            if self.regions:
+                self.regions.save()
 
         except Exception as e:
             raise RuntimeError(f"Failed to scan and mark: {e}")
@@ -0,0 +1,158 @@
+"""
+Per-template search regions, so fixed-position templates skip the full frame.
+
+UI buttons sit at fixed places, yet every template used to be searched over
+the whole screenshot. TemplateRegions gives each template a window:
+  * declared: a "search_region" [x1, y1, x2, y2] in the template's
+    metadata.json entry, or the "roi" [x, y, width, height] it was cut from
+    (TemplateModule.gui_select_roi) for fixed-position categories (UI Button);
+  * learned: for fixed-position categories only (`learn_categories`, UI Button
+    by default), the bounding box of the template's recent match positions,
+    once there are enough of them and they stay within a small part of the
+    frame. Map objects (Food, Castles, ...) can turn up anywhere, so a few
+    matches that happen to be close together must not hide the rest of the map.
+Every `full_sweep_every`-th screenshot searches the full frame anyway; a match
+outside its window is logged as drift, and the window, declared or learned, is
+widened to cover the drift positions from then on. When that makes it larger
+than `max_area`, the template goes back to full-frame search.
+
+    regions = TemplateRegions("templates/search_regions.json")
+    window = regions.region_for("UI Button", "N/A", details, template.shape, screenshot.shape)
+"""
+
+import json
+import logging
+import os
+from collections import deque
+
+
+class TemplateRegions:
+    """Declared and learned search windows per template, with periodic full-frame sweeps."""
+
+    def __init__(self, history_file=None, margin=24, full_sweep_every=20, min_history=5, max_history=50,
+                 max_area=0.25, fixed_categories=("UI Button",), learn_categories=None):
+        """
+        Args:
+            history_file (str): JSON file keeping learned match positions across runs (None: memory only).
+            margin (int): Pixels added around every region.
+            full_sweep_every (int): Every Nth screenshot is searched over the full frame (0 disables).
+            min_history (int): Matches needed before a region is learned.
+            max_history (int): Recent match positions kept per template.
+            max_area (float): A learned region larger than this fraction of the frame is not used.
+            fixed_categories (tuple): Categories whose metadata "roi" is a search region.
+            learn_categories (tuple): Categories that get learned regions (default: fixed_categories).
+        """
+        self.logger = logging.getLogger("TemplateRegions")
+        self.history_file = history_file
+        self.margin = margin
+        self.full_sweep_every = full_sweep_every
+        self.min_history = min_history
+        self.max_history = max_history
+        self.max_area = max_area
+        self.fixed_categories = set(fixed_categories)
+        self.learn_categories = set(fixed_categories if learn_categories is None else learn_categories)
+        self.history = {}  # "category_level" -> deque of (x, y)
+        self.drift = {}  # "category_level" -> deque of (x, y) found outside the window by a sweep
+        self.screenshots = 0
+        self.stats = {"windowed": 0, "full": 0, "sweeps": 0, "drift": 0}
+        if history_file and os.path.exists(history_file):
+            with open(history_file, "r") as f:
+                saved = json.load(f)
+            if "history" not in saved:  # Older files hold only the history mapping
+                saved = {"history": saved}
+            for key, target in (("history", self.history), ("drift", self.drift)):
+                for name, positions in saved.get(key, {}).items():
+                    target[name] = deque(map(tuple, positions), maxlen=max_history)
+
+    def start_screenshot(self):
+        """Count a screenshot; returns True when this one gets a full-frame sweep."""
+        self.screenshots += 1
+        sweep = bool(self.full_sweep_every) and self.screenshots % self.full_sweep_every == 0
+        if sweep:
+            self.stats["sweeps"] += 1
+        return sweep
+
+    def declared_region(self, category, details):
+        """(x1, y1, x2, y2) declared in metadata, or None."""
+        details = details if isinstance(details, dict) else {}
+        if details.get("search_region"):
+            return tuple(int(v) for v in details["search_region"])
+        if category in self.fixed_categories and details.get("roi"):
+            x, y, width, height = (int(v) for v in details["roi"])
+            return x, y, x + width, y + height
+        return None
+
+    def learned_region(self, category, level, template_shape, frame_shape):
+        """Bounding box of the recent matches of a template, or None (not learnable, too few or too spread out)."""
+        if category not in self.learn_categories:
+            return None
+        positions = self.history.get(f"{category}_{level}")
+        if not positions or len(positions) < self.min_history:
+            return None
+        height, width = template_shape[:2]
+        xs = [x for x, _ in positions]
+        ys = [y for _, y in positions]
+        region = (min(xs), min(ys), max(xs) + width, max(ys) + height)
+        area = (region[2] - region[0] + 2 * self.margin) * (region[3] - region[1] + 2 * self.margin)
+        if area > self.max_area * frame_shape[0] * frame_shape[1]:
+            return None
+        return region
+
+    def region_for(self, category, level, details, template_shape, frame_shape):
+        """
+        Window to search a template in, or None for the full frame; counted in `stats`.
+
+        Args:
+            category, level: Template key.
+            details (dict): The template's metadata entry.
+            template_shape, frame_shape: (height, width[, ...]) of the template and the screenshot.
+
+        Returns:
+            tuple: (x1, y1, x2, y2) clipped to the frame and at least the template's size, or None.
+        """
+        window = self.window(category, level, details, template_shape, frame_shape)
+        self.stats["full" if window is None else "windowed"] += 1
+        return window
+
+    def window(self, category, level, details, template_shape, frame_shape):
+        """region_for without counting the search (e.g. to check a full sweep's matches for drift)."""
+        region = self.declared_region(category, details) or self.learned_region(
+            category, level, template_shape, frame_shape)
+        height, width = template_shape[:2]
+        drift = self.drift.get(f"{category}_{level}")
+        if region is not None and drift:
+            region = (min(region[0], *(x for x, _ in drift)), min(region[1], *(y for _, y in drift)),
+                      max(region[2], *(x + width for x, _ in drift)), max(region[3], *(y + height for _, y in drift)))
+            area = (region[2] - region[0] + 2 * self.margin) * (region[3] - region[1] + 2 * self.margin)
+            if area > self.max_area * frame_shape[0] * frame_shape[1]:
+                region = None  # Drifted too far for a window to help
+        if region is None:
+            return None
+        frame_h, frame_w = frame_shape[:2]
+        x1, y1 = max(region[0] - self.margin, 0), max(region[1] - self.margin, 0)
+        x2, y2 = min(region[2] + self.margin, frame_w), min(region[3] + self.margin, frame_h)
+        if x2 - x1 < width or y2 - y1 < height:
+            return None
+        return x1, y1, x2, y2
+
+    def record(self, category, level, x, y, window=None):
+        """
+        Remember where a template matched (learnable categories only). Outside `window` (found by
+        a full sweep) counts as drift.
+        """
+        name = f"{category}_{level}"
+        if window is not None and not (window[0] <= x < window[2] and window[1] <= y < window[3]):
+            self.stats["drift"] += 1
+            self.logger.warning(f"{name} matched at ({x}, {y}), outside its search region {window}; widening it")
+            self.drift.setdefault(name, deque(maxlen=self.max_history)).append((int(x), int(y)))
+        if category not in self.learn_categories:
+            return
+        self.history.setdefault(name, deque(maxlen=self.max_history)).append((int(x), int(y)))
+
+    def save(self):
+        """Write the learned and drift positions to `history_file` (no-op without one)."""
+        if not self.history_file:
+            return
+        with open(self.history_file, "w") as f:
+            json.dump({key: {name: list(positions) for name, positions in positions_by_name.items()}
+                       for key, positions_by_name in (("history", self.history), ("drift", self.drift))}, f)
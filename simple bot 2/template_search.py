@@ -0,0 +1,233 @@
+"""
+Template search strategies for TemplateMatchingModule.
+
+ExhaustiveSearch runs cv2.matchTemplate over the whole screenshot at full
+resolution: cost is image area x template area, for every template.
+PyramidSearch matches a downscaled screenshot against downscaled templates
+(1/16 of the pixels of each at scale 0.25), keeps the best coarse peaks,
+and only re-matches small full-resolution windows around them.
+
+The pyramid trades recall for speed through its parameters:
+  * scale: smaller is faster but blurs fine templates (templates whose
+    downscaled side falls under min_template_side are searched exhaustively);
+  * coarse_margin: how far under the threshold a coarse peak may score and
+    still be refined (larger finds more, refines more);
+  * max_candidates: coarse peaks refined per template (caps the worst case
+    when a template matches many places, e.g. resource tiles);
+  * refine_radius: full-resolution slack around each peak.
+
+    matcher = TemplateMatchingModule(search=PyramidSearch(scale=0.25))
+
+    search = PyramidSearch(scale=0.25, max_candidates=10)
+    peaks = search.search(search.prepare(gray), template, 0.8)  # PEAK_DTYPE array: x, y, score
+
+Both report peaks, not every pixel over the threshold: a match is a local
+maximum of the score map (find_peaks), so one template hit is one row rather
+than the dozens of neighbouring pixels that also clear the threshold.
+nms_indices then suppresses overlapping boxes, best score first.
+"""
+
+import cv2
+import numpy as np
+
+
+PEAK_DTYPE = np.dtype([("x", np.int32), ("y", np.int32), ("score", np.float32)])
+
+
+def find_peaks(result, threshold, neighborhood=3, offset=(0, 0)):
+    """
+    Local maxima of a matchTemplate score map at or above `threshold`.
+
+    Args:
+        result (numpy.ndarray): TM_CCOEFF_NORMED score map.
+        threshold (float): Minimum score.
+        neighborhood (int): Side of the square a peak must be the maximum of.
+        offset (tuple): (x, y) added to the peak positions (for windowed searches).
+
+    Returns:
+        numpy.ndarray: PEAK_DTYPE records.
+    """
+    kernel = np.ones((neighborhood, neighborhood), dtype=np.uint8)
+    ys, xs = np.nonzero((result >= threshold) & (result >= cv2.dilate(result, kernel)))
+    peaks = np.empty(len(xs), dtype=PEAK_DTYPE)
+    peaks["x"] = xs + offset[0]
+    peaks["y"] = ys + offset[1]
+    peaks["score"] = result[ys, xs]
+    return peaks
+
+
+def nms_indices(boxes, scores, overlap_thresh=0.5):
+    """
+    Greedy non-maximum suppression, best score first.
+
+    Args:
+        boxes (numpy.ndarray): (N, 4) x1, y1, x2, y2.
+        scores (numpy.ndarray): (N,) scores.
+        overlap_thresh (float): A box is dropped when its intersection with a kept box
+            exceeds this fraction of its own area.
+
+    Returns:
+        numpy.ndarray: Indices of the kept boxes, best first.
+    """
+    if not len(boxes):
+        return np.empty(0, dtype=np.intp)
+    boxes = np.asarray(boxes, dtype=np.float32)
+    x1, y1, x2, y2 = boxes[:, 0], boxes[:, 1], boxes[:, 2], boxes[:, 3]
+    area = (x2 - x1) * (y2 - y1)
+    order = np.argsort(-np.asarray(scores), kind="stable")
+    keep = []
+    while len(order):
+        best, rest = order[0], order[1:]
+        keep.append(best)
+        w = np.maximum(0, np.minimum(x2[best], x2[rest]) - np.maximum(x1[best], x1[rest]))
+        h = np.maximum(0, np.minimum(y2[best], y2[rest]) - np.maximum(y1[best], y1[rest]))
+        order = rest[w * h <= overlap_thresh * area[rest]]
+    return np.array(keep, dtype=np.intp)
+
+
+MATCH_DTYPE = np.dtype([("x", np.int32), ("y", np.int32), ("w", np.int32), ("h", np.int32),
+                        ("score", np.float32), ("template", np.int32), ("category", np.int32)])
+
+
+def nms_by_category(matches, overlap_thresh=0.5):
+    """
+    Non-maximum suppression run separately within each category of MATCH_DTYPE records.
+
+    Returns:
+        numpy.ndarray: Indices of the kept matches, grouped by category, best first within each.
+    """
+    boxes = np.stack([matches["x"], matches["y"], matches["x"] + matches["w"], matches["y"] + matches["h"]], axis=1)
+    keep = []
+    for category in np.unique(matches["category"]):
+        members = np.flatnonzero(matches["category"] == category)
+        keep.append(members[nms_indices(boxes[members], matches["score"][members], overlap_thresh)])
+    return np.concatenate(keep) if keep else np.empty(0, dtype=np.intp)
+
+
+def search_window(screenshot, template, threshold, window):
+    """
+    Full-resolution search restricted to `window` (x1, y1, x2, y2) of the screenshot.
+
+    Returns:
+        numpy.ndarray: PEAK_DTYPE records, in screenshot coordinates.
+    """
+    x1, y1, x2, y2 = window
+    crop = screenshot[y1:y2, x1:x2]
+    if template.shape[0] > crop.shape[0] or template.shape[1] > crop.shape[1]:
+        return np.empty(0, dtype=PEAK_DTYPE)
+    return find_peaks(cv2.matchTemplate(crop, template, cv2.TM_CCOEFF_NORMED), threshold, offset=(x1, y1))
+
+
+def scale_template(template, scale):
+    """Downscale a template by `scale` (INTER_AREA, at least 1x1)."""
+    height, width = template.shape[:2]
+    size = (max(1, int(round(width * scale))), max(1, int(round(height * scale))))
+    return cv2.resize(template, size, interpolation=cv2.INTER_AREA)
+
+
+class ExhaustiveSearch:
+    """Full-resolution matchTemplate over the whole screenshot."""
+
+    name = "exhaustive"
+
+    def prepare(self, screenshot):
+        """Per-screenshot state shared by every template search."""
+        return screenshot
+
+    def search(self, prepared, template, threshold, small_template=None, stats=None):
+        """
+        Args:
+            prepared: Result of prepare(screenshot).
+            template (numpy.ndarray): Grayscale template.
+            threshold (float): Minimum TM_CCOEFF_NORMED score.
+            small_template: Unused (see PyramidSearch).
+            stats: Unused (see PyramidSearch).
+
+        Returns:
+            numpy.ndarray: PEAK_DTYPE records of the score peaks at or above `threshold`.
+        """
+        screenshot = prepared
+        if template.shape[0] > screenshot.shape[0] or template.shape[1] > screenshot.shape[1]:
+            return np.empty(0, dtype=PEAK_DTYPE)
+        return find_peaks(cv2.matchTemplate(screenshot, template, cv2.TM_CCOEFF_NORMED), threshold)
+
+
+class PyramidSearch(ExhaustiveSearch):
+    """Coarse match at `scale`, then refinement in small full-resolution windows."""
+
+    def __init__(self, scale=0.25, coarse_margin=0.15, max_candidates=20, refine_radius=None, min_template_side=8):
+        """
+        Args:
+            scale (float): Downscale factor of the coarse pass.
+            coarse_margin (float): Coarse peaks down to threshold - coarse_margin are refined.
+            max_candidates (int): Coarse peaks refined per template, best first.
+            refine_radius (int): Full-resolution pixels searched around each coarse peak;
+                defaults to two coarse pixels.
+            min_template_side (int): Templates smaller than this once downscaled are
+                searched exhaustively instead.
+        """
+        self.scale = scale
+        self.coarse_margin = coarse_margin
+        self.max_candidates = max_candidates
+        self.refine_radius = refine_radius if refine_radius is not None else int(np.ceil(2 / scale))
+        self.min_template_side = min_template_side
+        self.name = f"pyramid@{scale:g}/m{coarse_margin:g}/c{max_candidates}"
+        self.stats = {"coarse": 0, "refined_windows": 0, "exhaustive_fallback": 0}
+
+    def prepare(self, screenshot):
+        small = cv2.resize(screenshot, None, fx=self.scale, fy=self.scale, interpolation=cv2.INTER_AREA)
+        return screenshot, small
+
+    def coarse_peaks(self, small, small_template, threshold):
+        """Local maxima of the coarse score map at or above `threshold`, best first, as (x, y)."""
+        if small_template.shape[0] > small.shape[0] or small_template.shape[1] > small.shape[1]:
+            return []
+        peaks = find_peaks(cv2.matchTemplate(small, small_template, cv2.TM_CCOEFF_NORMED), threshold)
+        if len(peaks) > self.max_candidates:
+            peaks = peaks[np.argpartition(peaks["score"], -self.max_candidates)[-self.max_candidates:]]
+        peaks = peaks[np.argsort(-peaks["score"])]
+        return list(zip(peaks["x"].tolist(), peaks["y"].tolist()))
+
+    def search(self, prepared, template, threshold, small_template=None, stats=None):
+        """
+        Args:
+            prepared: Result of prepare(screenshot).
+            template (numpy.ndarray): Grayscale template.
+            threshold (float): Minimum TM_CCOEFF_NORMED score (at full resolution).
+            small_template (numpy.ndarray): The template already downscaled by `scale`
+                (e.g. TemplateBank.scaled); computed here when omitted.
+            stats (collections.Counter): Counters of this call, for callers on worker threads
+                (self.stats is not locked); they add them to self.stats on their own thread.
+                Defaults to self.stats.
+
+        Returns:
+            numpy.ndarray: PEAK_DTYPE records of the full-resolution peaks at or above `threshold`.
+        """
+        screenshot, small = prepared
+        stats = self.stats if stats is None else stats
+        if small_template is None:
+            small_template = scale_template(template, self.scale)
+        if min(small_template.shape[:2]) < self.min_template_side:
+            stats["exhaustive_fallback"] += 1
+            return super().search(screenshot, template, threshold)
+
+        stats["coarse"] += 1
+        height, width = template.shape[:2]
+        screen_h, screen_w = screenshot.shape[:2]
+        radius = self.refine_radius
+        found = []
+        for cx, cy in self.coarse_peaks(small, small_template, threshold - self.coarse_margin):
+            x0, y0 = int(round(cx / self.scale)), int(round(cy / self.scale))
+            x1, y1 = max(x0 - radius, 0), max(y0 - radius, 0)
+            x2, y2 = min(x0 + radius + width, screen_w), min(y0 + radius + height, screen_h)
+            if x2 - x1 < width or y2 - y1 < height:
+                continue
+            stats["refined_windows"] += 1
+            result = cv2.matchTemplate(screenshot[y1:y2, x1:x2], template, cv2.TM_CCOEFF_NORMED)
+            found.append(find_peaks(result, threshold, offset=(x1, y1)))
+        if not found:
+            return np.empty(0, dtype=PEAK_DTYPE)
+        # Windows of neighbouring coarse peaks overlap; report each position once.
+        peaks = np.concatenate(found)
+        _, first = np.unique(peaks["x"].astype(np.int64) << 32 | peaks["y"], return_index=True)
+        return peaks[np.sort(first)]
@@ -0,0 +1,93 @@
+import threading
+import unittest
+
+import cv2
+import numpy as np
+
+from adb_client import AdbServerClient, AdbServerError, SocketShellSession
+from adb_module import ADBModule
+from fake_adb_server import FakeAdbServer
+
+
+class TestAdbServerClient(unittest.TestCase):
+    def setUp(self):
+        self.server = FakeAdbServer(
+            devices={"emulator-5554": "device", "emulator-5556": "offline"},
+            outputs={"wm size": b"Physical size: 1600x900\n", "echo hi": b"hi\n"},
+        ).start()
+        self.client = AdbServerClient(port=self.server.port, timeout=5)
+
+    def tearDown(self):
+        self.client.close()
+        self.server.stop()
+
+    def test_host_services(self):
+        self.assertEqual(self.client.version(), 0x29)
+        self.assertEqual(self.client.devices(), [("emulator-5554", "device"), ("emulator-5556", "offline")])
+
+    def test_shell_and_exec(self):
+        self.assertEqual(self.client.shell("emulator-5554", "wm size"), "Physical size: 1600x900\n")
+        self.assertEqual(self.client.exec_out("emulator-5554", "echo hi"), b"hi\n")
+        self.assertIn(("emulator-5554", "wm size"), self.server.commands)
+
+    def test_unknown_device_fails(self):
+        with self.assertRaises(AdbServerError):
+            self.client.shell("emulator-9999", "wm size")
+
+    def test_pooled_connections_are_reused(self):
+        self.client.prewarm("emulator-5554")
+        self.assertEqual(len(self.client._pools["emulator-5554"]), self.client.pool_size)
+        self.client.exec_out("emulator-5554", "echo hi")
+        self.assertLessEqual(len(self.client._pools["emulator-5554"]), self.client.pool_size)
+
+    def test_one_refill_worker_per_device(self):
+        for _ in range(10):
+            self.client.exec_out("emulator-5554", "echo hi")
+        refillers = [t for t in threading.enumerate() if t.name == "adb-refill-emulator-5554"]
+        self.assertLessEqual(len(refillers), 1)
+        self.client.wait_for_refill("emulator-5554", timeout=5)
+        self.assertEqual(len(self.client._pools["emulator-5554"]), self.client.pool_size)
+        self.assertEqual(self.client._refillers, {})
+
+    def test_track_devices_streams_changes(self):
+        updates = self.client.track_devices()
+        self.assertIn(("emulator-5554", "device"), next(updates))
+        self.server.set_device_state("emulator-5554", None)
+        self.assertNotIn(("emulator-5554", "device"), next(updates))
+
+    def test_socket_shell_session(self):
+        session = SocketShellSession("emulator-5554", self.client, timeout=5)
+        try:
+            self.assertEqual(session.run("echo over-socket"), "over-socket")
+            session.run("input tap 10 20")
+            self.assertIn(("emulator-5554", "input tap 10 20"), self.server.commands)
+        finally:
+            session.close()
+
+
+class TestADBModuleOverServer(unittest.TestCase):
+    def setUp(self):
+        frame = np.zeros((90, 160, 3), dtype=np.uint8)
+        frame[5:15, 5:15] = 255
+        self.frame = frame
+        self.server = FakeAdbServer(outputs={"screencap -p": cv2.imencode(".png", frame)[1].tobytes()}).start()
+        self.adb = ADBModule(client=AdbServerClient(port=self.server.port, timeout=5))
+
+    def tearDown(self):
+        self.adb.close()
+        self.server.stop()
+
+    def test_device_and_input_without_adb_binary(self):
+        self.assertEqual(self.adb.device_id, "emulator-5554")
+        self.adb.tap_screen(100, 200)
+        self.adb.press_escape()
+        commands = [command for _, command in self.server.commands]
+        self.assertIn("input tap 100 200", commands)
+        self.assertIn("input keyevent 111", commands)
+
+    def test_capture_frame(self):
+        np.testing.assert_array_equal(self.adb.capture_frame(), self.frame)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,50 @@
+import unittest
+
+from adb_session import ADBShellSession
+
+
+class TestADBShellSession(unittest.TestCase):
+    def setUp(self):
+        # A local `sh` stands in for `adb shell` so no device is needed.
+        self.session = ADBShellSession("test-emulator", shell_command=["sh"], timeout=5)
+
+    def tearDown(self):
+        self.session.close()
+
+    def test_commands_share_one_process(self):
+        self.assertEqual(self.session.run("echo first"), "first")
+        pid = self.session.process.pid
+        self.assertEqual(self.session.run("echo second"), "second")
+        self.assertEqual(self.session.process.pid, pid)
+
+    def test_output_without_trailing_newline(self):
+        self.assertEqual(self.session.run("printf partial"), "partial")
+
+    def test_failed_command_does_not_break_session(self):
+        self.session.run("false")
+        self.assertEqual(self.session.run("echo still-alive"), "still-alive")
+
+    def test_check_raises_on_failed_command(self):
+        with self.assertRaises(RuntimeError) as ctx:
+            self.session.run("echo no such input; false", check=True)
+        self.assertIn("status 1", str(ctx.exception))
+        self.assertIn("no such input", str(ctx.exception))
+        self.assertEqual(self.session.run("echo still-alive", check=True), "still-alive")
+
+    def test_reconnects_after_pipe_dies(self):
+        self.session.run("echo warmup")
+        old_pid = self.session.process.pid
+        self.session.process.kill()
+        self.session.process.wait()
+
+        self.assertEqual(self.session.run("echo reconnected"), "reconnected")
+        self.assertNotEqual(self.session.process.pid, old_pid)
+
+    def test_shell_exit_mid_command_raises(self):
+        with self.assertRaises(RuntimeError):
+            self.session.run("exit 3")
+        self.assertEqual(self.session.run("echo recovered"), "recovered")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -2,7 +2,26 @@ import unittest
 from unittest.mock import MagicMock
 import os
 import sqlite3
+from concurrent.futures import Future
+
+import cv2
+import numpy as np
+
 from nodemapper import NodeMapper
+from ocr_engine import OCREngine
+from ocr_service import OCRService
+
+
+class GrasslandEngine(OCREngine):
+    """Reads every image as a grassland pop-up (module level so worker processes can build it)."""
+
+    name = "grassland"
+
+    def image_to_string(self, image, config=""):
+        return "Grass1and Kingdom of Teyagia Transfer Occupy"
+
+    def image_to_data(self, image, config=""):
+        return {"text": [], "conf": [], "left": [], "top": [], "width": [], "height": [], "line": []}
 
 
 class TestNodeMapper(unittest.TestCase):
@@ -114,6 +133,24 @@ class TestNodeMapper(unittest.TestCase):
         node_type, _, _ = self.mapper.classify_node(cleaned_text)
         self.assertEqual(node_type, expected_node_type)
 
+    def test_process_node_with_ocr_service(self):
+        """process_node stays synchronous with an OCR service; process_node_async returns the Future."""
+        self.adb_mock.capture_screenshot.side_effect = (
+            lambda device, path: cv2.imwrite(path, np.zeros((40, 60, 3), dtype=np.uint8)))
+        with OCRService(workers=1, engine_factory=GrasslandEngine, bank_path=None) as service:
+            self.mapper.ocr_service = service
+            self.assertEqual(self.mapper.process_node(100, 200)[0], "Grassland")
+            future = self.mapper.process_node_async(100, 200)
+            self.assertIsInstance(future, Future)
+            self.assertEqual(future.result(timeout=10)[0], "Grassland")
+        self.ocr_mock.extract_text.assert_not_called()
+
+    def test_process_node_async_without_ocr_service(self):
+        self.ocr_mock.extract_text.return_value = "Darknest"
+        future = self.mapper.process_node_async(100, 200)
+        self.assertTrue(future.done())
+        self.assertEqual(future.result()[0], "Darknest")
+
     def test_store_data(self):
         """Test storing data into the database."""
         adb_x, adb_y = 69, 183
@@ -0,0 +1,72 @@
+import threading
+import unittest
+
+from adb_client import AdbServerClient
+from adb_module2 import ADBModule
+from adb_session import ADBShellSession
+from device_registry import DeviceRegistry
+from fake_adb_server import FakeAdbServer
+
+
+class TestDeviceRegistry(unittest.TestCase):
+    def setUp(self):
+        self.server = FakeAdbServer(devices={"emulator-5554": "device", "emulator-5556": "unauthorized"}).start()
+        self.client = AdbServerClient(port=self.server.port, timeout=5)
+        self.registry = DeviceRegistry(client=self.client).start()
+
+    def tearDown(self):
+        self.registry.stop()
+        self.server.stop()
+
+    def test_initial_state(self):
+        self.assertTrue(self.registry.is_online("emulator-5554"))
+        self.assertFalse(self.registry.is_online("emulator-5556"))
+        self.assertEqual(self.registry.state("emulator-5556"), "unauthorized")
+        self.assertEqual(self.registry.online_devices(), ["emulator-5554"])
+
+    def test_listeners_see_connect_and_disconnect(self):
+        events = []
+        seen = threading.Event()
+
+        def listener(serial, online):
+            events.append((serial, online))
+            if len(events) == 2:
+                seen.set()
+
+        def failing(serial, online):
+            raise RuntimeError("listener bug")
+
+        self.registry.add_listener(failing)  # Must not stop tracking or the listeners after it
+        self.registry.add_listener(listener)
+        self.server.set_device_state("emulator-5556", "device")
+        self.assertTrue(self.registry.wait_for_device("emulator-5556", timeout=5))
+        self.server.set_device_state("emulator-5554", "offline")
+        self.assertTrue(seen.wait(5))
+        self.assertEqual(events, [("emulator-5556", True), ("emulator-5554", False)])
+
+    def test_adb_module_validates_without_adb_devices(self):
+        adb = ADBModule(registry=self.registry)
+        adb.validate_device_id("emulator-5554")
+        with self.assertRaises(ValueError):
+            adb.validate_device_id("emulator-5556")
+        self.assertEqual(adb.list_devices(), ["emulator-5554"])
+
+    def test_failed_tap_raises(self):
+        adb = ADBModule(registry=self.registry)
+        adb.adb_checked = True
+        # A local `sh` has no `input` binary, so the tap exits with status 127 like a rejected input command.
+        adb.sessions["emulator-5554"] = ADBShellSession("emulator-5554", shell_command=["sh"], timeout=5)
+        try:
+            with self.assertRaises(RuntimeError):
+                adb.tap("emulator-5554", 10, 20)
+            with self.assertRaises(RuntimeError):
+                adb.swipe("emulator-5554", 10, 20, 30, 40)
+        finally:
+            adb.close()
+
+    def test_wait_for_device_times_out(self):
+        self.assertFalse(self.registry.wait_for_device("emulator-9999", timeout=0.1))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,157 @@
+import json
+import os
+import sqlite3
+import tempfile
+import unittest
+
+import cv2
+import numpy as np
+
+from fake_device import CorpusRecorder, FrameCorpus, RecordedDevice
+from mapscanner import MapScanner
+from navigation_tool import NavigationTool
+from ocr_engine import OCREngine
+from screenshot_processor import ScreenshotProcessor
+from test_template_search import icon
+
+
+def solid(value):
+    return np.full((90, 160, 3), value, dtype=np.uint8)
+
+
+class TestRecordedDevice(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        corpus = FrameCorpus(self.tmp.name)
+        corpus.add((263, 494, 1004), None, solid(10))
+        corpus.add((263, 494, 1004), (790, 450), solid(20))
+        corpus.add((263, 100, 200), None, solid(30))
+        corpus.save()
+        self.device = RecordedDevice(self.tmp.name, center=(263, 494, 1004))
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_popup_state_follows_taps_and_escape(self):
+        self.assertEqual(self.device.capture_frame()[0, 0, 0], 10)
+        self.device.tap_screen(790, 450)
+        self.assertEqual(self.device.capture_frame()[0, 0, 0], 20)
+        self.device.press_escape()
+        self.assertEqual(self.device.capture_frame()[0, 0, 0], 10)
+
+    def test_run_sequence_captures_popup(self):
+        frame = self.device.run_sequence([
+            {"action": "tap", "x": 790, "y": 450},
+            {"action": "wait", "seconds": 5},
+            {"action": "capture"},
+            {"action": "escape"},
+        ])
+        self.assertEqual(frame[0, 0, 0], 20)
+        self.assertIsNone(self.device.popup)
+
+    def test_tap_tolerance_and_fallback(self):
+        self.device.tap(None, 795, 452)
+        self.assertEqual(self.device.capture_frame()[0, 0, 0], 10)
+        self.device.press_escape()
+        self.device.tap_tolerance = 10
+        self.device.tap_screen(795, 452)
+        self.assertEqual(self.device.capture_frame()[0, 0, 0], 20)
+
+    def test_navigation_from_keypad_taps(self):
+        nav = NavigationTool(adb=self.device)
+        nav.navigate_to_coordinates(263, 100, 200, last_kingdom=263, last_x=494, last_y=1004)
+        self.assertEqual(self.device.center, (263, 100, 200))
+        self.assertEqual(self.device.capture_frame()[0, 0, 0], 30)
+
+    def test_capture_screenshot_writes_png(self):
+        path = os.path.join(self.tmp.name, "shots", "tile.png")
+        self.assertEqual(self.device.capture_screenshot(path), path)
+        self.assertEqual(cv2.imread(path)[0, 0, 0], 10)
+
+    def test_unrecorded_view_is_blank(self):
+        self.device.center = (1, 2, 3)
+        self.assertFalse(self.device.capture_frame().any())
+
+
+    def test_recorder_builds_a_corpus_from_a_device(self):
+        live = RecordedDevice(self.tmp.name, center=(263, 494, 1004))  # Stands in for the live device
+        with tempfile.TemporaryDirectory() as out:
+            recorder = CorpusRecorder(live, out, settle_timeout=0.2)
+            recorder.record({(263, 494, 1004): [(790, 450)], (263, 100, 200): []})
+            recorded = FrameCorpus(out)
+            self.assertEqual(set(recorded.entries), set(FrameCorpus(self.tmp.name).entries))
+            self.assertEqual(recorded.lookup((263, 494, 1004), (790, 450))[0, 0, 0], 20)
+            self.assertEqual(recorded.lookup((263, 100, 200), None)[0, 0, 0], 30)
+        self.assertIsNone(live.popup)
+
+
+class StampEngine(OCREngine):
+    """Reads each solid block of a crop or mosaic as the text stamped with its gray level."""
+
+    name = "stamp"
+
+    def __init__(self, texts):
+        self.texts = texts
+
+    def image_to_data(self, image, config=""):
+        data = {key: [] for key in ("text", "conf", "left", "top", "width", "height", "line")}
+        count, _, stats, _ = cv2.connectedComponentsWithStats((image != image[0, 0]).astype(np.uint8))
+        for left, top, width, height, _ in sorted(stats[1:].tolist(), key=lambda box: box[1]):
+            text = self.texts.get(int(image[top + height // 2, left + width // 2]))
+            if text:
+                for key, value in zip(("text", "conf", "left", "top", "width", "height", "line"),
+                                      (text, 95.0, left, top, width, height, len(data["line"]))):
+                    data[key].append(value)
+        return data
+
+    def image_to_string(self, image, config=""):
+        return "\n".join(self.image_to_data(image, config)["text"])
+
+
+class TestOfflineScan(unittest.TestCase):
+    """MapScanner.process_tile end to end against recorded frames: tap, wait, OCR, classify, store."""
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.tmp = self._tmp.name
+        close_button = icon(7)
+        cv2.imwrite(os.path.join(self.tmp, "close_button.png"), close_button)
+        self.roi_file = os.path.join(self.tmp, "rois.json")
+        raw = {"threshold": "none", "psm": 6}
+        with open(self.roi_file, "w") as f:
+            json.dump({"ocr_regions": [[700, 250, 900, 290]], "node_types": {"monster": [[700, 300, 900, 340]]},
+                       "pipelines": {name: raw for name in ("default", "ocr_regions", "node_types", "popups")}}, f)
+
+        map_view = np.zeros((900, 1600, 3), dtype=np.uint8)
+        popup = map_view.copy()
+        popup[136:184, 1051:1099] = close_button[:, :, None]  # Close button, centered near (1075, 160)
+        popup[260:280, 720:880] = 60  # Coordinate banner
+        popup[310:330, 720:880] = 120  # Tile name
+        corpus = FrameCorpus(os.path.join(self.tmp, "corpus"))
+        corpus.add((263, 494, 1004), None, map_view)
+        corpus.add((263, 494, 1004), (790, 450), popup)
+        corpus.save()
+
+        self.device = RecordedDevice(corpus, center=(263, 494, 1004))
+        engine = StampEngine({60: "K:263 X:500 Y:1000", 120: "monster"})
+        processor = ScreenshotProcessor(template_path=os.path.join(self.tmp, "close_button.png"), engine=engine,
+                                        roi_file=self.roi_file)
+        self.db_path = os.path.join(self.tmp, "map_data.db")
+        self.scanner = MapScanner(screenshots_dir=os.path.join(self.tmp, "screenshots"), db_path=self.db_path,
+                                  roi_file=self.roi_file, adb=self.device, processor=processor, engine=engine)
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def test_process_tile_classifies_and_stores_the_tile(self):
+        self.scanner.process_tile(790, 450)
+        with sqlite3.connect(self.db_path) as conn:
+            rows = conn.execute("SELECT adb_x, adb_y, center_k, center_x, center_y, tile_type "
+                                "FROM digested_screenshots").fetchall()
+        self.assertEqual(rows, [(790, 450, 263, 500, 1000, "monster")])
+        self.assertIsNone(self.device.popup)  # Dismissed with ESC
+        self.assertTrue(os.path.exists(os.path.join(self.tmp, "screenshots", "popup_790_450.png")))
+
+
+if __name__ == "__main__":
+    unittest.main()
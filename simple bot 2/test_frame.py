@@ -0,0 +1,50 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import cv2
+import numpy as np
+
+from frame import Frame
+
+
+class TestFrame(unittest.TestCase):
+    def setUp(self):
+        self.bgr = np.zeros((100, 200, 3), dtype=np.uint8)
+        self.bgr[20:40, 50:150] = 255
+
+    def test_path_is_decoded_once(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "shot.png")
+            cv2.imwrite(path, self.bgr)
+            frame = Frame(path)
+            with mock.patch("frame.cv2.imread", wraps=cv2.imread) as imread:
+                for roi in [(50, 20, 150, 40), (0, 0, 10, 10), (50, 20, 150, 40)]:
+                    frame.threshold(roi)
+                    frame.crop(roi)
+                self.assertEqual(imread.call_count, 1)
+
+    def test_crops_and_thresholds_are_memoized(self):
+        frame = Frame(self.bgr)
+        self.assertIs(frame.crop((50, 20, 150, 40)), frame.crop((50, 20, 150, 40)))
+        self.assertIs(frame.threshold((45, 15, 155, 45)), frame.threshold((45, 15, 155, 45)))
+        self.assertEqual(frame.crop((50, 20, 150, 40)).min(), 255)
+        self.assertEqual(set(np.unique(frame.threshold((45, 15, 155, 45)))), {0, 255})
+
+    def test_rgba_frames_and_clipping(self):
+        rgba = np.dstack([self.bgr[:, :, ::-1], np.full((100, 200), 255, dtype=np.uint8)])
+        frame = Frame(rgba)
+        self.assertEqual(frame.shape, (100, 200))
+        self.assertEqual(frame.crop((180, 90, 300, 300)).shape, (10, 20))
+        self.assertIsNone(frame.crop((300, 0, 400, 10)))
+
+    def test_of_reuses_frames_and_flags_unreadable_paths(self):
+        frame = Frame(self.bgr)
+        self.assertIs(Frame.of(frame), frame)
+        self.assertFalse(Frame("does/not/exist.png").is_valid())
+        self.assertIsNone(Frame("does/not/exist.png").crop((0, 0, 5, 5)))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,114 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from glyph_ocr import GlyphOCR, bootstrap_from_log, load_debug_log, render_text, train_from_crops
+from ocr_batch import ocr_rois
+from ocr_engine import OCREngine
+
+DEBUG_LOG = os.path.join(os.path.dirname(os.path.abspath(__file__)), "ocr_debug_log.txt")
+
+
+class FixedEngine(OCREngine):
+    name = "fixed"
+
+    def __init__(self, text):
+        self.text = text
+        self.calls = 0
+
+    def image_to_string(self, image, config=""):
+        self.calls += 1
+        return self.text
+
+    def image_to_data(self, image, config=""):
+        self.calls += 1
+        return {key: [] for key in ("text", "conf", "left", "top", "width", "height", "line")}
+
+
+class TestGlyphOCR(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.log = os.path.join(self.tmp.name, "ocr_debug_log.txt")
+        with open(self.log, "w") as f:
+            for i, (k, x, y) in enumerate([(263, 494, 1024), (263, 178, 356), (1693, 507, 1017), (263, 859, 31)]):
+                f.write(f"{'=' * 50}\nOCR Output from temp_screenshot.png at 2025-01-29 15:48:0{i}\nKingdom of Teyagia\n\nK:{k} X:{x} Y:{y}\n\n")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_debug_log_readings(self):
+        self.assertEqual(load_debug_log(self.log)[0], "K:263 X:494 Y:1024")
+        self.assertGreater(len(load_debug_log(DEBUG_LOG)), 100)
+
+    def labelled_crops(self):
+        """Stand-ins for real labelled crops (roi_log.csv boxes): every reading at two scales."""
+        return [(render_text(text, scale=scale), text) for scale in (1.0, 1.1) for text in load_debug_log(self.log)]
+
+    def test_bootstrapped_bank_is_not_trusted(self):
+        bank = os.path.join(self.tmp.name, "glyphs.npz")
+        glyphs, accuracy = bootstrap_from_log(self.log, bank, validation_split=0.25)
+        self.assertEqual(accuracy, 1.0)
+        self.assertTrue(os.path.exists(bank))
+
+        reloaded = GlyphOCR(bank_path=bank, min_confidence=0.8, engine=FixedEngine("K:263 X:859 Y:31"))
+        self.assertFalse(reloaded.trusted)
+        self.assertEqual(reloaded.read_coordinates(render_text("K:263 X:859 Y:31", scale=1.1)), (263, 859, 31))
+        self.assertEqual((reloaded.stats["glyph"], reloaded.engine.calls), (0, 1))
+
+    def test_verified_bank_bypasses_the_engine(self):
+        bank = os.path.join(self.tmp.name, "trained.npz")
+        glyphs, agreement = train_from_crops(self.labelled_crops(), bank, validation_split=0.5, min_confidence=0.8,
+                                             min_verified_samples=4)
+        self.assertEqual((agreement, glyphs.bank.checked), (1.0, 4))
+
+        reloaded = GlyphOCR(bank_path=bank, min_confidence=0.8, engine=FixedEngine(""), min_verified_samples=4)
+        self.assertTrue(reloaded.trusted)
+        self.assertEqual(reloaded.read_coordinates(render_text("K:263 X:859 Y:31", scale=1.1)), (263, 859, 31))
+        self.assertEqual((reloaded.stats["glyph"], reloaded.engine.calls), (1, 0))
+        self.assertFalse(GlyphOCR(bank_path=bank, min_verified_samples=5).trusted)
+
+    def test_low_confidence_falls_back_and_learns(self):
+        engine = FixedEngine("K:263 X:494 Y:1004")
+        bank = os.path.join(self.tmp.name, "learned.npz")
+        glyphs = GlyphOCR(bank_path=bank, engine=engine, learn=True, min_verified_samples=1)
+        crop = render_text("K:263 X:494 Y:1004")
+        self.assertEqual(glyphs.read_coordinates(crop, expected=(263, 494, 1004)), (263, 494, 1004))
+        self.assertEqual((engine.calls, glyphs.stats["fallback"]), (1, 1))
+        self.assertGreater(glyphs.stats["learned"], 0)
+        self.assertFalse(os.path.exists(bank))  # Saved in batches, not per crop
+
+        # Learned but not yet verified: still read by the engine, which vouches for the bank
+        self.assertEqual(glyphs.read_coordinates(crop, expected=(263, 494, 1004)), (263, 494, 1004))
+        self.assertEqual((engine.calls, glyphs.bank.agreed), (2, 1))
+        self.assertEqual(glyphs.read_coordinates(crop), (263, 494, 1004))
+        self.assertEqual(engine.calls, 2)
+        glyphs.close()
+        self.assertTrue(os.path.exists(bank))
+
+    def test_unverified_readings_are_not_learned(self):
+        self.assertFalse(GlyphOCR(bank_path=None).learn_from_fallback)
+        glyphs = GlyphOCR(bank_path=None, engine=FixedEngine("K:263 X:494 Y:1004"), learn=True)
+        crop = render_text("K:263 X:494 Y:1004")
+        glyphs.read_coordinates(crop, expected=(263, 494, 1005))
+        glyphs.read_coordinates(crop)
+        self.assertEqual((glyphs.stats["learned"], glyphs.stats["rejected"]), (0, 1))
+        glyphs.read_coordinates(render_text("K:263 X:494 Y:1004", scale=1.1))  # A second read agrees
+        self.assertGreater(glyphs.stats["learned"], 0)
+
+    def test_batched_ocr_skips_confident_coordinate_rois(self):
+        glyphs, _ = train_from_crops(self.labelled_crops(), bank_path=None, validation_split=0.5,
+                                     min_verified_samples=4)
+        banner = render_text("K:263 X:494 Y:1004")
+        frame = np.full((200, 400), 230, dtype=np.uint8)
+        frame[10:10 + banner.shape[0], 10:10 + banner.shape[1]] = banner
+        engine = FixedEngine("")
+        rois = {"center": (0, 0, 20 + banner.shape[1], 20 + banner.shape[0])}
+        results = ocr_rois(frame, rois, engine=engine, glyphs=glyphs, coordinate_rois=rois)
+        self.assertEqual(results["center"]["text"], "K:263 X:494 Y:1004")
+        self.assertEqual(engine.calls, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,38 @@
+import queue
+import unittest
+from concurrent.futures import Future
+
+from mapscanner import MapScanner
+
+
+class TestMapScannerResults(unittest.TestCase):
+    def make_scanner(self):
+        # Built by hand: no device, engine or database needed to exercise the result queue.
+        scanner = MapScanner.__new__(MapScanner)
+        scanner._results = queue.Queue()
+        scanner._outstanding = 0
+        scanner.classified = []
+        scanner._classify_tile = lambda adb_x, adb_y, frame, texts, settled: scanner.classified.append(
+            (adb_x, adb_y, texts))
+        return scanner
+
+    def test_results_are_handled_on_the_scanning_thread(self):
+        scanner = self.make_scanner()
+        ok, failed, late = Future(), Future(), Future()
+        for x, future in enumerate((ok, failed, late), start=1):
+            scanner._queue_result(x, 0, None, future)
+        ok.set_result({"roi": {"text": "K:1 X:2 Y:3"}})
+        failed.set_exception(RuntimeError("worker died"))
+        self.assertEqual(scanner.classified, [])  # Nothing runs on the callback thread
+        self.assertEqual(scanner.handle_results(), 2)
+        self.assertEqual(scanner.classified, [(1, 0, {"roi": {"text": "K:1 X:2 Y:3"}})])
+
+        self.assertFalse(scanner.drain(timeout=0.05))
+        late.set_result({})
+        self.assertTrue(scanner.drain(timeout=1))
+        self.assertEqual([tile[0] for tile in scanner.classified], [1, 3])
+        self.assertEqual(scanner._outstanding, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,66 @@
+import unittest
+
+import cv2
+import numpy as np
+
+from ocr_batch import build_mosaic, normalize_roi, ocr_rois, split_words
+from ocr_engine import OCREngine
+
+
+class BlobEngine(OCREngine):
+    """Reports every dark blob of the image as one word; its text is the blob's width."""
+
+    name = "blobs"
+
+    def __init__(self):
+        self.calls = 0
+
+    def image_to_string(self, image, config=""):
+        data = self.image_to_data(image, config)
+        return " ".join(data["text"])
+
+    def image_to_data(self, image, config=""):
+        self.calls += 1
+        count, _, stats, _ = cv2.connectedComponentsWithStats((image < 128).astype(np.uint8))
+        data = {key: [] for key in ("text", "conf", "left", "top", "width", "height", "line")}
+        for line, (x, y, w, h, _) in enumerate(stats[1:]):
+            for key, value in zip(("text", "conf", "left", "top", "width", "height", "line"), (str(w), 90.0, x, y, w, h, line)):
+                data[key].append(value)
+        return data
+
+
+class TestOCRBatch(unittest.TestCase):
+    def test_normalize_roi(self):
+        self.assertEqual(normalize_roi([747.0, 310.0, 1060.0, 263.0]), (747, 263, 1060, 310))
+
+    def test_mosaic_slots_hold_the_crops(self):
+        crops = {"a": np.full((10, 30), 7, dtype=np.uint8), "b": np.full((5, 50), 9, dtype=np.uint8)}
+        mosaic, slots = build_mosaic(crops, padding=4)
+        self.assertEqual(mosaic.shape, (10 + 5 + 16, 58))
+        for name, (x1, y1, x2, y2) in slots.items():
+            self.assertTrue(np.array_equal(mosaic[y1:y2, x1:x2], crops[name]))
+
+    def test_split_words_by_slot(self):
+        slots = {"a": (4, 4, 34, 14), "b": (4, 22, 54, 27)}
+        data = {"text": ["K:1", "X:2", "Y:3"], "conf": [90, 80, 70], "left": [5, 20, 5],
+                "top": [5, 5, 22], "width": [10, 10, 10], "height": [8, 8, 5], "line": [0, 0, 1]}
+        words = split_words(data, slots, padding=4)
+        self.assertEqual([w[2] for w in words["a"]], ["K:1", "X:2"])
+        self.assertEqual([w[2] for w in words["b"]], ["Y:3"])
+
+    def test_ocr_rois_runs_the_engine_once(self):
+        frame = np.full((200, 300, 3), 255, dtype=np.uint8)
+        frame[20:30, 20:60] = 0     # 40 px wide, inside "wide"
+        frame[120:130, 200:215] = 0  # 15 px wide, inside "narrow"
+        engine = BlobEngine()
+        results = ocr_rois(frame, {"wide": (10, 10, 100, 40), "narrow": (190, 140, 250, 110),
+                                   "empty": (0, 160, 50, 190), "outside": (400, 0, 500, 10)}, engine=engine)
+        self.assertEqual(engine.calls, 1)
+        self.assertEqual(results["wide"], {"text": "40", "conf": 90.0})
+        self.assertEqual(results["narrow"]["text"], "15")
+        self.assertEqual(results["empty"], {"text": "", "conf": 0.0})
+        self.assertEqual(results["outside"], {"text": "", "conf": -1.0})
+
+
+if __name__ == "__main__":
+    unittest.main()
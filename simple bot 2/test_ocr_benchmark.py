@@ -0,0 +1,80 @@
+import copy
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from fake_device import FrameCorpus
+from glyph_ocr import bootstrap_from_log
+from ocr_benchmark import (compare_reports, is_correct, run_benchmark, samples_from_corpus, samples_from_debug_log,
+                           samples_from_roi_log)
+from ocr_pipeline import Pipeline
+
+DEBUG_LOG = os.path.join(os.path.dirname(os.path.abspath(__file__)), "ocr_debug_log.txt")
+
+
+class TestOCRBenchmark(unittest.TestCase):
+    def test_sample_loaders(self):
+        samples = samples_from_debug_log(DEBUG_LOG, limit=5)
+        self.assertEqual(len(samples), 5)
+        self.assertTrue(samples[0]["expected"].startswith("K:"))
+
+        with tempfile.TemporaryDirectory() as tmp:
+            corpus = FrameCorpus(tmp)
+            corpus.add((263, 494, 1004), None, np.zeros((200, 300, 3), dtype=np.uint8))
+            corpus.save()
+            self.assertEqual(samples_from_corpus(tmp)[0]["expected"], "K:263 X:494 Y:1004")
+
+            shot = "K_263_X_494_Y_1004_rss.png"
+            open(os.path.join(tmp, shot), "wb").close()
+            log = os.path.join(tmp, "roi_log.csv")
+            with open(log, "w") as f:
+                f.write("original_filename,coord_box_left,coord_box_top,coord_box_right,coord_box_bottom,"
+                        "type_box_left,type_box_top,type_box_right,type_box_bottom,k_val,x_val,y_val,tile_type,new_filename\n"
+                        f"a.png,1,2,30,40,5,6,70,80,263,494,1004,rss,{shot}\nb.png,0,0,0,0,0,0,0,0,,,,,\n")
+            labeled = samples_from_roi_log(log, tmp)
+        self.assertEqual([(s["roi_type"], s["expected"]) for s in labeled],
+                         [("tile_coordinates", "K:263 X:494 Y:1004"), ("node_types", "rss")])
+        self.assertEqual(labeled[1]["roi"], (5, 6, 70, 80))
+
+    def test_report_rows_and_errors(self):
+        glyphs, _ = bootstrap_from_log(DEBUG_LOG, bank_path=None)
+        samples = samples_from_debug_log(DEBUG_LOG, limit=10)
+
+        def broken(crop, config):
+            raise RuntimeError("tesseract is not installed")
+
+        backends = {"glyph": (lambda crop, config: glyphs.recognize(crop)[0], False), "broken": (broken, True)}
+        variants = {"otsu": Pipeline(name="otsu")}
+        report = run_benchmark(samples, backends, variants, repeats=2)
+        rows = {(r["backend"], r["variant"], r["roi_type"]): r for r in report["results"]}
+        # Rendered debug-log banners are synthetic: their own rows, never the headline "all"
+        self.assertEqual(set(rows), {("glyph", "-", "ocr_regions (synthetic)"), ("glyph", "-", "all (synthetic)")})
+        pooled = rows["glyph", "-", "all (synthetic)"]
+        self.assertEqual(pooled["samples"], 20)
+        self.assertGreater(pooled["accuracy"], 0.8)
+        self.assertLessEqual(pooled["p50_ms"], pooled["p95_ms"])
+        self.assertIn("broken", report["meta"]["errors"])
+        self.assertEqual(report["meta"]["samples"], {"debug_log": 10})
+        self.assertEqual(report["meta"]["synthetic_samples"], 10)
+
+    def test_tile_type_scoring(self):
+        sample = {"kind": "tile_type", "expected": "monster"}
+        self.assertTrue(is_correct(sample, "Monster Hunt"))
+        self.assertFalse(is_correct(sample, "Resource Node"))
+
+    def test_compare_flags_regressions(self):
+        row = {"backend": "tesserocr", "variant": "otsu", "roi_type": "all", "samples": 10,
+               "accuracy": 0.95, "p50_ms": 10.0, "p95_ms": 20.0, "rois_per_second": 90.0}
+        baseline = {"meta": {}, "results": [row]}
+        current = copy.deepcopy(baseline)
+        self.assertEqual(compare_reports(baseline, current), [])
+        current["results"][0].update(accuracy=0.90, p95_ms=30.0)
+        self.assertEqual(len(compare_reports(baseline, current)), 2)
+        current["results"] = []  # e.g. the backend failed to load
+        self.assertEqual(len(compare_reports(baseline, current)), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
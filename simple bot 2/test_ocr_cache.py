@@ -0,0 +1,130 @@
+import os
+import sqlite3
+import tempfile
+import unittest
+
+import numpy as np
+
+from ocr_batch import ocr_rois
+from ocr_cache import CachedEngine, OCRCache, cache_key
+from ocr_engine import OCREngine
+
+
+class CountingEngine(OCREngine):
+    name = "counting"
+
+    def __init__(self):
+        self.calls = 0
+
+    def image_to_string(self, image, config=""):
+        self.calls += 1
+        return f"text {self.calls}"
+
+    def image_to_data(self, image, config=""):
+        self.calls += 1
+        height = image.shape[0]
+        # One word per 30 px row of the mosaic
+        rows = range(20, height, 30)
+        return {"text": ["word"] * len(rows), "conf": [90.0] * len(rows), "left": [25] * len(rows),
+                "top": list(rows), "width": [10] * len(rows), "height": [8] * len(rows), "line": list(range(len(rows)))}
+
+
+class UpgradedEngine(CountingEngine):
+    version = "2.0"
+
+
+class TestOCRCache(unittest.TestCase):
+    def setUp(self):
+        self.crop = np.arange(60, dtype=np.uint8).reshape(6, 10)
+
+    def test_key_depends_on_pixels_shape_and_config(self):
+        key = cache_key(self.crop, "--psm 6")
+        self.assertEqual(key, cache_key(self.crop.copy(), "--psm 6"))
+        self.assertNotEqual(key, cache_key(self.crop, "--psm 7"))
+        self.assertNotEqual(key, cache_key(self.crop.reshape(10, 6), "--psm 6"))
+        changed = self.crop.copy()
+        changed[0, 0] = 255
+        self.assertNotEqual(key, cache_key(changed, "--psm 6"))
+
+    def test_key_depends_on_engine_identity(self):
+        key = cache_key(self.crop, "--psm 6", engine="pytesseract/4.1.1")
+        self.assertNotEqual(key, cache_key(self.crop, "--psm 6", engine="pytesseract/5.3.0"))
+        self.assertNotEqual(key, cache_key(self.crop, "--psm 6", engine="tesserocr/4.1.1"))
+
+    def test_engine_upgrade_misses_the_disk_tier(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "ocr_cache.db")
+            first = CachedEngine(CountingEngine(), OCRCache(db_path=path))
+            first.image_to_string(self.crop)
+            first.cache.close()
+
+            second = CachedEngine(UpgradedEngine(), OCRCache(db_path=path))
+            second.image_to_string(self.crop)
+            self.assertEqual(second.engine.calls, 1)
+            second.cache.close()
+
+    def test_disk_writes_are_committed_in_batches(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "ocr_cache.db")
+            cache = OCRCache(db_path=path, commit_every=3)
+            reader = sqlite3.connect(path)
+            count = lambda: reader.execute("SELECT COUNT(*) FROM ocr_cache").fetchone()[0]
+            cache.put("a", "A")
+            cache.put("b", "B")
+            self.assertEqual(count(), 0)
+            cache.put("c", "C")
+            self.assertEqual(count(), 3)
+            cache.put("d", "D")
+            cache.flush()
+            self.assertEqual(count(), 4)
+            reader.close()
+            cache.close()
+
+    def test_identical_crops_skip_the_engine(self):
+        engine = CachedEngine(CountingEngine())
+        self.assertEqual(engine.image_to_string(self.crop, "--psm 6"), "text 1")
+        self.assertEqual(engine.image_to_string(self.crop.copy(), "--psm 6"), "text 1")
+        self.assertEqual(engine.image_to_string(self.crop, "--psm 7"), "text 2")
+        self.assertEqual(engine.engine.calls, 2)
+        self.assertEqual(engine.cache.stats()["hits"], 1)
+
+    def test_lru_eviction(self):
+        cache = OCRCache(max_entries=2)
+        for key in "abc":
+            cache.put(key, key.upper())
+        self.assertIsNone(cache.get("a"))
+        self.assertEqual(cache.get("c"), "C")
+        self.assertEqual(cache.stats()["entries"], 2)
+
+    def test_disk_tier_survives_restarts(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "ocr_cache.db")
+            first = CachedEngine(CountingEngine(), OCRCache(db_path=path))
+            first.image_to_string(self.crop)
+            first.cache.close()
+
+            second = CachedEngine(CountingEngine(), OCRCache(db_path=path))
+            self.assertEqual(second.image_to_string(self.crop), "text 1")
+            self.assertEqual(second.engine.calls, 0)
+            self.assertEqual(second.cache.stats()["disk_hits"], 1)
+            second.cache.close()
+
+    def test_batched_rois_are_cached_per_crop(self):
+        engine = CachedEngine(CountingEngine())
+        frame = np.zeros((100, 100), dtype=np.uint8)
+        frame[0:10, 0:50] = 200
+        rois = {"center": (0, 0, 50, 10)}
+        first = ocr_rois(frame, rois, engine=engine)
+        frame[50:60, 0:50] = 100  # A different pop-up; the center banner is unchanged
+        second = ocr_rois(frame, dict(rois, popup=(0, 50, 50, 60)), engine=engine)
+        self.assertEqual(second["center"], first["center"])
+        self.assertEqual(engine.engine.calls, 2)
+        self.assertEqual(second["popup"]["text"], "word")
+
+        upgraded = CachedEngine(UpgradedEngine(), engine.cache)  # Same cache, newer recognizer
+        ocr_rois(frame, rois, engine=upgraded)
+        self.assertEqual(upgraded.engine.calls, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
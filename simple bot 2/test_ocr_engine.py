@@ -0,0 +1,88 @@
+import unittest
+from unittest import mock
+
+import numpy as np
+from PIL import Image
+
+import ocr_engine
+from ocr_engine import OCREngine, PytesseractEngine, benchmark_engines, parse_config, to_pil
+
+
+class CountingEngine(OCREngine):
+    name = "counting"
+
+    def __init__(self):
+        self.calls = 0
+
+    def image_to_string(self, image, config=""):
+        self.calls += 1
+        return "K:263 X:494 Y:1004"
+
+    def image_to_data(self, image, config=""):
+        self.calls += 1
+        return {"text": ["K:263", "X:494", "Y:1004"], "conf": [90.0] * 3, "left": [0, 40, 80], "top": [0] * 3,
+                "width": [35] * 3, "height": [10] * 3, "line": [0] * 3}
+
+
+class TestOCREngine(unittest.TestCase):
+    def test_engines_must_implement_the_interface(self):
+        class TextOnly(OCREngine):
+            def image_to_string(self, image, config=""):
+                return ""
+
+        with self.assertRaises(TypeError):
+            TextOnly()
+
+    def test_parse_config(self):
+        self.assertEqual(parse_config(""), ("eng", 3, {}))
+        self.assertEqual(
+            parse_config("--oem 1 --psm 7 -l eng -c tessedit_char_whitelist=KXY:0123456789"),
+            ("eng", 7, {"tessedit_char_whitelist": "KXY:0123456789"}),
+        )
+
+    def test_to_pil_converts_frames_to_grayscale(self):
+        rgba = np.zeros((4, 6, 4), dtype=np.uint8)
+        self.assertEqual(to_pil(rgba).mode, "L")
+        self.assertEqual(to_pil(rgba).size, (6, 4))
+        image = Image.new("RGB", (2, 2))
+        self.assertIs(to_pil(image), image)
+
+    def test_fallback_to_pytesseract_without_binding(self):
+        with mock.patch.object(ocr_engine, "tesserocr", None):
+            self.assertEqual(ocr_engine.available_engines(), ["pytesseract"])
+            self.assertIsInstance(ocr_engine.create_engine(), PytesseractEngine)
+            with self.assertRaises(ImportError):
+                ocr_engine.TesserocrEngine()
+
+    def test_pytesseract_data_keeps_words_with_global_line_numbers(self):
+        raw = {
+            "level": [4, 5, 5, 5, 5], "block_num": [1, 1, 1, 1, 2], "par_num": [1, 1, 1, 1, 1],
+            "line_num": [1, 1, 1, 1, 1], "text": ["", "K:263", " ", "X:494", "Y:1004"],
+            "conf": [-1, 91, -1, 88.5, 70], "left": [0, 1, 0, 40, 5], "top": [0, 2, 0, 2, 30],
+            "width": [90, 30, 0, 30, 40], "height": [10, 9, 0, 9, 9],
+        }
+        with mock.patch("ocr_engine.pytesseract.image_to_data", return_value=raw):
+            data = PytesseractEngine().image_to_data(np.zeros((40, 90), dtype=np.uint8))
+        self.assertEqual(data["text"], ["K:263", "X:494", "Y:1004"])
+        self.assertEqual(data["line"], [0, 0, 1])
+        self.assertEqual(data["conf"], [91.0, 88.5, 70.0])
+
+    def test_benchmark_reports_throughput(self):
+        engine = CountingEngine()
+        results = benchmark_engines([np.zeros((8, 8), dtype=np.uint8)] * 3, engines=[engine], repeats=2)
+        self.assertEqual(results["counting"]["calls"], 6)
+        self.assertEqual(engine.calls, 7)  # Includes the warm-up call
+        self.assertGreater(results["counting"]["calls_per_second"], 0)
+
+    def test_shared_engine_can_be_replaced(self):
+        engine = CountingEngine()
+        previous = ocr_engine._default_engine
+        try:
+            ocr_engine.set_engine(engine)
+            self.assertIs(ocr_engine.get_engine(), engine)
+        finally:
+            ocr_engine.set_engine(previous)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,124 @@
+import json
+import os
+import pickle
+import tempfile
+import time
+import unittest
+
+import numpy as np
+from PIL import Image
+
+from frame import Frame
+from ocr_batch import mosaic_config, ocr_rois
+from ocr_engine import OCREngine
+from ocr_pipeline import Pipeline, load_pipelines, pipeline_for, save_pipeline, tune
+from screenshot_processor import ScreenshotProcessor
+
+ROI_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "rois.json")
+
+
+class BinaryEngine(OCREngine):
+    """Reads the label only from binarized crops; large crops are slow."""
+
+    name = "binary"
+
+    def __init__(self, label):
+        self.label = label
+        self.configs = []
+
+    def image_to_string(self, image, config=""):
+        time.sleep(image.size / 1e6)
+        return self.label if set(np.unique(image)) <= {0, 255} else "~#!"
+
+    def image_to_data(self, image, config=""):
+        self.configs.append(config)
+        return {key: [] for key in ("text", "conf", "left", "top", "width", "height", "line")}
+
+
+class TestOCRPipeline(unittest.TestCase):
+    def setUp(self):
+        self.frame = np.full((100, 200), 200, dtype=np.uint8)
+        self.frame[20:40, 20:120] = 40
+        self.frame[25:35, 30:110] = 220
+
+    def test_compiled_steps_and_config(self):
+        pipeline = Pipeline(scale=2.0, threshold="otsu", invert=True, dilate=2, psm=7, whitelist="KXY:0123456789")
+        out = pipeline.apply(self.frame[10:50, 10:130])
+        self.assertEqual(out.shape, (80, 240))
+        self.assertEqual(set(np.unique(out)), {0, 255})
+        self.assertEqual(pipeline.config, "--psm 7 -c tessedit_char_whitelist=KXY:0123456789")
+        self.assertEqual(Pipeline(threshold=None).apply(self.frame).tolist(), self.frame.tolist())
+        with self.assertRaises(ValueError):
+            Pipeline(threshold="sauvola")
+
+    def test_pipelines_pickle_and_memoize(self):
+        pipeline = Pipeline(scale=1.5, threshold="adaptive")
+        clone = pickle.loads(pickle.dumps(pipeline))
+        self.assertEqual(clone.to_dict(), pipeline.to_dict())
+        frame = Frame(self.frame)
+        roi = (10, 10, 130, 50)
+        self.assertIs(frame.preprocess(roi, pipeline), frame.preprocess(roi, clone))
+        self.assertIsNone(frame.preprocess((300, 0, 400, 10), pipeline))
+
+    def test_rois_json_declarations_override_defaults(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "rois.json")
+            with open(path, "w") as f:
+                json.dump({"ocr_regions": [], "pipelines": {"node_types": {"threshold": "none", "psm": 11}}}, f)
+            pipelines = load_pipelines(path)
+            self.assertEqual(pipelines["node_types"].config, "--psm 11")
+            self.assertEqual(pipelines["ocr_regions"].psm, 7)
+            self.assertIs(pipeline_for(pipelines, "castle_name"), pipelines["default"])
+
+            save_pipeline(path, "occupier", Pipeline(scale=3.0, psm=8))
+            self.assertEqual(load_pipelines(path)["occupier"].scale, 3.0)
+            with open(path) as f:
+                self.assertEqual(json.load(f)["ocr_regions"], [])
+        self.assertIn("ocr_regions", load_pipelines(ROI_FILE))
+
+    def test_ocr_rois_batches_per_config(self):
+        engine = BinaryEngine("")
+        coords = Pipeline(scale=2.0, psm=7, whitelist="KXY:0123456789")
+        text = Pipeline(psm=6)
+        rois = {"a": (10, 10, 130, 50), "b": (0, 50, 100, 90), "c": (100, 50, 200, 90)}
+        ocr_rois(self.frame, rois, engine=engine, pipelines={"a": coords, "b": coords, "c": text})
+        self.assertEqual(sorted(engine.configs), ["--psm 6", "--psm 6 -c tessedit_char_whitelist=KXY:0123456789"])
+        self.assertEqual(mosaic_config("--psm 7", 1), "--psm 7")
+
+    def test_extract_text_from_roi_preprocesses_only_when_asked(self):
+        class RecordingEngine(OCREngine):
+            def __init__(self):
+                self.calls = []
+
+            def image_to_string(self, image, config=""):
+                self.calls.append((image.shape, config))
+                return "K:1 X:2 Y:3"
+
+            def image_to_data(self, image, config=""):
+                raise NotImplementedError
+
+        with tempfile.TemporaryDirectory() as tmp:
+            template = os.path.join(tmp, "close_button.png")
+            Image.fromarray(np.zeros((8, 8), dtype=np.uint8)).save(template)
+            engine = RecordingEngine()
+            processor = ScreenshotProcessor(template_path=template, engine=engine,
+                                            roi_file=os.path.join(tmp, "rois.json"))
+        roi = (10, 10, 130, 50)
+        processor.extract_text_from_roi(self.frame, roi)
+        processor.extract_text_from_roi(self.frame, roi, roi_type="tile_coordinates")
+        raw, coords = engine.calls
+        self.assertEqual(raw, ((40, 120), ""))  # Raw crop, engine defaults: the pre-pipeline behaviour
+        self.assertEqual(coords, ((80, 240), "--psm 7 -c tessedit_char_whitelist=KXY:0123456789"))
+
+    def test_tune_picks_the_fastest_accurate_pipeline(self):
+        samples = [(self.frame, (10, 10, 130, 50), "K:1 X:2 Y:3")] * 3
+        candidates = [Pipeline(threshold="none", name="raw"), Pipeline(scale=4.0, name="big"),
+                      Pipeline(scale=1.0, name="otsu")]
+        best, reports = tune(samples, candidates, engine=BinaryEngine("K:1X:2 Y:3"), min_accuracy=1.0)
+        self.assertEqual(best.name, "otsu")
+        self.assertEqual({r["name"]: r["accuracy"] for r in reports}, {"raw": 0.0, "big": 1.0, "otsu": 1.0})
+        self.assertIsNone(tune(samples, candidates[:1], engine=BinaryEngine("x"))[0])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,78 @@
+import queue
+import time
+import unittest
+
+import numpy as np
+
+from ocr_engine import OCREngine
+from ocr_service import OCRService, physical_cores, then
+
+
+class ShapeEngine(OCREngine):
+    """Reports the size of what it was given; sleeps to simulate Tesseract."""
+
+    name = "shape"
+    delay = 0.0
+
+    def image_to_string(self, image, config=""):
+        time.sleep(self.delay)
+        return f"{image.shape[1]}x{image.shape[0]}"
+
+    def image_to_data(self, image, config=""):
+        time.sleep(self.delay)
+        height = image.shape[0]
+        rows = range(20, height, 30)
+        return {"text": ["word"] * len(rows), "conf": [90.0] * len(rows), "left": [25] * len(rows),
+                "top": list(rows), "width": [10] * len(rows), "height": [8] * len(rows), "line": list(range(len(rows)))}
+
+
+class SlowEngine(ShapeEngine):
+    delay = 0.5
+
+
+class TestOCRService(unittest.TestCase):
+    def test_physical_cores(self):
+        self.assertGreaterEqual(physical_cores(), 1)
+
+    def test_text_and_rois(self):
+        frame = np.zeros((100, 120), dtype=np.uint8)
+        frame[0:10, 0:50] = 200
+        with OCRService(workers=1, engine_factory=ShapeEngine, bank_path=None) as service:
+            text = service.submit_text(frame)
+            rois = service.submit_rois(frame, {"center": (0, 0, 50, 10), "outside": (500, 500, 600, 600)})
+            self.assertEqual(then(text, str.upper).result(timeout=10), "120X100")
+            texts = rois.result(timeout=10)
+        self.assertEqual(texts["center"]["text"], "word")
+        self.assertEqual(texts["outside"]["conf"], -1.0)
+        self.assertEqual(service.stats["completed"], 2)
+
+    def test_full_queue_applies_backpressure(self):
+        frame = np.zeros((10, 10), dtype=np.uint8)
+        with OCRService(workers=1, max_pending=1, engine_factory=SlowEngine, bank_path=None) as service:
+            first = service.submit_text(frame)
+            with self.assertRaises(queue.Full):
+                service.submit_text(frame, timeout=0.05)
+            second = service.submit_text(frame)  # Blocks until the first job is done
+            self.assertTrue(first.done())
+            self.assertEqual(second.result(timeout=10), "10x10")
+            service.drain()
+        self.assertEqual(service.stats["blocked"], 1)
+        self.assertEqual(service.pending(), 0)
+
+    def test_drain_waits_for_chained_callbacks(self):
+        frame = np.zeros((10, 10), dtype=np.uint8)
+        recorded = []
+
+        def record(text):
+            time.sleep(0.3)
+            recorded.append(text)
+
+        with OCRService(workers=1, engine_factory=ShapeEngine, bank_path=None) as service:
+            chained = [service.then(service.submit_text(frame), record) for _ in range(2)]
+            self.assertTrue(service.drain(timeout=10))
+            self.assertEqual(recorded, ["10x10", "10x10"])
+            self.assertTrue(all(future.done() for future in chained))
+
+
+if __name__ == "__main__":
+    unittest.main()
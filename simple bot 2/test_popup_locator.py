@@ -0,0 +1,74 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import MagicMock
+
+import cv2
+import numpy as np
+
+from nodemapper import NodeMapper
+from popup_locator import PopupLocator
+
+
+def map_frame():
+    """A 1600x900 map-like frame: a gradient with scattered blobs."""
+    rng = np.random.default_rng(0)
+    gray = np.tile(np.linspace(60, 160, 1600).astype(np.uint8), (900, 1))
+    frame = cv2.cvtColor(gray, cv2.COLOR_GRAY2BGR)
+    for _ in range(40):
+        center = (int(rng.integers(0, 1600)), int(rng.integers(0, 900)))
+        color = tuple(int(c) for c in rng.integers(0, 255, 3))
+        cv2.circle(frame, center, int(rng.integers(5, 30)), color, -1)
+    return frame
+
+
+def add_panel(frame, box, title="Rich Vein Lv. 2"):
+    x1, y1, x2, y2 = box
+    cv2.rectangle(frame, (x1, y1), (x2, y2), (40, 40, 40), -1)
+    cv2.rectangle(frame, (x1, y1), (x2, y2), (200, 180, 120), 4)
+    cv2.putText(frame, title, (x1 + 40, y1 + 80), cv2.FONT_HERSHEY_SIMPLEX, 1.2, (255, 255, 255), 2)
+    return frame
+
+
+class TestPopupLocator(unittest.TestCase):
+    def test_finds_the_panel(self):
+        frame = add_panel(map_frame(), (500, 150, 1100, 700))
+        locator = PopupLocator(template=None)
+        x1, y1, x2, y2 = locator.locate(frame)
+        for found, expected in zip((x1, y1, x2, y2), (500, 150, 1100, 700)):
+            self.assertLessEqual(abs(found - expected), 8)
+        self.assertEqual(locator.crop(frame).shape, (y2 - y1, x2 - x1))
+
+    def test_close_button_anchor_picks_its_panel(self):
+        frame = add_panel(map_frame(), (100, 300, 900, 850))      # Larger, but not anchored
+        frame = add_panel(frame, (700, 140, 1090, 560), "K:263")  # Close button at its corner
+        button = np.full((30, 30, 3), 230, dtype=np.uint8)
+        cv2.line(button, (5, 5), (24, 24), (0, 0, 200), 3)
+        cv2.line(button, (24, 5), (5, 24), (0, 0, 200), 3)
+        frame[145:175, 1060:1090] = button
+        locator = PopupLocator(template=button)
+        self.assertLessEqual(abs(locator.locate(frame)[2] - 1090), 8)
+        self.assertEqual(locator.stats["anchored"], 1)
+        self.assertGreater(PopupLocator(template=None).locate(frame)[3], 800)
+
+    def test_falls_back_without_a_panel(self):
+        locator = PopupLocator(template=None)
+        self.assertIsNone(locator.crop(map_frame()))
+        self.assertEqual(locator.stats["fallback"], 1)
+
+    def test_node_mapper_reads_only_the_panel(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            adb, ocr = MagicMock(), MagicMock()
+            ocr.extract_text.return_value = "Rich Vein Lv. 2 Transfer Occupy"
+            mapper = NodeMapper(db_path=os.path.join(tmp, "grid.db"), adb=adb, ocr=ocr)
+            mapper.screenshot_dir = tmp
+            adb.capture_screenshot.side_effect = lambda device, path: cv2.imwrite(
+                path, add_panel(map_frame(), (500, 150, 1100, 700)))
+            self.assertEqual(mapper.process_node(10, 20)[0], "Rss Tile")
+        crop = ocr.extract_text.call_args[0][0]
+        self.assertIsInstance(crop, np.ndarray)
+        self.assertLess(crop.size, 1600 * 900 / 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,59 @@
+import unittest
+
+from roi_fallback import FallbackChain
+
+
+def parse(text):
+    return text if text.startswith("K:") else None
+
+
+class TestFallbackChain(unittest.TestCase):
+    def setUp(self):
+        self.names = ["popup:0", "popup:1", "popup:2", "popup:3"]
+        self.reads = []
+
+    def reader(self, texts):
+        def read(names):
+            self.reads.append(list(names))
+            return {name: texts.get(name, {"text": "", "conf": 0.0}) for name in names}
+        return read
+
+    def test_learned_order_exits_early(self):
+        chain = FallbackChain("popup", log_every=0)
+        read = self.reader({"popup:2": {"text": "K:1 X:2 Y:3", "conf": 91.0}})
+        self.assertEqual(chain.run(self.names, read, parse), ("popup:2", "K:1 X:2 Y:3"))
+        self.assertEqual(self.reads, [["popup:0"], ["popup:1", "popup:2", "popup:3"]])
+
+        self.reads.clear()
+        self.assertEqual(chain.run(self.names, read, parse)[0], "popup:2")
+        self.assertEqual(self.reads, [["popup:2"]])
+        self.assertEqual(chain.order(self.names), ["popup:2", "popup:0", "popup:1", "popup:3"])
+        self.assertEqual((chain.stats["early_exits"], chain.stats["rois_read"]), (1, 5))
+
+        savings = chain.savings()
+        self.assertEqual(savings["expected_reads"], 1.0)
+        self.assertEqual(savings["fixed_order_reads"], 3.0)
+        self.assertAlmostEqual(savings["actual_saving"], 3 / 8)
+
+    def test_low_confidence_parse_is_a_near_miss(self):
+        chain = FallbackChain("popup", min_confidence=80, log_every=0)
+        read = self.reader({"popup:0": {"text": "K:9 X:9 Y:9", "conf": 40.0},
+                            "popup:3": {"text": "K:1 X:2 Y:3", "conf": 85.0}})
+        self.assertEqual(chain.run(self.names, read, parse), ("popup:3", "K:1 X:2 Y:3"))
+
+        read = self.reader({"popup:1": {"text": "K:9 X:9 Y:9", "conf": 40.0}})
+        self.assertEqual(chain.run(self.names, read, parse), ("popup:1", "K:9 X:9 Y:9"))
+        self.assertEqual(chain.stats["near_misses"], 1)
+
+        self.assertEqual(chain.run(self.names, self.reader({}), parse), (None, None))
+        self.assertEqual(chain.stats["failures"], 1)
+
+    def test_contexts_learn_separately(self):
+        chain = FallbackChain("popup", log_every=0)
+        chain.record("popup:3", context="north")
+        self.assertEqual(chain.order(self.names, context="north")[0], "popup:3")
+        self.assertEqual(chain.order(self.names)[0], "popup:0")
+
+
+if __name__ == "__main__":
+    unittest.main()
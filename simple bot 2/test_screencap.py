@@ -0,0 +1,79 @@
+import gzip
+import struct
+import unittest
+
+import cv2
+import numpy as np
+
+from screencap import (benchmark_capture_modes, choose_capture_mode, decode_capture, decode_png,
+                       decode_raw, load_grayscale)
+
+
+def make_raw(rgba, colorspace=True):
+    """Build `screencap` (no -p) output for an RGBA frame."""
+    height, width = rgba.shape[:2]
+    header = struct.pack("<III", width, height, 1)
+    if colorspace:
+        header += struct.pack("<I", 0)
+    return header + rgba.tobytes()
+
+
+class TestScreencap(unittest.TestCase):
+    def setUp(self):
+        self.frame = np.zeros((90, 160, 3), dtype=np.uint8)
+        self.frame[10:20, 30:40] = (255, 0, 0)
+
+    def test_decode_png_round_trip(self):
+        ok, png = cv2.imencode(".png", self.frame)
+        self.assertTrue(ok)
+        decoded = decode_png(png.tobytes())
+        np.testing.assert_array_equal(decoded, self.frame)
+
+    def test_decode_png_rejects_garbage(self):
+        with self.assertRaises(ValueError):
+            decode_png(b"not a png")
+
+    def test_load_grayscale_accepts_frames(self):
+        gray = load_grayscale(self.frame)
+        self.assertEqual(gray.shape, (90, 160))
+        self.assertIs(load_grayscale(gray), gray)
+
+    def test_decode_raw_is_zero_copy(self):
+        rgba = cv2.cvtColor(self.frame, cv2.COLOR_BGR2RGBA)
+        for colorspace in (True, False):
+            with self.subTest(colorspace=colorspace):
+                data = make_raw(rgba, colorspace)
+                frame = decode_raw(data)
+                np.testing.assert_array_equal(frame, rgba)
+                roi = frame[10:20, 30:40]
+                self.assertTrue(np.shares_memory(roi, np.frombuffer(data, dtype=np.uint8)))
+                self.assertEqual(load_grayscale(roi).shape, (10, 10))
+
+    def test_decode_raw_rejects_truncated_data(self):
+        rgba = cv2.cvtColor(self.frame, cv2.COLOR_BGR2RGBA)
+        with self.assertRaises(ValueError):
+            decode_raw(make_raw(rgba)[:-10])
+
+    def test_decode_gzip_capture(self):
+        rgba = cv2.cvtColor(self.frame, cv2.COLOR_BGR2RGBA)
+        frame = decode_capture("gzip", gzip.compress(make_raw(rgba)))
+        np.testing.assert_array_equal(frame, rgba)
+
+    def test_benchmark_picks_fastest_working_mode(self):
+        rgba = cv2.cvtColor(self.frame, cv2.COLOR_BGR2RGBA)
+        payloads = {"raw": make_raw(rgba), "png": cv2.imencode(".png", self.frame)[1].tobytes()}
+
+        def capture(mode):
+            if mode not in payloads:
+                raise RuntimeError("gzip not available on this device")
+            return payloads[mode]
+
+        results = benchmark_capture_modes(capture, samples=2)
+        self.assertEqual(set(results), {"png", "raw"})
+        self.assertEqual(results["raw"]["bytes"], len(payloads["raw"]))
+        self.assertIn(choose_capture_mode(results), results)
+        self.assertEqual(choose_capture_mode({}), "png")
+
+
+if __name__ == "__main__":
+    unittest.main()
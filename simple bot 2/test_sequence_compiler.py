@@ -0,0 +1,84 @@
+import json
+import os
+import unittest
+
+import cv2
+import numpy as np
+
+from adb_client import AdbServerClient
+from adb_module import ADBModule
+from fake_adb_server import FakeAdbServer
+from navigation_tool import NavigationTool
+from sequence_compiler import compile_sequence, tap_keypad_sequence
+
+SAMPLE_SEQUENCE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "sequences", "sample_sequence.json")
+
+
+class TestSequenceCompiler(unittest.TestCase):
+    def test_compile_sample_sequence(self):
+        with open(SAMPLE_SEQUENCE, "r") as f:
+            sequence = json.load(f)
+        self.assertEqual(
+            compile_sequence(sequence),
+            "input tap 100 200 >/dev/null 2>&1; input swipe 50 50 200 200 300 >/dev/null 2>&1",
+        )
+
+    def test_tap_wait_capture_escape(self):
+        script = compile_sequence([
+            {"action": "tap", "x": 843, "y": 118},
+            {"action": "wait", "seconds": 0.2},
+            {"action": "keyevent", "keycode": 111},
+            {"action": "capture"},
+        ])
+        self.assertEqual(script, "input tap 843 118 >/dev/null 2>&1; sleep 0.2; input keyevent 111 >/dev/null 2>&1; screencap -p")
+
+    def test_keypad_entry_waits_for_the_dialog_and_each_key(self):
+        script = compile_sequence(tap_keypad_sequence((821, 335), 12, NavigationTool.KEYPAD_POSITIONS))
+        self.assertEqual(script, "input tap 821 335 >/dev/null 2>&1; sleep 0.3; "
+                                 "input tap 1065 379 >/dev/null 2>&1; sleep 0.05; "
+                                 "input tap 1195 367 >/dev/null 2>&1; sleep 0.05; "
+                                 "input tap 1275 630 >/dev/null 2>&1")
+
+    def test_invalid_sequences(self):
+        with self.assertRaises(ValueError):
+            compile_sequence([{"action": "teleport"}])
+        with self.assertRaises(ValueError):
+            compile_sequence([{"action": "tap", "x": 1}])
+        with self.assertRaises(ValueError):
+            compile_sequence([{"action": "capture"}, {"action": "capture"}])
+        with self.assertRaises(ValueError):
+            tap_keypad_sequence((0, 0), "12a", NavigationTool.KEYPAD_POSITIONS)
+
+
+class TestRunSequence(unittest.TestCase):
+    def setUp(self):
+        self.frame = np.full((90, 160, 3), 127, dtype=np.uint8)
+        self.server = FakeAdbServer().start()
+        self.adb = ADBModule(client=AdbServerClient(port=self.server.port, timeout=5))
+
+    def tearDown(self):
+        self.adb.close()
+        self.server.stop()
+
+    def test_sequence_returns_final_frame_in_one_round_trip(self):
+        sequence = [{"action": "tap", "x": 10, "y": 20}, {"action": "wait", "seconds": 0.1}, {"action": "capture"}]
+        script = compile_sequence(sequence)
+        self.server.outputs[script] = cv2.imencode(".png", self.frame)[1].tobytes()
+
+        frame = self.adb.run_sequence(sequence)
+
+        np.testing.assert_array_equal(frame, self.frame)
+        self.assertEqual(self.server.commands, [("emulator-5554", script)])
+
+    def test_navigation_runs_as_one_script(self):
+        nav = NavigationTool(adb=self.adb)
+        nav.navigate_to_coordinates(263, 494, 1004, last_kingdom=263)
+        self.assertEqual(len(self.server.commands), 1)
+        script = self.server.commands[0][1]
+        self.assertTrue(script.startswith("input tap 843 118"))
+        self.assertTrue(script.endswith("input tap 765 467 >/dev/null 2>&1"))
+        self.assertNotIn("input tap 685 335", script)  # kingdom unchanged, not re-entered
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,86 @@
+import json
+import os
+import tempfile
+import unittest
+from unittest.mock import MagicMock
+
+import cv2
+import numpy as np
+
+from template_bank import TemplateBank
+from template_matching import TemplateMatchingModule
+
+
+def write_templates(folder, metadata):
+    rng = np.random.default_rng(1)
+    with open(os.path.join(folder, "metadata.json"), "w") as f:
+        json.dump(metadata, f)
+    for category, levels in metadata.items():
+        for level in levels:
+            cv2.imwrite(os.path.join(folder, f"{category}_{level}.png"),
+                        rng.integers(0, 255, (24, 32), dtype=np.uint8))
+
+
+class TestTemplateBank(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.tmp = self._tmp.name
+        write_templates(self.tmp, {"Food": {"1": {"label": "Food"}, "2": {"label": "Food"}},
+                                   "Castles": {"5": {"label": "Castle"}, "6": {"label": "gone"}}})
+        os.remove(os.path.join(self.tmp, "Castles_6.png"))
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def test_decodes_once_and_reloads_changed_files(self):
+        bank = TemplateBank(self.tmp, check_interval=0)
+        for _ in range(3):
+            templates = bank.templates()
+        self.assertEqual({c: sorted(levels) for c, levels in templates.items()}, {"Castles": ["5"], "Food": ["1", "2"]})
+        self.assertEqual(bank.stats["decoded"], 3)
+
+        path = bank.path_for("Food", "2")
+        cv2.imwrite(path, np.zeros((10, 10), dtype=np.uint8))
+        os.utime(path, ns=(0, 10 ** 18))
+        self.assertEqual(bank.get("Food", 2).shape, (10, 10))
+        self.assertEqual((bank.stats["decoded"], bank.stats["reloads"]), (4, 1))
+
+    def test_bundle_cold_start(self):
+        bank = TemplateBank(self.tmp)
+        bank.save_bundle()
+        warm = TemplateBank(self.tmp)
+        self.assertEqual((warm.stats["from_bundle"], warm.stats["decoded"]), (3, 0))
+        np.testing.assert_array_equal(warm.get("Food", "1"), bank.get("Food", "1"))
+
+    def test_bundle_entries_are_checked_by_content(self):
+        path = os.path.join(self.tmp, "Food_1.png")
+        uncompressed = [cv2.IMWRITE_PNG_COMPRESSION, 0]  # Same size for any pixels of the same shape
+        cv2.imwrite(path, np.zeros((24, 32), dtype=np.uint8), uncompressed)
+        TemplateBank(self.tmp).save_bundle()
+        before = os.stat(path)
+        cv2.imwrite(path, np.full((24, 32), 255, dtype=np.uint8), uncompressed)
+        os.utime(path, ns=(before.st_atime_ns, before.st_mtime_ns))  # e.g. cp -p, a restored backup
+        self.assertEqual(os.path.getsize(path), before.st_size)
+
+        warm = TemplateBank(self.tmp)
+        self.assertEqual((warm.stats["from_bundle"], warm.stats["decoded"]), (2, 1))
+        self.assertEqual(int(warm.get("Food", "1").min()), 255)
+
+    def test_matching_module_does_not_write_metadata(self):
+        metadata = os.path.join(self.tmp, "metadata.json")
+        before = open(metadata).read(), os.stat(metadata).st_mtime_ns
+        module = TemplateMatchingModule(templates_dir=self.tmp, output_dir=self.tmp, adb=MagicMock())
+        self.assertEqual((open(metadata).read(), os.stat(metadata).st_mtime_ns), before)
+        self.assertNotIn("6", module.validate_metadata()["Castles"])
+
+        screenshot = np.full((200, 300), 128, dtype=np.uint8)
+        screenshot[50:74, 100:132] = module.bank.get("Food", "1")
+        path = os.path.join(self.tmp, "shot.png")
+        cv2.imwrite(path, screenshot)
+        matches = module.match_templates(path)
+        self.assertEqual([(m["template"], tuple(map(int, m["position"]))) for m in matches], [("Food_1", (100, 50))])
+        self.assertEqual(module.bank.stats["decoded"], 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,88 @@
+import json
+import os
+import tempfile
+import unittest
+
+import cv2
+import numpy as np
+
+from template_matching import TemplateMatchingModule
+from template_regions import TemplateRegions
+from test_template_search import icon
+
+
+class TestTemplateRegions(unittest.TestCase):
+    def test_declared_and_learned_regions(self):
+        regions = TemplateRegions(margin=10, min_history=3)
+        window = regions.region_for("UI Button", "N/A", {"roi": [100, 50, 40, 20]}, (20, 40), (900, 1600))
+        self.assertEqual(window, (90, 40, 150, 80))
+        self.assertIsNone(regions.region_for("Castles", "1", {"roi": [100, 50, 40, 20]}, (48, 48), (900, 1600)))
+
+        for x, y in ((300, 200), (305, 198), (302, 204)):
+            regions.record("UI Button", "Back", x, y)
+            regions.record("Food", "1", x, y)  # Map objects never get a learned region
+        self.assertEqual(regions.region_for("UI Button", "Back", {}, (48, 48), (900, 1600)), (290, 188, 363, 262))
+        self.assertIsNone(regions.region_for("Food", "1", {}, (48, 48), (900, 1600)))
+        self.assertNotIn("Food_1", regions.history)
+        for x, y in ((10, 10), (1500, 800)):  # Spread over the screen: no learned region
+            regions.record("UI Button", "Help", x, y)
+        regions.record("UI Button", "Help", 700, 400)
+        self.assertIsNone(regions.region_for("UI Button", "Help", {}, (48, 48), (900, 1600)))
+
+        opted_in = TemplateRegions(margin=10, min_history=3, learn_categories=("UI Button", "Food"))
+        for x, y in ((300, 200), (305, 198), (302, 204)):
+            opted_in.record("Food", "1", x, y)
+        self.assertEqual(opted_in.region_for("Food", "1", {}, (48, 48), (900, 1600)), (290, 188, 363, 262))
+
+    def test_matching_is_windowed_until_a_sweep(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            with open(os.path.join(tmp, "metadata.json"), "w") as f:
+                json.dump({"UI Button": {"Close": {"roi": [100, 40, 48, 48], "label": "Close"}}}, f)
+            cv2.imwrite(os.path.join(tmp, "UI Button_Close.png"), icon(3))
+            regions = TemplateRegions(full_sweep_every=3, max_area=0.9)
+            matcher = TemplateMatchingModule(templates_dir=tmp, output_dir=tmp, adb=object(), regions=regions)
+
+            frame = np.full((400, 600), 90, dtype=np.uint8)
+            frame[40:88, 100:148] = icon(3)
+            self.assertEqual([m["position"] for m in matcher.match_templates(frame)], [(100, 40)])
+            self.assertEqual(regions.stats["windowed"], 1)
+
+            moved = np.full((400, 600), 90, dtype=np.uint8)
+            moved[300:348, 400:448] = icon(3)
+            self.assertEqual(matcher.match_templates(moved), [])  # Outside the window
+            self.assertEqual([m["position"] for m in matcher.match_templates(moved)], [(400, 300)])  # Sweep
+            self.assertEqual(regions.stats["drift"], 1)
+            # The declared window now covers the drift position too
+            self.assertEqual([m["position"] for m in matcher.match_templates(moved)], [(400, 300)])
+            self.assertEqual([m["position"] for m in matcher.match_templates(frame)], [(100, 40)])
+            self.assertEqual((regions.stats["windowed"], regions.stats["full"]), (4, 0))  # The sweep is not windowed
+
+    def test_far_drift_falls_back_to_the_full_frame(self):
+        regions = TemplateRegions(margin=10, max_area=0.1)
+        details = {"roi": [100, 50, 40, 20]}
+        window = regions.region_for("UI Button", "Close", details, (20, 40), (900, 1600))
+        regions.record("UI Button", "Close", 1400, 800, window)
+        self.assertIsNone(regions.region_for("UI Button", "Close", details, (20, 40), (900, 1600)))
+
+    def test_drift_survives_a_restart(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "search_regions.json")
+            details = {"roi": [100, 50, 40, 20]}
+            regions = TemplateRegions(path, margin=10)
+            window = regions.region_for("UI Button", "Close", details, (20, 40), (900, 1600))
+            regions.record("UI Button", "Close", 300, 60, window)
+            regions.save()
+
+            reloaded = TemplateRegions(path, margin=10)
+            self.assertEqual(reloaded.history, regions.history)
+            self.assertEqual(reloaded.drift, regions.drift)
+            self.assertEqual(reloaded.region_for("UI Button", "Close", details, (20, 40), (900, 1600)),
+                             (90, 40, 350, 90))
+
+            with open(path, "w") as f:  # Files written before drift was saved
+                json.dump({"UI Button_Close": [[300, 60]]}, f)
+            self.assertEqual(list(TemplateRegions(path).history["UI Button_Close"]), [(300, 60)])
+
+
+if __name__ == "__main__":
+    unittest.main()
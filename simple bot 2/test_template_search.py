@@ -0,0 +1,100 @@
+import json
+import os
+import tempfile
+import unittest
+
+import cv2
+import numpy as np
+
+from template_bank import TemplateBank
+from template_benchmark import run_benchmark, synthetic_screenshots
+from template_matching import TemplateMatchingModule
+from template_search import MATCH_DTYPE, ExhaustiveSearch, PyramidSearch, find_peaks, nms_by_category
+
+
+def icon(seed, size=48):
+    """A blocky, icon-like template (survives downscaling, unlike noise)."""
+    rng = np.random.default_rng(seed)
+    template = np.full((size, size), 40, dtype=np.uint8)
+    for _ in range(6):
+        p1, p2 = (tuple(int(v) for v in rng.integers(0, size, 2)) for _ in range(2))
+        cv2.rectangle(template, p1, p2, int(rng.integers(80, 255)), -1)
+    cv2.putText(template, str(seed), (8, size - 8), cv2.FONT_HERSHEY_SIMPLEX, 1.0, 255, 2)
+    return template
+
+
+class TestTemplateSearch(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.tmp = self._tmp.name
+        metadata = {"Castles": {str(level): {"label": "Castle"} for level in range(1, 5)}}
+        with open(os.path.join(self.tmp, "metadata.json"), "w") as f:
+            json.dump(metadata, f)
+        for level in range(1, 5):
+            cv2.imwrite(os.path.join(self.tmp, f"Castles_{level}.png"), icon(level))
+        self.matcher = TemplateMatchingModule(templates_dir=self.tmp, output_dir=self.tmp, adb=object())
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def test_pyramid_finds_what_exhaustive_finds(self):
+        (_, frame, truths), = synthetic_screenshots(self.matcher.load_templates(), count=1, per_frame=4)
+        exhaustive = self.matcher.match_templates(frame)
+        pyramid = self.matcher.match_templates(frame, search=PyramidSearch(scale=0.25))
+        key = lambda matches: sorted((m["template"], tuple(map(int, m["position"]))) for m in matches)
+        self.assertEqual(key(pyramid), key(exhaustive))
+        self.assertEqual(key(exhaustive), sorted((name, (x, y)) for name, x, y in truths))
+        self.assertTrue(all(m["score"] > 0.99 for m in exhaustive))
+
+    def test_small_templates_fall_back_to_exhaustive(self):
+        search = PyramidSearch(scale=0.25, min_template_side=16)
+        frame = np.full((200, 300), 90, dtype=np.uint8)
+        frame[40:88, 120:168] = icon(1)
+        points = search.search(search.prepare(frame), icon(1), 0.9)
+        self.assertEqual(points[["x", "y"]].tolist(), [(120, 40)])
+        self.assertEqual(search.stats["exhaustive_fallback"], 1)
+        np.testing.assert_array_equal(points, ExhaustiveSearch().search(frame, icon(1), 0.9))
+
+    def test_peaks_and_per_category_nms(self):
+        result = np.zeros((50, 50), dtype=np.float32)
+        result[10, 10], result[10, 11], result[30, 40] = 0.95, 0.9, 0.85
+        self.assertEqual(find_peaks(result, 0.8)[["x", "y"]].tolist(), [(10, 10), (40, 30)])
+
+        matches = np.zeros(3, dtype=MATCH_DTYPE)
+        matches[["x", "y", "w", "h", "score", "category"]] = [(0, 0, 20, 20, 0.8, 0), (2, 2, 20, 20, 0.9, 0),
+                                                              (1, 1, 20, 20, 0.7, 1)]
+        self.assertEqual(sorted(nms_by_category(matches).tolist()), [1, 2])  # Best of category 0; category 1 kept
+
+    def test_parallel_batch_matches_serial(self):
+        shots = [frame for _, frame, _ in synthetic_screenshots(self.matcher.load_templates(), count=3, per_frame=3)]
+        serial = [self.matcher.match_templates(frame) for frame in shots]
+        parallel = TemplateMatchingModule(templates_dir=self.tmp, output_dir=self.tmp, adb=object(), regions=False,
+                                          workers=4)
+        search = PyramidSearch(scale=0.25)
+        try:
+            batch = parallel.match_batch(shots + [os.path.join(self.tmp, "missing.png")], search=search)
+            streamed = parallel.match_batch(iter(shots), search=PyramidSearch(scale=0.25), chunk_size=2)
+        finally:
+            parallel.close()
+        key = lambda matches: sorted((m["template"], m["position"]) for m in matches)
+        self.assertEqual([key(m) for m in batch], [key(m) for m in serial] + [[]])
+        self.assertEqual([key(m) for m in streamed], [key(m) for m in serial])
+        self.assertTrue(all(serial))
+        self.assertEqual(search.stats["coarse"], 3 * 4)  # Per-job counters merged on the calling thread
+
+    def test_bank_caches_scaled_templates(self):
+        bank = TemplateBank(self.tmp)
+        self.assertIs(bank.scaled("Castles", 1, 0.25), bank.scaled("Castles", "1", 0.25))
+        self.assertEqual(bank.scaled("Castles", 1, 0.25).shape, (12, 12))
+
+    def test_benchmark_reports_speedup_and_recall(self):
+        shots = synthetic_screenshots(self.matcher.load_templates(), count=1, per_frame=3, size=(300, 500))
+        report = run_benchmark(self.matcher, shots, [ExhaustiveSearch(), PyramidSearch(scale=0.5)])
+        self.assertEqual([row["search"] for row in report["results"]], ["exhaustive", "pyramid@0.5/m0.15/c20"])
+        self.assertEqual([row["recall"] for row in report["results"]], [1.0, 1.0])
+        self.assertEqual(report["results"][1]["params"]["scale"], 0.5)
+        self.assertEqual(report["meta"]["templates"], 4)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,44 @@
+import unittest
+
+import cv2
+import numpy as np
+
+from ocr_module import OCRModule
+from test_ocr_batch import BlobEngine
+from test_popup_locator import add_panel, map_frame
+from text_proposals import propose_text_boxes, read_text_regions
+
+
+def text_frame():
+    """Map frame with a pop-up panel holding a title and two more text lines."""
+    frame = add_panel(map_frame(), (500, 150, 1100, 700))
+    cv2.putText(frame, "K:263 X:494 Y:1004", (560, 330), cv2.FONT_HERSHEY_SIMPLEX, 1.0, (255, 255, 255), 2)
+    cv2.putText(frame, "Transfer   Occupy", (560, 420), cv2.FONT_HERSHEY_SIMPLEX, 1.0, (255, 255, 255), 2)
+    return frame
+
+
+class TestTextProposals(unittest.TestCase):
+    def test_boxes_cover_text_lines_in_reading_order(self):
+        gray = cv2.cvtColor(text_frame(), cv2.COLOR_BGR2GRAY)
+        boxes = [b for b in propose_text_boxes(gray) if 500 < b[0] < 1100 and 150 < b[1] < 700]
+        self.assertEqual(len(boxes), 3)  # Title, coordinates, buttons: one box per line
+        self.assertEqual([b[1] < 330 < b[3] for b in boxes], [False, True, False])
+        self.assertTrue(all(b[3] <= nxt[1] for b, nxt in zip(boxes, boxes[1:])))
+        self.assertLess(sum((b[2] - b[0]) * (b[3] - b[1]) for b in boxes), 0.05 * gray.size)
+
+    def test_blank_image_skips_ocr(self):
+        engine = BlobEngine()
+        self.assertEqual(propose_text_boxes(np.full((900, 1600), 90, dtype=np.uint8)), [])
+        self.assertEqual(read_text_regions(np.full((900, 1600, 3), 90, dtype=np.uint8), engine=engine), "")
+        self.assertEqual(engine.calls, 0)
+
+    def test_boxes_are_read_in_one_pass(self):
+        engine = BlobEngine()
+        self.assertFalse(OCRModule(engine=engine).propose_regions)  # Whole-image OCR unless opted in
+        text = OCRModule(engine=engine, propose_regions=True).extract_text(text_frame())
+        self.assertEqual(engine.calls, 1)
+        self.assertGreaterEqual(len(text.splitlines()), 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,106 @@
+import tempfile
+import unittest
+
+import numpy as np
+
+from fake_device import FrameCorpus, RecordedDevice
+from navigation_tool import NavigationTool
+from ui_wait import center_changed, close_button_visible, frame_changed, frame_stable, popup_settled, wait_until
+
+
+def close_button():
+    template = np.zeros((20, 20), dtype=np.uint8)
+    template[4:16, 4:16] = 255
+    template[8:12, :] = 0
+    return template
+
+
+def frame_with_button(at=(1075, 160)):
+    frame = np.full((900, 1600, 3), 40, dtype=np.uint8)
+    x, y = at
+    frame[y - 10:y + 10, x - 10:x + 10] = close_button()[:, :, None]
+    return frame
+
+
+class TestWaitUntil(unittest.TestCase):
+    def test_returns_first_matching_frame(self):
+        frames = iter([1, 2, 3, 4])
+        self.assertEqual(wait_until(lambda: next(frames), lambda f: f == 3, timeout=1, interval=0), (True, 3))
+
+    def test_timeout_returns_last_frame(self):
+        self.assertEqual(wait_until(lambda: 7, lambda f: False, timeout=0.05, interval=0.01), (False, 7))
+
+    def test_failed_captures_are_skipped(self):
+        frames = iter([None, 5])
+        self.assertEqual(wait_until(lambda: next(frames), lambda f: True, timeout=1, interval=0), (True, 5))
+
+    def test_frame_stable_needs_two_similar_frames(self):
+        stable = frame_stable()
+        a = np.zeros((40, 40, 3), dtype=np.uint8)
+        self.assertFalse(stable(a))
+        self.assertFalse(stable(np.full_like(a, 200)))
+        self.assertTrue(stable(np.full_like(a, 201)))
+
+    def test_close_button_at_known_positions(self):
+        visible = close_button_visible(close_button())
+        self.assertTrue(visible(frame_with_button()))
+        self.assertTrue(visible(frame_with_button((1540, 60))))
+        self.assertFalse(visible(np.full((900, 1600, 3), 40, dtype=np.uint8)))
+
+    def test_center_changed(self):
+        changed = center_changed(lambda frame: frame, (263, 494, 1004))
+        self.assertFalse(changed((263, 494, 1004)))
+        self.assertFalse(changed((None, None, None)))
+        self.assertTrue(changed((263, 100, 200)))
+
+    def test_popup_settled_on_recorded_device(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            corpus = FrameCorpus(tmp)
+            corpus.add((1, 2, 3), None, np.full((900, 1600, 3), 40, dtype=np.uint8))
+            corpus.add((1, 2, 3), (800, 400), frame_with_button())
+            device = RecordedDevice(corpus, center=(1, 2, 3))
+
+            ready, _ = device.wait_until(popup_settled(close_button()), timeout=0.05)
+            self.assertFalse(ready)
+
+            device.tap_screen(800, 400)
+            captures = device.captures
+            ready, frame = device.wait_until(popup_settled(close_button()), timeout=1)
+            self.assertTrue(ready)
+            self.assertEqual(device.captures - captures, 2)
+
+
+    def test_popup_settled_without_template_needs_a_change(self):
+        with self.assertRaises(FileNotFoundError):
+            popup_settled("missing/close_button.png")
+        before = np.full((90, 160, 3), 40, dtype=np.uint8)
+        settled = popup_settled("missing/close_button.png", reference=before)
+        self.assertFalse(settled(before))
+        self.assertFalse(settled(before))  # Stable, but still the pre-tap frame
+        popup = np.full_like(before, 120)  # Pop-up panel drawn over the map
+        self.assertFalse(settled(popup))
+        self.assertTrue(settled(popup))
+        self.assertFalse(frame_changed(before)(before.copy()))
+
+
+    def test_arrival_needs_the_map_to_move(self):
+        class FrameFeed:
+            def __init__(self, frames):
+                self.frames = iter(frames)
+
+            def wait_until(self, predicate, timeout):
+                return wait_until(lambda: next(self.frames, None), predicate, timeout=timeout, interval=0)
+
+        before = np.full((90, 160), 40, dtype=np.uint8)
+        moved = np.full((90, 160), 120, dtype=np.uint8)
+        centers = {40: (1, 2, 3), 120: (1, 50, 60)}
+        read_center = lambda frame: centers[int(frame[0, 0])]
+
+        tool = NavigationTool(adb=FrameFeed([before, before, before]))
+        self.assertFalse(tool.wait_for_arrival(read_center=read_center, timeout=0.05, reference=before))
+        tool = NavigationTool(adb=FrameFeed([before, moved, moved]))
+        self.assertTrue(tool.wait_for_arrival(read_center=read_center, timeout=1, reference=before))
+
+
+if __name__ == "__main__":
+    unittest.main()
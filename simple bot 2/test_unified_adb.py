@@ -0,0 +1,116 @@
+import asyncio
+import concurrent.futures
+import os
+import tempfile
+import unittest
+
+import cv2
+import numpy as np
+
+from fake_adb_server import FakeAdbServer
+from unified_adb import ADBModule, AsyncADB, _EventLoopThread, run_on_devices
+
+
+class TestUnifiedADB(unittest.TestCase):
+    def setUp(self):
+        self.frame = np.zeros((90, 160, 3), dtype=np.uint8)
+        self.frame[40:50, 70:90] = (0, 255, 0)
+        self.server = FakeAdbServer(
+            devices={"emulator-5554": "device", "emulator-5556": "device"},
+            outputs={"screencap -p": cv2.imencode(".png", self.frame)[1].tobytes(),
+                     "wm size": b"Physical size: 1600x900\n"},
+        ).start()
+        self.adb = ADBModule(port=self.server.port)
+
+    def tearDown(self):
+        self.adb.close()
+        self.server.stop()
+
+    def commands(self, serial):
+        return [command for device, command in self.server.commands if device == serial]
+
+    def test_device_bound_style(self):
+        self.assertEqual(self.adb.device_id, "emulator-5554")
+        self.adb.tap_screen(1, 2)
+        self.adb.press_escape()
+        self.adb.swipe(1, 2, 3, 4, 500)
+        self.assertEqual(self.commands("emulator-5554"), ["input tap 1 2", "input keyevent 111", "input swipe 1 2 3 4 500"])
+
+    def test_shell_commands_share_one_session(self):
+        self.adb.tap_screen(1, 2)
+        self.adb.server.wait_for_refill("emulator-5554", timeout=5)  # Pool top-up connections are not shell traffic
+        connections = self.server.connections
+        for x in range(5):
+            self.adb.tap_screen(x, 0)
+        self.assertEqual(self.server.connections, connections)
+        self.assertEqual(self.commands("emulator-5554")[-1], "input tap 4 0")
+
+    def test_per_device_style(self):
+        self.adb.tap("emulator-5556", 5, 6)
+        self.adb.tap_screen("emulator-5556", 7, 8)
+        self.adb.swipe("emulator-5556", 1, 2, 3, 4, duration=100)
+        self.assertEqual(self.adb.get_screen_resolution("emulator-5556"), (1600, 900))
+        self.assertEqual(self.commands("emulator-5556")[:3], ["input tap 5 6", "input tap 7 8", "input swipe 1 2 3 4 100"])
+        self.assertEqual(self.commands("emulator-5554"), [])
+
+    def test_capture_styles(self):
+        np.testing.assert_array_equal(self.adb.capture_frame(), self.frame)
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "shot.png")
+            self.assertEqual(self.adb.capture_screenshot(None, path), path)
+            np.testing.assert_array_equal(cv2.imread(path), self.frame)
+            other = os.path.join(tmp, "other.png")
+            self.assertEqual(self.adb.capture_screenshot("emulator-5556", save_path=other), other)
+            self.assertTrue(os.path.exists(other))
+
+    def test_failures_raise(self):
+        with self.assertRaises(RuntimeError):
+            self.adb.capture_screenshot("emulator-9999", "missing.png")
+        self.assertFalse(os.path.exists("missing.png"))
+        with self.assertRaises(RuntimeError):
+            self.adb.tap("emulator-9999", 1, 2)
+
+    def test_abandoned_shell_command_restarts_the_session(self):
+        client = self.adb.client()
+        self.adb.tap_screen(1, 2)
+        session = client.session
+        self.adb.timeout = 0.2
+        with self.assertRaises(RuntimeError):
+            self.adb.execute_shell_command("sleep 5")
+        self.assertIsNone(client.session)
+        self.adb.timeout = 30.0
+        self.adb.tap_screen(3, 4)  # Does not wait on the abandoned command
+        self.assertIsNot(client.session, session)
+        self.assertEqual(self.commands("emulator-5554")[-1], "input tap 3 4")
+
+    def test_drives_devices_concurrently(self):
+        async def job(client):
+            await client.tap(10, 20)
+            return (await client.capture_frame()).shape
+
+        results = asyncio.run(run_on_devices(["emulator-5554", "emulator-5556"], job, port=self.server.port))
+        self.assertEqual(results, {"emulator-5554": (90, 160, 3), "emulator-5556": (90, 160, 3)})
+        self.assertIn("input tap 10 20", self.commands("emulator-5556"))
+
+    def test_timed_out_calls_are_cancelled(self):
+        cancelled = concurrent.futures.Future()
+
+        async def hang():
+            try:
+                await asyncio.sleep(60)
+            except asyncio.CancelledError:
+                cancelled.set_result(True)
+                raise
+
+        with self.assertRaises(concurrent.futures.TimeoutError):
+            _EventLoopThread.run(hang(), timeout=0.1)
+        self.assertTrue(cancelled.result(timeout=5))
+
+    def test_falls_back_to_adb_executable_without_server(self):
+        client = AsyncADB("emulator-5554", port=self.server.port, use_server=False, adb_path="false")
+        with self.assertRaises(RuntimeError):
+            asyncio.run(client.tap(1, 2))
+
+
+if __name__ == "__main__":
+    unittest.main()
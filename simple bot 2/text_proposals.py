@@ -0,0 +1,117 @@
+"""
+Cheap text-line proposals, so OCR skips the blank parts of large regions.
+
+A morphological gradient lights up glyph strokes; closing it with a wide,
+flat kernel fuses the characters of a line into one blob, and connected
+components of that mask are the candidate text boxes. Only those boxes are
+OCR'd, together in one batched pass (see ocr_batch.ocr_rois).
+
+    boxes = propose_text_boxes(gray)        # [(x1, y1, x2, y2), ...] in reading order
+    text = read_text_regions(frame)         # "" when the frame has no text-like regions
+"""
+
+import logging
+
+import cv2
+import numpy as np
+
+from frame import Frame
+from ocr_batch import BATCH_CONFIG, ocr_rois
+from ocr_engine import get_engine
+
+logger = logging.getLogger("TextProposals")
+
+_GRADIENT_KERNEL = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (3, 3))
+
+
+def propose_text_boxes(gray, min_height=6, max_height=120, min_width=8, line_gap=9, word_gap=1.0, padding=3,
+                       min_contrast=40):
+    """
+    Candidate text-line boxes of a grayscale image.
+
+    Args:
+        gray (numpy.ndarray): 2-D uint8 image.
+        min_height, max_height (int): Line heights kept, in pixels.
+        min_width (int): Narrowest box kept.
+        line_gap (int): Horizontal gap (pixels) bridged between characters of one line.
+        word_gap (float): Boxes of one line closer than this many line heights are merged
+            (words of a phrase become one box).
+        padding (int): Pixels added around every box.
+        min_contrast (int): Gradient strength counted as a stroke edge; flat or noisy-but-faint
+            areas produce no boxes.
+
+    Returns:
+        list: (x1, y1, x2, y2) boxes sorted top to bottom, then left to right.
+    """
+    height, width = gray.shape[:2]
+    gradient = cv2.morphologyEx(gray, cv2.MORPH_GRADIENT, _GRADIENT_KERNEL)
+    _, mask = cv2.threshold(gradient, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+    mask[gradient < min_contrast] = 0
+    mask = cv2.morphologyEx(mask, cv2.MORPH_CLOSE, np.ones((1, line_gap), dtype=np.uint8))
+
+    count, _, stats, _ = cv2.connectedComponentsWithStats(mask, connectivity=8)
+    boxes = []
+    for x, y, w, h, area in stats[1:count]:
+        if not min_height <= h <= max_height or w < min_width:
+            continue
+        if area < 0.2 * w * h:  # Thin outlines (frames, borders) rather than text
+            continue
+        boxes.append((max(int(x) - padding, 0), max(int(y) - padding, 0),
+                      min(int(x + w) + padding, width), min(int(y + h) + padding, height)))
+    # Reading order: group by line (overlapping vertical extent), then left to right.
+    boxes.sort(key=lambda b: (b[1] + b[3]) // 2)
+    lines = []
+    for box in boxes:
+        if lines and box[1] < lines[-1][-1][3] and (box[1] + box[3]) // 2 > lines[-1][-1][1]:
+            lines[-1].append(box)
+        else:
+            lines.append([box])
+    merged = []
+    for line in lines:
+        line.sort()
+        current = line[0]
+        for box in line[1:]:
+            if box[0] - current[2] <= word_gap * (current[3] - current[1]):
+                current = (current[0], min(current[1], box[1]), max(current[2], box[2]), max(current[3], box[3]))
+            else:
+                merged.append(current)
+                current = box
+        merged.append(current)
+    return merged
+
+
+def read_text_regions(image, engine=None, config=BATCH_CONFIG, pipeline=None, max_coverage=0.6, **kwargs):
+    """
+    OCR only the proposed text boxes of `image`, in one batched engine pass.
+
+    Args:
+        image: Path, decoded frame or Frame.
+        engine (OCREngine): Defaults to the shared engine.
+        config (str): Tesseract config for the batch (ignored when `pipeline` is given).
+        pipeline (ocr_pipeline.Pipeline): Optional preprocessing for every box.
+        max_coverage (float): When the boxes cover more than this fraction of the image,
+            proposals do not save anything; the whole image is OCR'd instead.
+        **kwargs: Passed to propose_text_boxes.
+
+    Returns:
+        str: The boxes' text in reading order, one box per line ("" if no text-like region).
+    """
+    frame = Frame.of(image)
+    if not frame.is_valid():
+        return ""
+    engine = engine or get_engine()
+    gray = frame.gray
+    boxes = propose_text_boxes(gray, **kwargs)
+    if not boxes:
+        logger.debug("No text-like regions; skipping OCR.")
+        return ""
+    covered = sum((x2 - x1) * (y2 - y1) for x1, y1, x2, y2 in boxes)
+    if covered > max_coverage * gray.size:
+        whole = pipeline.apply(gray) if pipeline is not None else gray
+        return engine.image_to_string(whole, config=pipeline.config if pipeline is not None else config)
+
+    rois = {f"box:{i}": box for i, box in enumerate(boxes)}
+    texts = ocr_rois(frame, rois, engine=engine, config=config,
+                     pipelines={name: pipeline for name in rois} if pipeline is not None else None)
+    logger.debug(f"OCR'd {len(boxes)} text boxes covering {covered / gray.size:.0%} of the image")
+    return "\n".join(texts[name]["text"] for name in rois if texts[name]["text"].strip())
@@ -1,19 +1,26 @@
 import json
+import os
 import time
 import threading
 from adb_module import ADBModule
 from navigation_tool import NavigationTool
 from ocr_module import OCRModule
+from popup_locator import PopupLocator
+from screencap import encode_png
+from ui_wait import frame_stable, popup_settled
 
 
 class TileScanner:
-    def __init__(self, roi_file="rois.json"):
-        self.adb = ADBModule()
+    def __init__(self, roi_file="rois.json", adb=None, settle_timeout=2.0, ocr_service=None):
+        self.adb = adb or ADBModule()
         self.nav_tool = NavigationTool(adb=self.adb)
         self.ocr = OCRModule()
         self.tiles_scanned = []
         self.roi_file = roi_file
         self.scanning = False
+        self.settle_timeout = settle_timeout  # Upper bound on waiting for a pop-up to settle
+        self.ocr_service = ocr_service  # Optional OCRService: OCR runs in worker processes while tapping continues
+        self.popup_locator = PopupLocator()  # OCR only the pop-up panel, not the whole frame
         self.load_rois()
 
         self.tile_mapping = {
@@ -40,25 +47,46 @@ class TileScanner:
         tap_y = (y1 + y2) // 2
 
         print(f"Scanning tile at {kingdom}:{x},{y} using ROI ({tap_x}, {tap_y})")
+        before = self.adb.capture_frame()  # The pop-up has appeared once the frame differs from this one
+        if before is None:
+            print("Failed to capture screenshot.")
+            return None
         self.adb.tap_screen(tap_x, tap_y)
-        time.sleep(2)  # Wait for pop-up
+        settled, frame = self.adb.wait_until(popup_settled(reference=before), self.settle_timeout)  # Wait for pop-up
 
         # 🔧 FIX: Generate unique screenshot filename
         timestamp = time.strftime("%Y%m%d_%H%M%S")
         screenshot_path = f"screenshots/tile_{kingdom}_{x}_{y}_{tap_x}_{tap_y}_{timestamp}.png"
 
-        if not self.adb.capture_screenshot(screenshot_path):
+        if frame is None:
             print("Failed to capture screenshot.")
             return None
+        if not settled:
+            print(f"Pop-up did not settle within {self.settle_timeout}s; using the last frame.")
+        os.makedirs("screenshots", exist_ok=True)
+        with open(screenshot_path, "wb") as f:
+            f.write(encode_png(frame))
+
+        # Read the pop-up panel only; the full frame is the fallback when no panel is found.
+        panel = self.popup_locator.crop(frame)
+        source = panel if panel is not None else screenshot_path
+
+        if self.ocr_service is not None:
+            # The tile is recorded when its OCR finishes; the caller gets a Future of the tile type.
+            tile_type = self.ocr_service.then(self.ocr_service.submit_text(source),
+                                              lambda text: self.record_tile(kingdom, x, y, text, screenshot_path))
+        else:
+            tile_type = self.record_tile(kingdom, x, y, self.ocr.extract_text(source), screenshot_path)
 
-        extracted_text = self.ocr.extract_text(screenshot_path).lower()
-        tile_type = self.identify_tile_type(extracted_text)
+        self.adb.press_escape()
+        self.adb.wait_until(frame_stable(), self.settle_timeout)
+        return tile_type
 
+    def record_tile(self, kingdom, x, y, extracted_text, screenshot_path):
+        """Identify a tile from its OCR text and add it to tiles_scanned."""
+        tile_type = self.identify_tile_type(extracted_text.lower())
         self.tiles_scanned.append({"kingdom": kingdom, "x": x, "y": y, "tile_type": tile_type, "screenshot": screenshot_path})
         print(f"Tile identified as: {tile_type}")
-
-        self.adb.press_escape()
-        time.sleep(1)
         return tile_type
 
 
@@ -97,6 +125,9 @@ class TileScanner:
                 self.scan_location(kingdom, x, y)
                 time.sleep(1)
 
+        if self.ocr_service is not None:
+            self.ocr_service.drain()  # tiles_scanned is complete once the queued OCR jobs are
+
         with open("tile_scan_results.json", "w") as f:
             json.dump(self.tiles_scanned, f, indent=4)
         print("Area scan complete.")
@@ -0,0 +1,48 @@
+"""
+Tile type from pop-up text, shared by the renaming tool (screenshot_rename_crop.py)
+and the OCR benchmark; kept free of GUI imports.
+"""
+
+
+def detect_tile_type(ocr_text):
+    """
+    Simple logic to classify tile type based on keywords in OCR text.
+    Adjust to match your actual game terms. 
+    """
+
+    text_lower = ocr_text.lower()
+
+    # Monster
+    if any(keyword in text_lower for keyword in ["monster hunt", "dmg", "monster"]):
+        return "monster"
+
+    # Resource
+    if any(keyword in text_lower for keyword in [
+        "gather", "field", "timber", "rich vein", "rocks", "occupier", 
+        "wood", "ore", "stone", "food", "gold", "ruins"
+    ]):
+        return "rss"
+
+    # Vacant
+    if any(keyword in text_lower for keyword in [
+        "transfer", "forest", "magma path", 
+        "grassland", "mountain", "shore", "sea", 
+        "volcano", "lava hill", "glacier"
+    ]):
+        return "vacant"
+
+    # Darknest (check first if you specifically see "darknest" in the text)
+    if "darknest" in text_lower:
+        return "darknest"
+
+    # Castle
+    # Here we also include "scout", "rally attack", "attack", etc. 
+    # because many castle/darknest screens are similar. But "darknest"
+    # is specifically matched above if "darknest" is found in text_lower.
+    if any(keyword in text_lower for keyword in [
+        "scout", "rally attack", "attack", "troops killed:",
+        "might:", "guild:", "kingdom:", "view profile", "enter turf"
+    ]):
+        return "castle"
+
+    return "unknown"
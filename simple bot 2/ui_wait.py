@@ -0,0 +1,154 @@
+import logging
+import os
+import time
+
+import cv2
+import numpy as np
+
+from screencap import load_grayscale
+
+logger = logging.getLogger("UIWait")
+
+# Where the pop-up Close button sits (see ScreenshotProcessor.find_close_button).
+CLOSE_BUTTON_POSITIONS = ((1075, 160), (1540, 60))
+
+
+def wait_until(capture, predicate, timeout=2.0, interval=0.05):
+    """
+    Poll frames until `predicate(frame)` holds, instead of sleeping a fixed time.
+
+    Args:
+        capture (callable): Returns the current frame (e.g. ADBModule.capture_frame).
+        predicate (callable): frame -> bool. Should be cheap; it runs on every poll.
+        timeout (float): Give up after this many seconds.
+        interval (float): Pause between polls (the capture itself usually takes longer).
+
+    Returns:
+        tuple: (ready, frame) - whether the predicate held, and the last frame captured
+        (None if no capture succeeded).
+    """
+    start = time.monotonic()
+    deadline = start + timeout
+    frame = None
+    polls = 0
+    while True:
+        current = capture()
+        polls += 1
+        if current is not None:
+            frame = current
+            if predicate(frame):
+                logger.debug(f"UI ready after {time.monotonic() - start:.2f}s ({polls} frames)")
+                return True, frame
+        if time.monotonic() >= deadline:
+            logger.debug(f"UI not ready after {timeout}s ({polls} frames)")
+            return False, frame
+        time.sleep(interval)
+
+
+def find_close_button(frame, template, positions=CLOSE_BUTTON_POSITIONS, window=100, threshold=0.8):
+    """
+    Center (x, y) of the Close button template matched in a `window`-sized box
+    around one of its known positions, or None.
+    """
+    gray = load_grayscale(frame)
+    template = load_grayscale(template)
+    height, width = template.shape[:2]
+    for x, y in positions:
+        x1, y1 = max(x - window // 2, 0), max(y - window // 2, 0)
+        roi = gray[y1:y + window // 2, x1:x + window // 2]
+        if roi.shape[0] < height or roi.shape[1] < width:
+            continue
+        _, score, _, (left, top) = cv2.minMaxLoc(cv2.matchTemplate(roi, template, cv2.TM_CCOEFF_NORMED))
+        if score >= threshold:
+            return x1 + left + width // 2, y1 + top + height // 2
+    return None
+
+
+def close_button_visible(template, positions=CLOSE_BUTTON_POSITIONS, window=100, threshold=0.8):
+    """Predicate: the Close button template matches near one of its known positions."""
+    template = load_grayscale(template)
+
+    def predicate(frame):
+        return find_close_button(frame, template, positions, window, threshold) is not None
+
+    return predicate
+
+
+def frame_stable(max_diff=2.0, step=4):
+    """
+    Predicate: the frame barely changed since the previous poll (mean absolute
+    difference of a subsampled grayscale image below `max_diff`), i.e. pop-up
+    and map animations have finished. Holds state, so create one per wait.
+    """
+    previous = []
+
+    def predicate(frame):
+        small = load_grayscale(frame)[::step, ::step].astype(np.int16)
+        stable = bool(previous) and previous[0].shape == small.shape and \
+            float(np.abs(small - previous[0]).mean()) <= max_diff
+        previous[:] = [small]
+        return stable
+
+    return predicate
+
+
+def frame_changed(reference, min_diff=8.0, step=4):
+    """
+    Predicate: the frame differs from `reference` (e.g. the frame captured before a tap or a
+    navigation) by a mean absolute difference of at least `min_diff`, so a still, unchanged
+    screen is never mistaken for the new one.
+    """
+    before = load_grayscale(reference)[::step, ::step].astype(np.int16)
+
+    def predicate(frame):
+        small = load_grayscale(frame)[::step, ::step].astype(np.int16)
+        return small.shape != before.shape or float(np.abs(small - before).mean()) >= min_diff
+
+    return predicate
+
+
+def center_changed(read_center, previous):
+    """Predicate: the view center read from the frame (read_center(frame) -> (k, x, y)) differs from `previous`."""
+    def predicate(frame):
+        center = read_center(frame)
+        return bool(center) and None not in center and tuple(center) != tuple(previous)
+
+    return predicate
+
+
+def all_of(*predicates):
+    """Predicate: every predicate holds (all are evaluated, so stateful ones stay current)."""
+    def predicate(frame):
+        return all([p(frame) for p in predicates])
+
+    return predicate
+
+
+def any_of(*predicates):
+    """Predicate: at least one predicate holds."""
+    def predicate(frame):
+        return any([p(frame) for p in predicates])
+
+    return predicate
+
+
+def popup_settled(template="templates/close_button.png", reference=None):
+    """
+    Predicate for "the pop-up is open and has stopped animating": the Close
+    button is visible and the frame is stable. With the frame captured before
+    the tap as `reference`, the frame must also differ from it.
+
+    Without a Close button template (a missing path) the pop-up can only be
+    recognised as "the frame changed from `reference` and then settled";
+    stability alone would accept the pre-tap map, so a missing template with
+    no reference raises FileNotFoundError.
+    """
+    if template is None or (isinstance(template, str) and not os.path.exists(template)):
+        if reference is None:
+            raise FileNotFoundError(f"Close button template {template!r} not found; pass the pre-tap frame "
+                                    f"as `reference` to wait for the pop-up by frame change instead.")
+        logger.debug(f"No Close button template ({template}); waiting for the frame to change and settle.")
+        return all_of(frame_changed(reference), frame_stable())
+    if reference is None:
+        return all_of(close_button_visible(template), frame_stable())
+    return all_of(frame_changed(reference), close_button_visible(template), frame_stable())
@@ -0,0 +1,424 @@
+"""
+One ADB layer for every tool.
+
+AsyncADB is an asyncio client for a single device, built on adb_client: shell
+commands stream through one persistent shell per device (SocketShellSession
+over the adb server socket, or an ADBShellSession `adb shell` process when
+the server is not reachable), and binary output (screencaps) comes from
+AdbServerClient.exec_out over its pooled connections. The blocking calls run
+on worker threads, so one process can drive many emulators concurrently.
+
+ADBModule is a synchronous facade over AsyncADB that accepts the method
+names and call styles of the older adb_module / adb_module2 / adb_module3 /
+4adb_module classes (tap_screen(x, y), tap(device_id, x, y),
+capture_screenshot(device_id, save_path), ...). Like adb_module2, a failed or
+timed-out call raises RuntimeError.
+"""
+
+import asyncio
+import concurrent.futures
+import logging
+import os
+import re
+import threading
+
+from adb_client import AdbServerClient, AdbServerError, SocketShellSession
+from adb_session import ADBShellSession
+from screencap import CAPTURE_COMMANDS, benchmark_capture_modes, choose_capture_mode, decode_capture, encode_png
+from sequence_compiler import KEYCODE_ESCAPE, captures_frame, compile_sequence
+from ui_wait import wait_until
+
+ADB_HOST = "127.0.0.1"
+ADB_PORT = 5037
+
+
+async def server_available(host=ADB_HOST, port=ADB_PORT, client=None):
+    """Return True if an adb server answers on host:port."""
+    client = client or AdbServerClient(host, port)
+    try:
+        await asyncio.to_thread(client.version)
+        return True
+    except (AdbServerError, OSError):
+        return False
+
+
+async def list_devices(host=ADB_HOST, port=ADB_PORT, use_server=True, adb_path="adb", client=None):
+    """Return the serials of all online devices."""
+    client = client or AdbServerClient(host, port)
+    try:
+        if not use_server:
+            raise ConnectionRefusedError("adb server disabled")
+        devices = await asyncio.to_thread(client.devices)
+    except OSError:
+        process = await asyncio.create_subprocess_exec(
+            adb_path, "devices", stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.DEVNULL
+        )
+        stdout, _ = await process.communicate()
+        devices = AdbServerClient.parse_devices("\n".join(stdout.decode("utf-8", errors="replace").splitlines()[1:]))
+    return [serial for serial, state in devices if state == "device"]
+
+
+class AsyncADB:
+    """asyncio ADB client bound to one device, over a persistent shell session."""
+
+    def __init__(self, device_id, host=ADB_HOST, port=ADB_PORT, use_server=True, adb_path="adb", client=None,
+                 timeout=10.0):
+        """
+        Args:
+            device_id (str): The device this client drives.
+            host, port: Address of the adb server (ignored when `client` is given).
+            use_server (bool): Use the adb server socket when reachable.
+            adb_path (str): adb executable used without the server.
+            client (AdbServerClient): Shared server client (its connection pool is reused).
+            timeout (float): Seconds a shell command may take.
+        """
+        self.device_id = device_id
+        self.client = client or AdbServerClient(host, port)
+        self.use_server = use_server
+        self.adb_path = adb_path
+        self.timeout = timeout
+        self.capture_mode = "png"
+        self.logger = logging.getLogger("AsyncADB")
+        self.session = None
+        self._server_checked = False
+
+    async def _via_server(self):
+        if not self._server_checked:
+            self.use_server = self.use_server and await server_available(client=self.client)
+            self._server_checked = True
+            if not self.use_server:
+                self.logger.info(f"[{self.device_id}] adb server not reachable. Using the adb executable.")
+        return self.use_server
+
+    async def _session(self):
+        """The device's persistent shell, opened on first use."""
+        if self.session is None:
+            if await self._via_server():
+                self.session = SocketShellSession(self.device_id, self.client, timeout=self.timeout)
+            else:
+                self.session = ADBShellSession(self.device_id, adb_path=self.adb_path, timeout=self.timeout)
+        return self.session
+
+    async def _adb(self, *args):
+        """Run the adb executable for this device and return its stdout."""
+        process = await asyncio.create_subprocess_exec(
+            self.adb_path, "-s", self.device_id, *args,
+            stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE,
+        )
+        stdout, stderr = await process.communicate()
+        if process.returncode != 0:
+            raise RuntimeError(f"adb {' '.join(args)} failed: {stderr.decode('utf-8', errors='replace').strip()}")
+        return stdout
+
+    async def shell(self, command):
+        """Run a shell command in the device's persistent session and return its output as text."""
+        session = await self._session()
+        try:
+            return await asyncio.to_thread(session.run, command)
+        except asyncio.CancelledError:
+            # The worker thread is still blocked in session.run holding the session's lock;
+            # closing the session wakes it up, and the next command opens a fresh one.
+            self.logger.warning(f"[{self.device_id}] '{command}' was abandoned. Restarting the shell session.")
+            self.reset_session(session)
+            raise
+
+    async def exec_out(self, command):
+        """Run a command with a clean binary stdout."""
+        if await self._via_server():
+            return await asyncio.to_thread(self.client.exec_out, self.device_id, command)
+        return await self._adb("exec-out", command)
+
+    def reset_session(self, session=None):
+        """Close the shell session (only if it is still `session`, when given); the next command reopens it."""
+        if self.session is not None and (session is None or self.session is session):
+            self.session.close()
+            self.session = None
+
+    def close(self):
+        """Close the persistent shell session."""
+        self.reset_session()
+
+    async def tap(self, x, y):
+        await self.shell(f"input tap {x} {y}")
+
+    async def swipe(self, x1, y1, x2, y2, duration=300):
+        await self.shell(f"input swipe {x1} {y1} {x2} {y2} {duration}")
+
+    async def keyevent(self, keycode):
+        await self.shell(f"input keyevent {keycode}")
+
+    async def press_escape(self):
+        await self.keyevent(KEYCODE_ESCAPE)
+
+    async def capture_frame(self, save_path=None, mode=None, decode=True):
+        """
+        Capture a frame into memory.
+
+        Args:
+            save_path (str): Optional path the frame is also written to as PNG.
+            mode (str): "png", "raw" or "gzip" (defaults to self.capture_mode).
+            decode (bool): Return the decoded frame (True) or the PNG bytes (False).
+
+        Returns:
+            numpy.ndarray: The frame (BGR for png, an RGBA view for raw/gzip), or PNG bytes.
+        """
+        mode = "png" if not decode else (mode or self.capture_mode)
+        data = await self.exec_out(CAPTURE_COMMANDS[mode])
+        if not data:
+            raise RuntimeError(f"Empty {mode} screencap from {self.device_id}")
+        frame = decode_capture(mode, data) if decode else data
+        if save_path:
+            _save_capture(save_path, mode, data, frame)
+        return frame
+
+    async def run_sequence(self, sequence, save_path=None, mode=None):
+        """Run a compiled action sequence in one round trip; returns the captured frame, if any."""
+        mode = mode or self.capture_mode
+        script = compile_sequence(sequence, mode=mode)
+        if not captures_frame(sequence):
+            await self.shell(script)
+            return True
+        data = await self.exec_out(script)
+        frame = decode_capture(mode, data)
+        if save_path:
+            _save_capture(save_path, mode, data, frame)
+        return frame
+
+    async def screen_resolution(self):
+        output = (await self.exec_out("wm size")).decode("utf-8", errors="replace")
+        match = re.search(r"Physical size: (\d+)x(\d+)", output)
+        if not match:
+            raise ValueError("Failed to retrieve screen resolution.")
+        return tuple(map(int, match.groups()))
+
+
+def _save_capture(save_path, mode, data, frame):
+    os.makedirs(os.path.dirname(save_path) or ".", exist_ok=True)
+    with open(save_path, "wb") as f:
+        f.write(data if mode == "png" else encode_png(frame))
+
+
+async def run_on_devices(device_ids, job, **client_kwargs):
+    """
+    Run `job(client)` concurrently for every device and return {device_id: result}.
+    A job that raises has its exception stored as the result.
+    """
+    if "client" not in client_kwargs:
+        client_kwargs["client"] = AdbServerClient(client_kwargs.pop("host", ADB_HOST), client_kwargs.pop("port", ADB_PORT))
+    clients = [AsyncADB(device_id, **client_kwargs) for device_id in device_ids]
+    try:
+        results = await asyncio.gather(*(job(client) for client in clients), return_exceptions=True)
+    finally:
+        for client in clients:
+            client.close()
+    return dict(zip(device_ids, results))
+
+
+class _EventLoopThread:
+    """One background event loop shared by every synchronous facade."""
+
+    _loop = None
+    _lock = threading.Lock()
+
+    @classmethod
+    def loop(cls):
+        with cls._lock:
+            if cls._loop is None:
+                cls._loop = asyncio.new_event_loop()
+                threading.Thread(target=cls._loop.run_forever, name="ADBEventLoop", daemon=True).start()
+            return cls._loop
+
+    @classmethod
+    def run(cls, coroutine, timeout=None, cancel_grace=1.0):
+        """
+        Run `coroutine` on the loop; on timeout it is cancelled rather than left running.
+        The caller waits up to `cancel_grace` seconds for the coroutine's cancellation
+        handling (e.g. AsyncADB.shell restarting its session) before the timeout is raised.
+        """
+        finished = threading.Event()
+
+        async def tracked():
+            try:
+                return await coroutine
+            finally:
+                finished.set()
+
+        future = asyncio.run_coroutine_threadsafe(tracked(), cls.loop())
+        try:
+            return future.result(timeout)
+        except concurrent.futures.TimeoutError:
+            future.cancel()
+            finished.wait(cancel_grace)
+            raise
+
+
+class ADBModule:
+    """
+    Synchronous facade over AsyncADB. Methods accept both the device-bound style
+    (tap_screen(x, y)) and the per-call device style (tap(device_id, x, y)).
+    """
+
+    def __init__(self, device_id=None, host=ADB_HOST, port=ADB_PORT, use_server=True,
+                 registry=None, offline_timeout=60.0, timeout=30.0):
+        """
+        Args:
+            device_id (str): Default device (the first online device if omitted).
+            host, port: Address of the adb server.
+            use_server (bool): Use the adb server socket when reachable.
+            registry (DeviceRegistry): Optional live registry; actions on an offline device
+                pause until it reconnects.
+            offline_timeout (float): Seconds to wait for an offline device.
+            timeout (float): Seconds before a single ADB call is abandoned.
+        """
+        self.logger = logging.getLogger("ADBModule")
+        self.host = host
+        self.port = port
+        self.use_server = use_server
+        self.registry = registry
+        self.offline_timeout = offline_timeout
+        self.timeout = timeout
+        self.server = AdbServerClient(host, port)  # Shared by every device's AsyncADB
+        self.clients = {}
+        self.device_id = device_id or self.get_device_id()
+
+    # -- plumbing ----------------------------------------------------------
+
+    def run(self, coroutine):
+        """Run a coroutine on the shared ADB event loop and return its result."""
+        return _EventLoopThread.run(coroutine, self.timeout)
+
+    def client(self, device_id=None):
+        """Return the AsyncADB client for a device."""
+        device_id = device_id or self.device_id
+        if not device_id:
+            raise RuntimeError("No ADB device connected.")
+        if device_id not in self.clients:
+            self.clients[device_id] = AsyncADB(device_id, use_server=self.use_server, client=self.server)
+        return self.clients[device_id]
+
+    def _call(self, device_id, method, *args, **kwargs):
+        """
+        Run AsyncADB.<method> for the device.
+
+        Raises:
+            RuntimeError: If the call failed or timed out (logged first), as adb_module2 did.
+        """
+        try:
+            client = self.client(device_id)
+            if self.registry is not None and not self.registry.is_online(client.device_id):
+                self.logger.warning(f"⏸️ {client.device_id} is offline. Pausing until it reconnects...")
+                if not self.registry.wait_for_device(client.device_id, timeout=self.offline_timeout):
+                    raise RuntimeError(f"Device {client.device_id} did not reconnect.")
+            return self.run(getattr(client, method)(*args, **kwargs))
+        except concurrent.futures.TimeoutError:
+            self.logger.error(f"❌ {method} timed out on {device_id or self.device_id} after {self.timeout}s")
+            raise RuntimeError(f"{method} timed out after {self.timeout}s")
+        except Exception as e:
+            self.logger.error(f"❌ {method} failed on {device_id or self.device_id}: {e}")
+            raise RuntimeError(f"{method} failed: {e}") from e
+
+    @staticmethod
+    def _split_device(args, count):
+        """Separate an optional leading device_id (str or None) from `count` or more coordinates."""
+        if len(args) > count and (args[0] is None or isinstance(args[0], str)):
+            return args[0], args[1:]
+        return None, args
+
+    # -- devices -------------------------------------------------------------
+
+    def list_devices(self):
+        """Return the serials of all online devices."""
+        if self.registry is not None:
+            return self.registry.online_devices()
+        return self.run(list_devices(use_server=self.use_server, client=self.server))
+
+    get_connected_devices = list_devices
+
+    def get_device_id(self):
+        """Return the first online device, or None."""
+        try:
+            devices = self.list_devices()
+        except Exception as e:
+            self.logger.error(f"❌ Could not list ADB devices: {e}")
+            return None
+        if not devices:
+            self.logger.error("❌ No connected ADB devices.")
+            return None
+        self.logger.info(f"✅ Using ADB device: {devices[0]}")
+        return devices[0]
+
+    def validate_device_id(self, device_id):
+        if device_id not in self.list_devices():
+            raise ValueError(f"Device ID {device_id} is not connected.")
+
+    # -- actions -------------------------------------------------------------
+
+    def tap_screen(self, *args):
+        """tap_screen(x, y) or tap_screen(device_id, x, y)."""
+        device_id, (x, y) = self._split_device(args, 2)
+        self._call(device_id, "tap", x, y)
+
+    def tap(self, *args):
+        """tap(device_id, x, y) or tap(x, y)."""
+        self.tap_screen(*args)
+
+    def swipe(self, *args, duration=300):
+        """swipe(x1, y1, x2, y2[, duration]) or swipe(device_id, x1, y1, x2, y2[, duration])."""
+        device_id, rest = self._split_device(args, 4)
+        if len(rest) == 5:
+            rest, duration = rest[:4], rest[4]
+        self._call(device_id, "swipe", *rest, duration=duration)
+
+    def keyevent(self, keycode, device_id=None):
+        self._call(device_id, "keyevent", keycode)
+
+    def press_escape(self, device_id=None):
+        """Press ESC (keycode 111) to close pop-ups."""
+        self._call(device_id, "press_escape")
+
+    def execute_command(self, device_id, command):
+        """Run a shell command on a device and return its output."""
+        return self._call(device_id, "shell", command)
+
+    def execute_shell_command(self, command, device_id=None):
+        return self._call(device_id, "shell", command)
+
+    def capture_frame(self, device=None, save_path=None, decode=True, mode=None):
+        """Capture a frame into memory (see AsyncADB.capture_frame)."""
+        return self._call(device, "capture_frame", save_path=save_path, mode=mode, decode=decode)
+
+    def capture_screenshot(self, device_id=None, save_path="screenshot.png"):
+        """
+        Capture a screenshot of a device (the default one when None) to `save_path`.
+
+        Returns:
+            str: The saved path.
+        """
+        self._call(device_id, "capture_frame", save_path=save_path, decode=False)
+        return save_path
+
+    def wait_until(self, predicate, timeout=2.0, interval=0.05, device=None):
+        """Poll captures until predicate(frame) holds (see ui_wait.wait_until). Returns (ready, frame)."""
+        return wait_until(lambda: self.capture_frame(device), predicate, timeout, interval)
+
+    def run_sequence(self, sequence, device=None, mode=None, save_path=None):
+        """Run a compiled action sequence in one round trip (see AsyncADB.run_sequence)."""
+        return self._call(device, "run_sequence", sequence, save_path=save_path, mode=mode)
+
+    def get_screen_resolution(self, device_id=None):
+        return self._call(device_id, "screen_resolution")
+
+    def select_capture_mode(self, device=None, samples=3):
+        """Benchmark png/raw/gzip captures on the device and keep the fastest."""
+        client = self.client(device)
+        results = benchmark_capture_modes(lambda mode: self.run(client.exec_out(CAPTURE_COMMANDS[mode])), samples=samples)
+        client.capture_mode = choose_capture_mode(results)
+        self.logger.info(f"✅ Using {client.capture_mode} captures for {client.device_id}")
+        return client.capture_mode
+
+    def close(self):
+        """Close every device's shell session and the pooled server connections."""
+        for client in self.clients.values():
+            client.close()
+        self.clients = {}
+        self.server.close()